@@ -0,0 +1,79 @@
+"""
+Agendador com heap + thread no relógio monotônico versus varredura
+periódica da lista de timers (o que um laço "a cada tick, confere tudo"
+faria). Mede o custo de agendar, o atraso de disparo e o tempo de CPU.
+
+    python -m smart_home.benchmarks.bench_agendador --n 100000 --duracao 3
+"""
+import argparse
+import random
+import threading
+import time
+
+from smart_home.hub.agendador import Agendador, MetricasAtraso
+from smart_home.utils.logs import logs_no_nivel
+
+
+def varredura(prazos, tick_s, metricas):
+    # cada tick percorre todos os timers ainda pendentes
+    pendentes = list(prazos)
+    while pendentes:
+        time.sleep(tick_s)
+        agora = time.monotonic()
+        restantes = []
+        for prazo in pendentes:
+            if prazo <= agora:
+                metricas.registrar(time.monotonic() - prazo)
+            else:
+                restantes.append(prazo)
+        pendentes = restantes
+
+
+def com_heap(atrasos):
+    agendador = Agendador()
+    disparados = threading.Semaphore(0)
+    agendador.iniciar()
+
+    inicio = time.perf_counter()
+    for atraso in atrasos:
+        agendador.em(atraso, disparados.release)
+    t_agendar = time.perf_counter() - inicio
+
+    for _ in atrasos:
+        disparados.acquire()
+    agendador.parar()
+    return agendador.metricas, t_agendar
+
+
+@logs_no_nivel("WARNING")
+def executar(n, duracao, tick_ms=10.0):
+    rng = random.Random(42)
+    atrasos = [0.2 + rng.random() * duracao for _ in range(n)]
+
+    cpu = time.process_time()
+    metricas_heap, t_agendar = com_heap(atrasos)
+    cpu_heap = time.process_time() - cpu
+
+    metricas_varredura = MetricasAtraso()
+    base = time.monotonic()
+    cpu = time.process_time()
+    varredura([base + atraso for atraso in atrasos], tick_ms / 1000, metricas_varredura)
+    cpu_varredura = time.process_time() - cpu
+
+    resultados = {"heap": metricas_heap.resumo(), "varredura": metricas_varredura.resumo()}
+    resultados["heap"]["cpu_s"], resultados["varredura"]["cpu_s"] = cpu_heap, cpu_varredura
+    for modo, r in resultados.items():
+        print(f"{modo:>9}: {r['disparos']:>8,} disparos | atraso p50 {r['p50_ms']:6.2f} ms "
+              f"p99 {r['p99_ms']:6.2f} ms máx. {r['max_ms']:7.2f} ms | CPU {r['cpu_s']:5.2f} s")
+    print(f"{'agendar':>9}: {n:,} timers em {t_agendar * 1000:.1f} ms ({n / t_agendar:,.0f}/s)")
+
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--duracao", type=float, default=3.0)
+    parser.add_argument("--tick-ms", type=float, default=10.0)
+    args = parser.parse_args()
+    executar(args.n, args.duracao, args.tick_ms)
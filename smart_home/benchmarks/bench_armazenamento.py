@@ -0,0 +1,69 @@
+"""
+Consultas sobre o histórico de eventos: journal JSON-Lines (carrega tudo e
+filtra em Python) versus ArmazenamentoEventos (SQLite + índices).
+
+    python -m smart_home.benchmarks.bench_armazenamento --n 1000000
+"""
+import argparse
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from smart_home.benchmarks.bench_consumo import gerar_eventos
+from smart_home.benchmarks.comum import cronometrar
+from smart_home.hub.armazenamento import ArmazenamentoEventos
+from smart_home.hub.consumo_tomada import calcular_consumo_tomada
+from smart_home.hub.journal import JournalEventos
+from smart_home.utils.logs import logs_no_nivel
+
+
+@logs_no_nivel("WARNING")
+def executar(n):
+    eventos, tomadas = gerar_eventos(n)
+
+    # "tudo da tomada_7 na última semana do histórico"
+    fim = eventos[-1]["timestamp"]
+    inicio = (datetime.fromisoformat(fim) - timedelta(days=7)).isoformat()
+    alvo = "tomada_7"
+
+    with tempfile.TemporaryDirectory() as pasta:
+        journal = JournalEventos(os.path.join(pasta, "eventos"), politica_fsync="nunca", tamanho_lote=4096)
+        armazenamento = ArmazenamentoEventos(os.path.join(pasta, "eventos.db"), tamanho_lote=4096)
+
+        _, t_grava_journal = cronometrar(lambda: (journal.anexar_lote(eventos), journal.commit()))
+        _, t_grava_sqlite = cronometrar(lambda: armazenamento.anexar_lote(eventos))
+
+        def consulta_journal():
+            return [e for e in journal.iterar()
+                    if e["id_dispositivo"] == alvo and inicio <= e["timestamp"] < fim]
+
+        def consumo_journal():
+            janela = [e for e in journal.iterar() if inicio <= e["timestamp"] < fim]
+            return calcular_consumo_tomada(janela, tomadas)
+
+        r_journal, t_consulta_journal = cronometrar(consulta_journal)
+        r_sqlite, t_consulta_sqlite = cronometrar(lambda: list(armazenamento.consultar(alvo, inicio=inicio, fim=fim)))
+        c_journal, t_consumo_journal = cronometrar(consumo_journal)
+        c_sqlite, t_consumo_sqlite = cronometrar(lambda: calcular_consumo_tomada(armazenamento, tomadas, inicio, fim))
+
+        journal.fechar()
+        armazenamento.fechar()
+
+    resultados = {
+        "gravacao": (t_grava_journal, t_grava_sqlite),
+        "consulta_dispositivo": (t_consulta_journal, t_consulta_sqlite),
+        "consumo_janela": (t_consumo_journal, t_consumo_sqlite),
+    }
+    for nome, (t_journal, t_sqlite) in resultados.items():
+        print(f"{nome:>20}: journal {t_journal * 1000:9.1f} ms | sqlite {t_sqlite * 1000:9.1f} ms "
+              f"| {t_journal / t_sqlite:6.1f}x")
+    print(f"{'resultados iguais':>20}: {r_journal == r_sqlite and c_journal == c_sqlite}")
+
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=1000000)
+    args = parser.parse_args()
+    executar(args.n)
@@ -0,0 +1,110 @@
+"""
+Partida a frio com um config grande: json.load do documento inteiro
+seguido da construção, versus o carregador em streaming (sequencial e
+com pool de threads). Mostra o tempo de cada fase e o pico de memória
+só do parse.
+
+    python -m smart_home.benchmarks.bench_carga --n 100000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from smart_home.hub.automacao import DeviceFactory
+from smart_home.hub.carregador import carregar_config, iterar_config_dispositivos
+from smart_home.hub.registro import RegistroDispositivos
+from smart_home.utils.logs import logs_no_nivel
+
+MODELOS = (
+    ("LUZ", {"brilho": 80, "cor": "BLUE"}, "ligada"),
+    ("TOMADA", {"potencia_W": 1200}, "desligada"),
+    ("PORTA", {}, "trancada"),
+    ("SENSOR", {}, "inativo"),
+    ("CAFETEIRA", {}, "desligada"),
+    ("PERSIANA", {}, "fechada"),
+)
+
+
+def gerar_config(caminho, n):
+    dispositivos = []
+    for i in range(n):
+        tipo, atributos, estado = MODELOS[i % len(MODELOS)]
+        dispositivos.append({"id": f"{tipo.lower()}_{i}", "nome": f"{tipo.title()} {i}", "tipo": tipo,
+                             "estado": estado, "atributos": atributos})
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump({"dispositivos": dispositivos}, f, indent=4)
+
+
+def carregar_json_load(caminho):
+    tempos = {}
+    inicio = time.perf_counter()
+    with open(caminho, "r", encoding="utf-8") as f:
+        dados = json.load(f)
+    tempos["leitura_s"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    construidos = [DeviceFactory.criar_dispositivo(d) for d in dados["dispositivos"]]
+    tempos["construcao_s"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    registro = RegistroDispositivos()
+    for dispositivo in construidos:
+        registro.adicionar(dispositivo)
+    tempos["registro_s"] = time.perf_counter() - inicio
+    tempos["total_s"] = sum(tempos.values())
+    tempos["dispositivos"] = len(registro)
+    return tempos
+
+
+def pico_parse(funcao):
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico / 2 ** 20
+
+
+@logs_no_nivel("WARNING")
+def executar(n, trabalhadores):
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "config.json")
+        gerar_config(caminho, n)
+        print(f"config: {n} dispositivos, {os.path.getsize(caminho) / 2 ** 20:.1f} MiB")
+
+        modos = {
+            "json.load": lambda: carregar_json_load(caminho),
+            "streaming": lambda: carregar_config(caminho, DeviceFactory.criar_dispositivo)[1],
+            f"streaming x{trabalhadores}": lambda: carregar_config(
+                caminho, DeviceFactory.criar_dispositivo, trabalhadores=trabalhadores)[1],
+        }
+        resultados = {modo: funcao() for modo, funcao in modos.items()}
+
+        for modo, t in resultados.items():
+            print(f"{modo:>14}: total {t['total_s'] * 1000:8.1f} ms | leitura {t['leitura_s'] * 1000:7.1f} | "
+                  f"construção {t['construcao_s'] * 1000:7.1f} | registro {t['registro_s'] * 1000:7.1f} | "
+                  f"{t['dispositivos']} dispositivos")
+
+        def parse_inteiro():
+            with open(caminho, "r", encoding="utf-8") as f:
+                json.load(f)
+
+        def parse_streaming():
+            for _ in iterar_config_dispositivos(caminho):
+                pass
+
+        print(f"pico de memória do parse: json.load {pico_parse(parse_inteiro):.1f} MiB | "
+              f"streaming {pico_parse(parse_streaming):.1f} MiB")
+
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--trabalhadores", type=int, default=4)
+    args = parser.parse_args()
+    executar(args.n, args.trabalhadores)
@@ -0,0 +1,64 @@
+"""
+iterar_consumo_tomada (laço Python) versus o motor vetorizado (NumPy), que
+calcular_consumo_tomada usa a partir de LIMIAR_VETORIZADO eventos.
+
+    python -m smart_home.benchmarks.bench_consumo --n 1000000 10000000
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from smart_home.benchmarks.comum import cronometrar
+from smart_home.core.tomada import TomadaInteligente
+from smart_home.hub.consumo_tomada import iterar_consumo_tomada
+from smart_home.hub.consumo_vetorizado import ColunasEventos, calcular_consumo_tomada_vetorizado, consumo_de_colunas
+
+
+def gerar_eventos(n, n_tomadas=100, semente=42):
+    aleatorio = random.Random(semente)
+    tomadas = [TomadaInteligente(f"tomada_{i}", f"Tomada {i}", potencia_W=aleatorio.randint(5, 2000))
+               for i in range(n_tomadas)]
+    ids = [t.id for t in tomadas] + ["luz_sala"]
+
+    instante = datetime(2025, 1, 1)
+    eventos = []
+    for _ in range(n):
+        instante += timedelta(microseconds=aleatorio.randint(1, 120_000_000))
+        eventos.append({
+            "id_dispositivo": aleatorio.choice(ids),
+            "evento": aleatorio.choice(("ligar", "desligar", "ligar", "desligar", "consumo")),
+            "timestamp": instante.isoformat(),
+        })
+    return eventos, tomadas
+
+
+def laco_python(eventos, tomadas):
+    return list(iterar_consumo_tomada(eventos, tomadas))
+
+
+def executar(tamanhos):
+    resultados = {}
+    for n in tamanhos:
+        eventos, tomadas = gerar_eventos(n)
+        original, t_original = cronometrar(laco_python, eventos, tomadas)
+        vetorizado, t_vetorizado = cronometrar(calcular_consumo_tomada_vetorizado, eventos, tomadas)
+
+        # separa a carga das colunas (laço sobre os dicts) do cálculo em lote
+        potencias = {t.id: t.potencia_W for t in tomadas}
+        colunas, t_carga = cronometrar(ColunasEventos.de_eventos, eventos, list(potencias))
+        _, t_colunas = cronometrar(consumo_de_colunas, colunas, potencias)
+
+        iguais = original == vetorizado
+        resultados[n] = {"original_s": t_original, "vetorizado_s": t_vetorizado,
+                         "carga_colunas_s": t_carga, "calculo_colunas_s": t_colunas, "iguais": iguais}
+        print(f"n={n:>10,} | original {t_original:7.2f} s | vetorizado {t_vetorizado:7.2f} s "
+              f"(carga {t_carga:6.2f} s + colunas {t_colunas:6.2f} s) | "
+              f"{t_original / t_vetorizado:5.1f}x | resultados iguais: {iguais}")
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, nargs="+", default=[1_000_000])
+    args = parser.parse_args()
+    executar(args.n)
@@ -0,0 +1,71 @@
+"""
+Latência de uma transição (executar_comando) com um observer de custo
+crescente, entregando na própria transição (síncrono) e pelo
+DespachanteAssincrono. O custo do observer é simulado com sleep, como um
+observer que grava em disco ou rede.
+
+    python -m smart_home.benchmarks.bench_despacho --n 500 --custos-us 0 100 1000
+
+No modo assíncrono a latência da transição não deve acompanhar o custo do
+observer (a fila comporta as n transições, então não há contrapressão).
+"""
+import argparse
+import statistics
+import time
+
+from smart_home.core.luz import Luz
+from smart_home.hub.observer import Observer, ativar_despacho_assincrono, desativar_despacho_assincrono
+from smart_home.utils.logs import logs_no_nivel
+
+
+class ObserverLento(Observer):
+
+    def __init__(self, custo_s):
+        self.custo_s = custo_s
+
+    def update(self, subject, *args, **kwargs):
+        if self.custo_s:
+            time.sleep(self.custo_s)
+
+
+def medir_transicoes(n, custo_s):
+    luz = Luz("luz", "Luz")
+    luz.attach(ObserverLento(custo_s))
+    latencias = []
+    for i in range(n):
+        comando = "ligar" if i % 2 == 0 else "desligar"
+        inicio = time.perf_counter()
+        luz.executar_comando(comando)
+        latencias.append(time.perf_counter() - inicio)
+    latencias.sort()
+    return {"p50_us": statistics.median(latencias) * 1e6, "p99_us": latencias[int(len(latencias) * 0.99) - 1] * 1e6}
+
+
+@logs_no_nivel("WARNING")
+def executar(n, custos_us):
+    resultados = {}
+
+    for custo_us in custos_us:
+        sincrono = medir_transicoes(n, custo_us / 1e6)
+
+        despachante = ativar_despacho_assincrono(capacidade=n)
+        assincrono = medir_transicoes(n, custo_us / 1e6)
+        inicio = time.perf_counter()
+        despachante.aguardar()
+        drenagem = time.perf_counter() - inicio
+        desativar_despacho_assincrono()
+
+        resultados[custo_us] = {"sincrono": sincrono, "assincrono": assincrono, "drenagem_s": drenagem}
+        print(f"observer {custo_us:>6} us: síncrono p50 {sincrono['p50_us']:9.1f} us p99 {sincrono['p99_us']:9.1f} us"
+              f" | assíncrono p50 {assincrono['p50_us']:7.1f} us p99 {assincrono['p99_us']:7.1f} us"
+              f" (fila drenada {drenagem * 1000:.0f} ms depois)")
+
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=500)
+    parser.add_argument("--custos-us", type=int, nargs="+", default=[0, 100, 1000])
+    args = parser.parse_args()
+    executar(args.n, args.custos_us)
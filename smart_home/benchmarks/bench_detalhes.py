@@ -0,0 +1,51 @@
+"""
+detalhes() montado a cada chamada (comportamento antigo, reproduzido aqui)
+versus detalhes versionados em cache, com campos vivos calculados na leitura.
+
+    python -m smart_home.benchmarks.bench_detalhes --n 100000 --leituras 5
+"""
+import argparse
+
+from smart_home.benchmarks.comum import cronometrar
+from smart_home.benchmarks.gerador_carga import criar_frota
+from smart_home.utils.logs import logs_no_nivel
+
+
+def detalhes_sem_cache(dispositivo):
+    # o que detalhes() fazia antes: dict novo + campos vivos calculados sempre
+    detalhes = dispositivo._detalhes_fixos()
+    for campo, metodo in dispositivo.CAMPOS_VIVOS.items():
+        detalhes[campo] = getattr(dispositivo, metodo)()
+    return detalhes
+
+
+@logs_no_nivel("WARNING")
+def executar(n, leituras):
+    frota = criar_frota(n)
+    for dispositivo in frota[::4]:
+        if dispositivo.pode_executar("ligar"):
+            dispositivo.executar_comando("ligar")
+
+    # listar/salvar/relatório lendo a frota parada várias vezes
+    def ler(funcao):
+        for _ in range(leituras):
+            for dispositivo in frota:
+                funcao(dispositivo)["estado"]
+
+    resultados = {
+        "sem_cache": cronometrar(ler, detalhes_sem_cache)[1],
+        "cache": cronometrar(ler, lambda d: d.detalhes())[1],
+    }
+    for modo, duracao in resultados.items():
+        print(f"{modo:>9}: {duracao:6.3f} s | {n * leituras / duracao:>12,.0f} leituras/s")
+    print(f"  speedup: {resultados['sem_cache'] / resultados['cache']:.1f}x")
+
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--leituras", type=int, default=5)
+    args = parser.parse_args()
+    executar(args.n, args.leituras)
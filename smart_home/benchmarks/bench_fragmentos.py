@@ -0,0 +1,91 @@
+"""
+Vazão de comandos do hub fragmentado (um processo por fragmento) contra o
+hub de processo único, com a mesma frota de luzes e os mesmos lotes de
+ligar/desligar.
+
+    python -m smart_home.benchmarks.bench_fragmentos --n 20000 --lote 10000 --rodadas 20 --processos 1 2 4
+
+A escala quase linear até o número de núcleos é o esperado, não um
+resultado medido: até aqui o benchmark só rodou numa máquina de 1 núcleo,
+onde os fragmentos disputam a mesma CPU (0,94 a 1,00x o processo único).
+Com mais de um processo e menos núcleos que processos, o resultado sai
+marcado como não verificado.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from smart_home.benchmarks.comum import criar_hub, encerrar_hub
+from smart_home.benchmarks.gerador_carga import salvar_config
+from smart_home.core.luz import Luz
+from smart_home.hub.fragmentos import HubFragmentado
+from smart_home.utils.logs import logs_no_nivel
+
+
+def lotes(ids, lote, rodadas):
+    # cada rodada liga ou desliga 'lote' luzes (sempre uma transição válida)
+    for rodada in range(rodadas):
+        comando = "ligar" if rodada % 2 == 0 else "desligar"
+        yield [(ids[i % len(ids)], comando) for i in range(lote)]
+
+
+def medir_processo_unico(caminho, ids, lote, rodadas):
+    hub = criar_hub(caminho_config=caminho)
+    try:
+        inicio = time.perf_counter()
+        for pares in lotes(ids, lote, rodadas):
+            for id_dispositivo, comando in pares:
+                hub.dispositivos.get(id_dispositivo).tentar_comando(comando)
+        return time.perf_counter() - inicio
+    finally:
+        encerrar_hub(hub)
+
+
+def medir_fragmentado(caminho, ids, lote, rodadas, processos):
+    with HubFragmentado(caminho, "", processos=processos, nivel_log="CRITICAL") as hub:
+        inicio = time.perf_counter()
+        for pares in lotes(ids, lote, rodadas):
+            hub.executar_comandos(pares)
+        return time.perf_counter() - inicio
+
+
+@logs_no_nivel("CRITICAL")
+def executar(n, lote, rodadas, processos):
+    lote = min(lote, n)
+    total = lote * rodadas
+    resultados = {}
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "config.json")
+        frota = [Luz(f"luz_{i}", f"Luz {i}") for i in range(n)]
+        salvar_config(frota, caminho)
+        ids = [d.id for d in frota]
+        del frota
+
+        base = medir_processo_unico(caminho, ids, lote, rodadas)
+        resultados["processo_unico"] = total / base
+        print(f"{'processo único':>16}: {total / base:>12,.0f} comandos/s")
+
+        for quantidade in processos:
+            decorrido = medir_fragmentado(caminho, ids, lote, rodadas, quantidade)
+            resultados[f"{quantidade}_processos"] = total / decorrido
+            print(f"{f'{quantidade} processo(s)':>16}: {total / decorrido:>12,.0f} comandos/s "
+                  f"({base / decorrido:4.2f}x o processo único)")
+
+    nucleos = os.cpu_count() or 1
+    print(f"núcleos disponíveis: {nucleos}")
+    if nucleos < max(processos):
+        print(f"[AVISO] escala não verificada: {max(processos)} processos em {nucleos} núcleo(s); "
+              "os fragmentos dividem a mesma CPU")
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--lote", type=int, default=10000)
+    parser.add_argument("--rodadas", type=int, default=20)
+    parser.add_argument("--processos", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    executar(args.n, args.lote, args.rodadas, args.processos)
@@ -0,0 +1,59 @@
+"""
+Comandos/s por modo de log: desativado (nível acima de INFO), fila
+assíncrona (QueueHandler + thread de escrita) e escrita síncrona no
+destino, que equivale aos antigos print().
+
+    python -m smart_home.benchmarks.bench_logs --n 20000
+    python -m smart_home.benchmarks.bench_logs --n 20000 --estruturado
+"""
+import argparse
+import tempfile
+import time
+
+from smart_home.core.luz import Luz
+from smart_home.utils.logs import configurar_logs, encerrar_logs
+
+MODOS = (
+    ("desativado", {"nivel": "WARNING", "assincrono": False}),
+    ("fila", {"nivel": "INFO", "assincrono": True}),
+    ("sincrono", {"nivel": "INFO", "assincrono": False}),
+)
+
+
+def medir(n, destino, estruturado, nivel, assincrono):
+    configurar_logs(nivel, assincrono=assincrono, destino=destino, estruturado=estruturado)
+    luz = Luz("luz_bench", "Luz Bench")
+
+    inicio = time.perf_counter()
+    for _ in range(n):
+        luz.executar_comando("ligar")
+        luz.executar_comando("desligar")
+    duracao = time.perf_counter() - inicio
+
+    # o que ficou na fila não entra no tempo do caminho quente
+    encerrar_logs()
+    return duracao
+
+
+def executar(n, estruturado=False):
+    resultados = {}
+
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as destino:
+        for modo, opcoes in MODOS:
+            duracao = medir(n, destino, estruturado, **opcoes)
+            resultados[modo] = {"segundos": duracao, "comandos_s": 2 * n / duracao}
+            print(f"{modo:>10}: {duracao:7.3f} s | {2 * n / duracao:11,.0f} comandos/s")
+
+    configurar_logs("INFO", assincrono=False)
+    base = resultados["sincrono"]["segundos"]
+    print(f"   fila vs sincrono: {base / resultados['fila']['segundos']:.1f}x | "
+          f"desativado vs sincrono: {base / resultados['desativado']['segundos']:.1f}x")
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--estruturado", action="store_true")
+    args = parser.parse_args()
+    executar(args.n, args.estruturado)
@@ -0,0 +1,66 @@
+"""
+"Apagar todas as luzes": laço de executar_comando versus executar_em_lote,
+com metade das luzes já apagadas (comandos que precisam ser pulados).
+
+    python -m smart_home.benchmarks.bench_lote --n 100000
+"""
+import argparse
+import tempfile
+import time
+
+from smart_home.benchmarks.comum import criar_hub, encerrar_hub
+from smart_home.core.luz import Luz
+from smart_home.hub.state_machine import CodigoComando
+from smart_home.utils.logs import configurar_logs
+
+
+def luzes(n):
+    frota = [Luz(f"luz_{i}", f"Luz {i}") for i in range(n)]
+    for luz in frota[::2]:
+        luz.ligar()
+    return frota
+
+
+def medir(n):
+    resultados = {}
+
+    hub = criar_hub(luzes(n))
+    inicio = time.perf_counter()
+    ok = sum(bool(luz.executar_comando("desligar")) for luz in hub.dispositivos.por_tipo("LUZ"))
+    resultados["laco"] = {"segundos": time.perf_counter() - inicio, "ok": ok}
+    encerrar_hub(hub)
+
+    hub = criar_hub(luzes(n))
+    inicio = time.perf_counter()
+    codigos = hub.executar_em_lote({"tipo": "LUZ"}, "desligar")
+    ok = sum(1 for c in codigos.values() if c == CodigoComando.OK)
+    resultados["lote"] = {"segundos": time.perf_counter() - inicio, "ok": ok}
+    encerrar_hub(hub)
+
+    return resultados
+
+
+def executar(n):
+    todos = {}
+
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as destino:
+        # "sem logs" mede só o caminho de comando; "logs INFO" inclui a
+        # mensagem por dispositivo que o laço emite (o lote emite uma só)
+        for cenario, nivel in (("sem logs", "CRITICAL"), ("logs INFO", "INFO")):
+            configurar_logs(nivel, assincrono=False, destino=destino)
+            resultados = todos[cenario] = medir(n)
+
+            print(f"[{cenario}]")
+            for modo, r in resultados.items():
+                print(f"{modo:>6}: {r['segundos']:7.3f} s | {n / r['segundos']:11,.0f} dispositivos/s | {r['ok']} apagadas")
+            print(f"   speedup: {resultados['laco']['segundos'] / resultados['lote']['segundos']:.1f}x")
+
+    configurar_logs("INFO", assincrono=False)
+    return todos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=100000)
+    args = parser.parse_args()
+    executar(args.n)
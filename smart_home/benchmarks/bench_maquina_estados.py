@@ -0,0 +1,62 @@
+"""
+Benchmark de inicialização: tabela de transições compartilhada por classe
+versus um transitions.Machine construído por instância (abordagem antiga).
+
+    python -m smart_home.benchmarks.bench_maquina_estados --n 50000
+"""
+import argparse
+import time
+import tracemalloc
+
+from smart_home.core.luz import Luz
+
+
+class _LuzMachinePorInstancia:
+    # reproduz o que DispositivoBase/Luz faziam antes: um Machine por objeto
+
+    def __init__(self, id_dispositivo, nome):
+        from transitions import Machine
+
+        self.id = id_dispositivo
+        self.nome = nome
+        self.machine = Machine(model=self, states=["ligada", "desligada"], initial="desligada")
+        self.machine.add_transition("ligar", "desligada", "ligada", after="_on_ligar")
+        self.machine.add_transition("desligar", "ligada", "desligada", after="_on_desligar")
+
+    def _on_ligar(self):
+        pass
+
+    def _on_desligar(self):
+        pass
+
+
+def medir(fabrica, n):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    objetos = [fabrica(f"luz_{i}", f"Luz {i}") for i in range(n)]
+    duracao = time.perf_counter() - inicio
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objetos
+    return duracao, memoria
+
+
+def executar(n):
+    resultados = {"tabela_compartilhada": medir(Luz, n)}
+
+    try:
+        resultados["machine_por_instancia"] = medir(_LuzMachinePorInstancia, n)
+    except ImportError:
+        print("[WARN] transitions não instalado; comparação com a abordagem antiga ignorada.")
+
+    for nome, (duracao, memoria) in resultados.items():
+        print(f"{nome:>24}: {duracao:8.3f} s | {n / duracao:12,.0f} disp/s | {memoria / n:8.0f} B/disp")
+
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=50_000)
+    args = parser.parse_args()
+    executar(args.n)
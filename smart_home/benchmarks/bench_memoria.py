@@ -0,0 +1,53 @@
+"""
+Memória por dispositivo (tracemalloc) para cada classe do core.
+
+    python -m smart_home.benchmarks.bench_memoria --n 100000
+"""
+import argparse
+import tracemalloc
+
+from smart_home.core.cafeteira import Cafeteira
+from smart_home.core.luz import Luz
+from smart_home.core.persiana import Persiana
+from smart_home.core.porta import Port
+from smart_home.core.sensor import Sensor
+from smart_home.core.tomada import TomadaInteligente
+from smart_home.hub.registro import RegistroDispositivos
+
+CLASSES = [Luz, TomadaInteligente, Port, Persiana, Sensor, Cafeteira]
+
+
+def bytes_por_dispositivo(classe, n, com_registro=False):
+    ids = [f"{classe.__name__.lower()}_{i}" for i in range(n)]
+
+    tracemalloc.start()
+    objetos = [classe(id_dispositivo, "Dispositivo") for id_dispositivo in ids]
+    # o registro (índices por id e por tipo) precisa estar vivo na leitura para entrar na conta
+    registro = RegistroDispositivos(objetos) if com_registro else None
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    del objetos, registro
+    return memoria / n
+
+
+def executar(n):
+    resultados = {}
+    for classe in CLASSES:
+        resultados[classe.__name__] = {
+            "objeto": bytes_por_dispositivo(classe, n),
+            "com_registro": bytes_por_dispositivo(classe, n, com_registro=True),
+        }
+
+    print(f"{'classe':>18} | {'B/disp':>8} | {'B/disp + registro':>18}")
+    for nome, r in resultados.items():
+        print(f"{nome:>18} | {r['objeto']:8.0f} | {r['com_registro']:18.0f}")
+
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=100_000)
+    args = parser.parse_args()
+    executar(args.n)
@@ -0,0 +1,111 @@
+"""
+Custo da instrumentação: executar_comando e notify com 10 observers sem
+nenhuma checagem de métricas (código anterior, reproduzido aqui), com o
+registro desligado e com o registro ligado.
+
+    python -m smart_home.benchmarks.bench_metricas --n 100000
+"""
+import argparse
+from datetime import datetime
+
+from smart_home.benchmarks.comum import ns_por_operacao
+from smart_home.core.dispositivo_base import logger as logger_dispositivo
+from smart_home.core.luz import Luz
+from smart_home.hub import state_machine
+from smart_home.hub.state_machine import CodigoComando
+from smart_home.hub.observer import Observer, Subject
+from smart_home.utils.logs import logs_no_nivel
+from smart_home.utils.metricas import ativar_metricas, desativar_metricas
+
+
+class ObserverVazio(Observer):
+
+    sincrono = True
+
+    def update(self, subject, *args, **kwargs):
+        pass
+
+
+def tentar_sem_metricas(dispositivo, comando):
+    # tentar_comando antes da instrumentação
+    try:
+        codigo = dispositivo.machine.tentar(dispositivo, comando)
+    except Exception as e:
+        logger_dispositivo.error("Falha ao executar '%s' em '%s': %s", comando, dispositivo.nome, e)
+        return CodigoComando.ERRO
+    if codigo is state_machine.OK:
+        dispositivo.ultimo_evento = datetime.utcnow()
+        logger_dispositivo.info("Comando '%s' executado em '%s'.", comando, dispositivo.nome)
+    elif codigo is state_machine.CONDICAO_FALHOU:
+        logger_dispositivo.error("Condição não satisfeita para '%s' em '%s'.", comando, dispositivo.nome)
+    elif codigo is state_machine.COMANDO_INEXISTENTE:
+        logger_dispositivo.error("O comando '%s' não existe para o dispositivo '%s'.", comando, dispositivo.nome)
+    else:
+        logger_dispositivo.error("O comando '%s' não pode ser executado no estado atual ('%s') do dispositivo '%s'.",
+                                 comando, dispositivo.state, dispositivo.nome)
+    return codigo
+
+
+def _entregar_sem_metricas(obs, subject, args, kwargs):
+    try:
+        obs.update(subject, *args, **kwargs)
+    except Exception as e:
+        logger_dispositivo.error("Observer %s falhou ao processar notificação: %s", type(obs).__name__, e)
+
+
+def notify_sem_metricas(subject, *args, **kwargs):
+    # Subject.notify (sem despachante) antes da instrumentação
+    observers = subject._observers
+    if not observers:
+        return
+    if Subject.despachante is None:
+        for obs in observers:
+            _entregar_sem_metricas(obs, subject, args, kwargs)
+
+
+@logs_no_nivel("WARNING")
+def executar(n):
+    luz = Luz("luz", "Luz")
+    subject = Subject()
+    for _ in range(10):
+        subject.attach(ObserverVazio())
+
+    def comandos_original(vezes):
+        for _ in range(vezes // 2):
+            tentar_sem_metricas(luz, "ligar")
+            tentar_sem_metricas(luz, "desligar")
+
+    def comandos(vezes):
+        for _ in range(vezes // 2):
+            luz.tentar_comando("ligar")
+            luz.tentar_comando("desligar")
+
+    def notify_original(vezes):
+        for _ in range(vezes):
+            notify_sem_metricas(subject, event="ligar")
+
+    def notify(vezes):
+        for _ in range(vezes):
+            subject.notify(event="ligar")
+
+    resultados = {}
+    for caso, original, instrumentado in (("executar_comando", comandos_original, comandos),
+                                          ("notify x10", notify_original, notify)):
+        desativar_metricas()
+        sem = ns_por_operacao(original, n)
+        desligado = ns_por_operacao(instrumentado, n)
+        ativar_metricas()
+        ligado = ns_por_operacao(instrumentado, n)
+        desativar_metricas()
+        resultados[caso] = {"sem_instrumentacao_ns": sem, "desligado_ns": desligado, "ligado_ns": ligado}
+        print(f"{caso:>17}: sem instrumentação {sem:7.0f} ns | desligado {desligado:7.0f} ns "
+              f"({(desligado / sem - 1) * 100:+5.1f}%) | ligado {ligado:7.0f} ns ({(ligado / sem - 1) * 100:+5.1f}%)")
+
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=100000)
+    args = parser.parse_args()
+    executar(args.n)
@@ -0,0 +1,52 @@
+"""
+Custo de salvar depois de poucas alterações: reescrita completa do config
+(salvar_dispositivos) versus log de alterações (salvar_alteracoes).
+
+    python -m smart_home.benchmarks.bench_persistencia --n 100000 --alteracoes 10
+"""
+import argparse
+import time
+
+from smart_home.benchmarks.comum import criar_hub, encerrar_hub
+from smart_home.core.luz import Luz
+from smart_home.utils.logs import logs_no_nivel
+
+
+@logs_no_nivel("WARNING")
+def executar(n, alteracoes):
+    resultados = {}
+
+    # configuração e rotinas do hub ficam na pasta temporária dele
+    hub = criar_hub()
+    for i in range(n):
+        hub.adicionar_dispostivo(Luz(f"luz_{i}", f"Luz {i}"))
+    hub.salvar_dispositivos(hub._caminho_config)
+
+    luzes = hub.dispositivos.por_tipo("LUZ")
+    passo = max(1, n // alteracoes)
+
+    for modo in ("completo", "incremental"):
+        for luz in luzes[::passo][:alteracoes]:
+            luz.brilho = (luz.brilho + 1) % 100
+
+        inicio = time.perf_counter()
+        if modo == "completo":
+            # também zera as marcações do rastreador
+            hub.salvar_dispositivos(hub._caminho_config)
+        else:
+            hub.salvar_alteracoes()
+        resultados[modo] = time.perf_counter() - inicio
+
+        print(f"{modo:>11}: {resultados[modo] * 1000:9.2f} ms para {alteracoes} alteração(ões) em {n} dispositivos")
+
+    print(f"    speedup: {resultados['completo'] / resultados['incremental']:.0f}x")
+    encerrar_hub(hub)
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--alteracoes", type=int, default=10)
+    args = parser.parse_args()
+    executar(args.n, args.alteracoes)
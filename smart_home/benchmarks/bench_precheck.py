@@ -0,0 +1,75 @@
+"""
+Tráfego misto de comandos (metade recusada pelo estado atual): controle por
+exceção, como o antigo executar_comando, versus a checagem prévia na
+tabela de transições (tentar_comando).
+
+    python -m smart_home.benchmarks.bench_precheck --n 200000
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+
+from smart_home.core.luz import Luz
+from smart_home.core.porta import Port
+from smart_home.core.sensor import Sensor
+from smart_home.hub.state_machine import CodigoComando
+from smart_home.utils.logs import logs_no_nivel, obter_logger
+
+logger = obter_logger(__name__)
+
+
+def comando_por_excecao(dispositivo, comando):
+    # o antigo executar_comando: getattr + try/except para detectar recusas
+    try:
+        if getattr(dispositivo, comando)() is False:
+            logger.error("Condição não satisfeita para '%s' em '%s'.", comando, dispositivo.nome)
+            return False
+        dispositivo.ultimo_evento = datetime.utcnow()
+        logger.info("Comando '%s' executado em '%s'.", comando, dispositivo.nome)
+        return True
+    except AttributeError:
+        logger.error("O comando '%s' não existe para o dispositivo '%s'.", comando, dispositivo.nome)
+    except Exception:
+        logger.error("O comando '%s' não pode ser executado no estado atual ('%s') do dispositivo '%s'.",
+                     comando, dispositivo.state, dispositivo.nome)
+    return False
+
+
+def comando_por_tabela(dispositivo, comando):
+    return dispositivo.tentar_comando(comando) is CodigoComando.OK
+
+
+def gerar_trafego(n, semente=42):
+    rng = random.Random(semente)
+    dispositivos = [Luz("luz", "Luz"), Port("porta", "Porta"), Sensor("sensor", "Sensor")]
+    comandos = [(d, g) for d in dispositivos for g in d.machine.gatilhos] + [(dispositivos[0], "voar")]
+    return dispositivos, [rng.choice(comandos) for _ in range(n)]
+
+
+# sem custo de saída: mede só o caminho de decisão
+@logs_no_nivel("CRITICAL")
+def executar(n):
+    dispositivos, trafego = gerar_trafego(n)
+    resultados = {}
+
+    for modo, funcao in (("excecao", comando_por_excecao), ("tabela", comando_por_tabela)):
+        for dispositivo in dispositivos:
+            dispositivo.state = dispositivo.machine.estado_inicial
+
+        inicio = time.perf_counter()
+        ok = sum(funcao(d, c) for d, c in trafego)
+        duracao = time.perf_counter() - inicio
+
+        resultados[modo] = {"segundos": duracao, "ok": ok}
+        print(f"{modo:>8}: {duracao:7.3f} s | {n / duracao:11,.0f} comandos/s | {ok}/{n} aceitos")
+
+    print(f"   speedup: {resultados['excecao']['segundos'] / resultados['tabela']['segundos']:.1f}x")
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=200000)
+    args = parser.parse_args()
+    executar(args.n)
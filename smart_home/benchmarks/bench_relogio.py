@@ -0,0 +1,80 @@
+"""
+Relógio do hub: custo de medir o tempo ligado de uma tomada (datetime.utcnow()
++ aritmética de datetime, como era, contra relogio.atual.timestamp()) e um
+mês de uso de uma frota de tomadas rodado com o relógio simulado.
+
+    python -m smart_home.benchmarks.bench_relogio --n 200000 --tomadas 1000 --dias 30
+"""
+import argparse
+import time
+from datetime import datetime
+
+from smart_home.benchmarks.comum import ns_por_operacao
+from smart_home.core.tomada import TomadaInteligente
+from smart_home.hub import relogio
+from smart_home.hub.relogio import RelogioSimulado, usando_relogio
+from smart_home.utils.logs import logs_no_nivel
+
+
+def horas_datetime(n):
+    # _calcular_consumo antes do relógio do hub
+    inicio = datetime.utcnow()
+    total = 0.0
+    for _ in range(n):
+        total += (datetime.utcnow() - inicio).total_seconds() / 3600.0
+    return total
+
+
+def horas_relogio(n):
+    inicio = relogio.atual.timestamp()
+    total = 0.0
+    for _ in range(n):
+        total += (relogio.atual.timestamp() - inicio) / 3600.0
+    return total
+
+
+def simular_mes(tomadas, dias, horas_ligada=5):
+    """Liga todas as tomadas por 'horas_ligada' horas por dia; devolve (segundos reais, Wh)."""
+
+    simulado = RelogioSimulado(datetime(2025, 1, 1))
+    with usando_relogio(simulado):
+        frota = [TomadaInteligente(f"tomada_{i}", f"Tomada {i}", potencia_W=50 + i % 10 * 50) for i in range(tomadas)]
+        inicio = time.perf_counter()
+        for _ in range(dias):
+            for tomada in frota:
+                tomada.executar_comando("ligar")
+            simulado.avancar(horas_ligada * 3600)
+            for tomada in frota:
+                tomada.executar_comando("desligar")
+            simulado.avancar((24 - horas_ligada) * 3600)
+        decorrido = time.perf_counter() - inicio
+
+        consumo = sum(t.consumo_total() for t in frota)
+        esperado = sum(t.potencia_W for t in frota) * horas_ligada * dias
+        assert abs(consumo - esperado) < 1e-6 * esperado, (consumo, esperado)
+    return decorrido, consumo
+
+
+@logs_no_nivel("WARNING")
+def executar(n, tomadas, dias):
+
+    antes = ns_por_operacao(horas_datetime, n)
+    depois = ns_por_operacao(horas_relogio, n)
+    print(f"{'tempo ligado':>14}: utcnow + datetime {antes:6.0f} ns | relogio.timestamp {depois:6.0f} ns "
+          f"({antes / depois:4.1f}x)")
+
+    decorrido, consumo = simular_mes(tomadas, dias)
+    comandos = tomadas * dias * 2
+    print(f"{'simulado':>14}: {dias} dias x {tomadas} tomadas ({comandos:,} comandos) em "
+          f"{decorrido * 1000:8.1f} ms | {consumo / 1000:,.1f} kWh")
+
+    return {"datetime_ns": antes, "relogio_ns": depois, "simulado_s": decorrido, "consumo_wh": consumo}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=200000)
+    parser.add_argument("--tomadas", type=int, default=1000)
+    parser.add_argument("--dias", type=int, default=30)
+    args = parser.parse_args()
+    executar(args.n, args.tomadas, args.dias)
@@ -0,0 +1,74 @@
+"""
+Retenção do histórico: linhas guardadas e custo de consultar o consumo de
+uma tomada no histórico inteiro, só com eventos brutos versus depois da
+compactação (bruto recente + séries por hora/dia).
+
+    python -m smart_home.benchmarks.bench_retencao --n 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from smart_home.benchmarks.bench_consumo import gerar_eventos
+from smart_home.hub.armazenamento import ArmazenamentoEventos
+from smart_home.hub.registro import RegistroDispositivos
+from smart_home.hub.retencao import RetencaoEventos
+from smart_home.utils.logs import logs_no_nivel
+
+
+def consultar(retencao, tomadas, agora):
+    inicio = time.perf_counter()
+    consumo = {t.id: retencao.consumo_wh(t.id, fim=agora) for t in tomadas}
+    return consumo, time.perf_counter() - inicio
+
+
+def linhas(retencao):
+    conexao = retencao._conexao
+    return (conexao.execute("SELECT COUNT(*) FROM eventos").fetchone()[0]
+            + conexao.execute("SELECT COUNT(*) FROM series").fetchone()[0])
+
+
+@logs_no_nivel("WARNING")
+def executar(n, consultas=10):
+    eventos, tomadas = gerar_eventos(n)
+    agora = datetime.fromisoformat(eventos[-1]["timestamp"])
+
+    registro = RegistroDispositivos()
+    registro.adicionar_lote(tomadas)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        armazenamento = ArmazenamentoEventos(os.path.join(pasta, "eventos.db"))
+        armazenamento.anexar_lote(eventos)
+        retencao = RetencaoEventos(armazenamento, registro, janela_bruta=timedelta(days=7),
+                                   janela_horaria=timedelta(days=90))
+
+        linhas_antes = linhas(retencao)
+        consumo_antes, t_antes = consultar(retencao, tomadas[:consultas], agora)
+
+        inicio = time.perf_counter()
+        retencao.compactar(agora=agora)
+        t_compactar = time.perf_counter() - inicio
+
+        linhas_depois = linhas(retencao)
+        consumo_depois, t_depois = consultar(retencao, tomadas[:consultas], agora)
+
+        retencao.fechar()
+        armazenamento.fechar()
+
+    print(f"{'só bruto':>12}: {linhas_antes:>10,} linhas | consumo de {consultas} tomadas em {t_antes * 1000:8.1f} ms")
+    print(f"{'compactado':>12}: {linhas_depois:>10,} linhas | consumo de {consultas} tomadas em {t_depois * 1000:8.1f} ms "
+          f"(compactação {t_compactar:.2f} s)")
+    print(f"{'iguais':>12}: {consumo_antes == consumo_depois}")
+
+    return {"linhas_antes": linhas_antes, "linhas_depois": linhas_depois, "consulta_antes_s": t_antes,
+            "consulta_depois_s": t_depois, "compactar_s": t_compactar}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=1000000)
+    parser.add_argument("--consultas", type=int, default=10)
+    args = parser.parse_args()
+    executar(args.n, args.consultas)
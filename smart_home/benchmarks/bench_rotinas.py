@@ -0,0 +1,63 @@
+"""
+executar_rotinas serial versus paralelo, com latência de I/O simulada em
+cada comando (um observer síncrono que dorme).
+
+    python -m smart_home.benchmarks.bench_rotinas --n 500 --latencia-ms 5
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from smart_home.benchmarks.comum import criar_hub, encerrar_hub
+from smart_home.core.luz import Luz
+from smart_home.hub.observer import Observer
+
+
+class LatenciaSimulada(Observer):
+
+    def __init__(self, segundos):
+        self.segundos = segundos
+
+    def update(self, subject, *args, **kwargs):
+        time.sleep(self.segundos)
+
+
+def criar_hub_com_latencia(n, latencia_s):
+    observer = LatenciaSimulada(latencia_s)
+    luzes = [Luz(f"luz_{i}", f"Luz {i}") for i in range(n)]
+    for luz in luzes:
+        luz.attach(observer)
+
+    return criar_hub(luzes, rotinas={
+        "ligar_tudo": {"nome": "Ligar tudo", "acoes": [{"id_dispositivo": f"luz_{i}", "comando": "ligar"} for i in range(n)]},
+        "desligar_tudo": {"nome": "Desligar tudo", "acoes": [{"id_dispositivo": f"luz_{i}", "comando": "desligar"} for i in range(n)]},
+    })
+
+
+def executar(n, latencia_ms):
+    hub = criar_hub_com_latencia(n, latencia_ms / 1000.0)
+    resultados = {}
+
+    for modo, paralelo in (("serial", False), ("paralelo", True)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            ligados = hub.executar_rotinas("ligar_tudo", paralelo=paralelo)
+            desligados = hub.executar_rotinas("desligar_tudo", paralelo=paralelo)
+            duracao = time.perf_counter() - inicio
+
+        ok = sum(r.sucesso for r in ligados + desligados)
+        resultados[modo] = {"segundos": duracao, "comandos_ok": ok}
+        print(f"{modo:>9}: {duracao:7.3f} s | {2 * n / duracao:9,.0f} comandos/s | {ok}/{2 * n} ok")
+
+    print(f"   speedup: {resultados['serial']['segundos'] / resultados['paralelo']['segundos']:.1f}x")
+    encerrar_hub(hub)
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=500)
+    parser.add_argument("--latencia-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    executar(args.n, args.latencia_ms)
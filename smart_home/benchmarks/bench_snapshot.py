@@ -0,0 +1,70 @@
+"""
+Salvar e restaurar o hub inteiro: snapshot binário (colunas + mmap) versus
+salvar_dispositivos em JSON + carga da configuração.
+
+    python -m smart_home.benchmarks.bench_snapshot --n 1000000
+"""
+import argparse
+import os
+import tempfile
+
+from smart_home.benchmarks.comum import criar_hub, cronometrar, encerrar_hub
+from smart_home.core.cafeteira import Cafeteira
+from smart_home.core.luz import CorRGB, Luz
+from smart_home.core.porta import Port
+from smart_home.core.sensor import Sensor
+from smart_home.core.tomada import TomadaInteligente
+from smart_home.utils.logs import logs_no_nivel
+
+FABRICAS = (
+    lambda i: Luz(f"luz_{i}", f"Luz {i}", brilho=i % 100, cor=CorRGB.BLUE),
+    lambda i: TomadaInteligente(f"tomada_{i}", f"Tomada {i}", potencia_W=100 + i % 900),
+    lambda i: Port(f"porta_{i}", f"Porta {i}"),
+    lambda i: Sensor(f"sensor_{i}", f"Sensor {i}"),
+    lambda i: Cafeteira(f"cafeteira_{i}", f"Cafeteira {i}"),
+)
+
+
+def criar_frota(n):
+    dispositivos = [FABRICAS[i % len(FABRICAS)](i) for i in range(n)]
+    for dispositivo in dispositivos[::3]:
+        if dispositivo.pode_executar("ligar"):
+            dispositivo.executar_comando("ligar")
+    return dispositivos
+
+
+@logs_no_nivel("WARNING")
+def executar(n, incluir_json=True):
+    hub = criar_hub(criar_frota(n))
+    resultados = {}
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_bin = os.path.join(pasta, "hub.snap")
+        caminho_json = os.path.join(pasta, "hub.json")
+
+        resultados["snapshot"] = {
+            "salvar_s": cronometrar(hub.salvar_snapshot, caminho_bin)[1],
+            "restaurar_s": cronometrar(hub.restaurar_snapshot, caminho_bin)[1],
+            "mib": os.path.getsize(caminho_bin) / 2 ** 20,
+        }
+
+        if incluir_json:
+            resultados["json"] = {
+                "salvar_s": cronometrar(hub.salvar_dispositivos, caminho_json)[1],
+                "restaurar_s": cronometrar(hub.carregar_dispositivos, caminho_json)[1],
+                "mib": os.path.getsize(caminho_json) / 2 ** 20,
+            }
+
+    for formato, r in resultados.items():
+        print(f"{formato:>9}: salvar {r['salvar_s']:6.2f} s | restaurar {r['restaurar_s']:6.2f} s | {r['mib']:7.1f} MiB")
+
+    encerrar_hub(hub)
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=1000000)
+    parser.add_argument("--sem-json", action="store_true", help="mede só o snapshot binário")
+    args = parser.parse_args()
+    executar(args.n, not args.sem_json)
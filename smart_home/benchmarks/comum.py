@@ -0,0 +1,68 @@
+"""
+Peças comuns aos benchmarks: o hub descartável e os cronômetros.
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from smart_home.hub.automacao import AutomacaoResidencial
+
+# pasta temporária de cada hub criado aqui, apagada em encerrar_hub
+_PASTAS = {}
+
+
+def criar_hub(dispositivos=(), rotinas=None, caminho_config=None):
+    """
+    Hub novo (o singleton anterior é esquecido) com 'dispositivos' no
+    registro e, se dadas, 'rotinas'. Sem caminho_config, configuração e
+    rotinas são arquivos vazios numa pasta temporária: nada é lido do
+    diretório de onde o benchmark roda (nem um '.delta' perdido).
+    """
+    pasta = tempfile.mkdtemp(prefix="smart_home_bench_")
+    caminho_rotinas = os.path.join(pasta, "rotinas.json")
+    with open(caminho_rotinas, "w", encoding="utf-8") as f:
+        json.dump({}, f)
+    if caminho_config is None:
+        caminho_config = os.path.join(pasta, "config.json")
+        with open(caminho_config, "w", encoding="utf-8") as f:
+            json.dump({"dispositivos": []}, f)
+
+    AutomacaoResidencial._instance = None
+    hub = AutomacaoResidencial(caminho_config, caminho_rotinas)
+    _PASTAS[id(hub)] = pasta
+
+    if dispositivos:
+        hub.dispositivos.adicionar_lote(dispositivos)
+    if rotinas is not None:
+        hub.rotinas = rotinas
+    return hub
+
+
+def encerrar_hub(hub):
+    hub.executor.encerrar()
+    hub.agendador.fechar()
+    if AutomacaoResidencial._instance is hub:
+        AutomacaoResidencial._instance = None
+    pasta = _PASTAS.pop(id(hub), None)
+    if pasta:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+def cronometrar(funcao, *args):
+    """Uma execução: devolve (resultado, segundos)."""
+
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def ns_por_operacao(funcao, n, repeticoes=5):
+    # melhor de algumas rodadas: diferenças de poucos ns somem no ruído da máquina
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(n)
+        tempos.append((time.perf_counter() - inicio) / n * 1e9)
+    return min(tempos)
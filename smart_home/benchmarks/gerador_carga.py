@@ -0,0 +1,304 @@
+"""
+Gerador de carga: frota sintética com todos os tipos de dispositivo e
+processos de chegada (Poisson ou perfil diurno) para comandos e ativações
+de sensores, numa taxa alvo. Mede a vazão atingida e a latência.
+
+    python -m smart_home.benchmarks.gerador_carga --n 10000 --taxa 5000 --duracao 10
+    python -m smart_home.benchmarks.gerador_carga --padrao diurno --segundos-por-hora 1 --duracao 24 --hub
+    python -m smart_home.benchmarks.gerador_carga --n 1000 --duracao 86400 --salvar-eventos eventos.json
+
+Com --salvar-eventos nada espera o relógio: o dia é simulado e os eventos
+(mesmo formato do menu) alimentam os outros benchmarks; --salvar-config
+grava a frota no formato do config_exemplo.json.
+"""
+import argparse
+import heapq
+import json
+import math
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from smart_home.benchmarks.comum import criar_hub, encerrar_hub
+from smart_home.core.cafeteira import Cafeteira
+from smart_home.core.luz import CorRGB, Luz
+from smart_home.core.persiana import Persiana
+from smart_home.core.porta import Port
+from smart_home.core.sensor import Sensor
+from smart_home.core.tomada import TomadaInteligente
+from smart_home.hub.state_machine import CodigoComando
+from smart_home.utils.logs import logs_no_nivel
+from smart_home.utils.metricas import Histograma
+
+# participação de cada tipo numa casa típica
+PROPORCOES = {"LUZ": 0.35, "TOMADA": 0.20, "SENSOR": 0.15, "PERSIANA": 0.12, "PORTA": 0.10, "CAFETEIRA": 0.08}
+
+# atividade relativa por hora do dia (madrugada quieta, picos de manhã e à noite)
+PERFIL_RESIDENCIAL = (0.2, 0.15, 0.1, 0.1, 0.1, 0.2, 0.6, 1.4, 1.3, 0.8, 0.7, 0.8,
+                      0.9, 0.8, 0.7, 0.8, 1.0, 1.4, 1.9, 2.1, 2.0, 1.6, 1.0, 0.5)
+
+
+# -------------------------------
+# Frota
+# -------------------------------
+def _luz(rng, id_dispositivo, nome):
+    brilho = rng.choice((100, 100, 100, 80, 60, 40, 20))
+    cor = rng.choices(list(CorRGB), weights=(85, 5, 5, 5))[0]
+    return Luz(id_dispositivo, nome, brilho=brilho, cor=cor)
+
+
+def _tomada(rng, id_dispositivo, nome):
+    # log-normal: a maioria entre 10 e 200 W, cauda até chuveiros/fornos
+    potencia = min(3500, max(5, round(rng.lognormvariate(math.log(60), 1.1))))
+    return TomadaInteligente(id_dispositivo, nome, potencia_W=potencia)
+
+
+def _com_estado(classe, pesos):
+    def construir(rng, id_dispositivo, nome):
+        dispositivo = classe(id_dispositivo, nome)
+        estado = rng.choices(list(pesos), weights=list(pesos.values()))[0]
+        if estado != dispositivo.state:
+            dispositivo.restaurar_estado(estado)
+        return dispositivo
+    return construir
+
+
+CONSTRUTORES = {
+    "LUZ": _luz,
+    "TOMADA": _tomada,
+    "SENSOR": lambda rng, id_dispositivo, nome: Sensor(id_dispositivo, nome),
+    "PERSIANA": _com_estado(Persiana, {"fechada": 60, "aberta": 30, "entreaberta": 10}),
+    "PORTA": _com_estado(Port, {"trancada": 70, "destrancada": 25, "aberta": 5}),
+    "CAFETEIRA": lambda rng, id_dispositivo, nome: Cafeteira(id_dispositivo, nome),
+}
+
+
+def criar_frota(n, proporcoes=None, semente=42):
+    """n dispositivos sorteados pelas proporções, com atributos e estados iniciais variados."""
+
+    proporcoes = proporcoes or PROPORCOES
+    rng = random.Random(semente)
+    tipos = rng.choices(list(proporcoes), weights=list(proporcoes.values()), k=n)
+    return [CONSTRUTORES[tipo](rng, f"{tipo.lower()}_{i}", f"{tipo.title()} {i}") for i, tipo in enumerate(tipos)]
+
+
+def salvar_config(frota, caminho):
+    """Grava a frota no formato lido por carregar_dispositivos."""
+
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump({"dispositivos": [d.detalhes().como_dict() for d in frota]}, f, indent=4)
+
+
+def conectar_hub(frota, hub=None):
+    """Registra a frota num hub (novo, vazio, se nenhum for passado) para que observers e regras rodem."""
+
+    if hub is None:
+        hub = criar_hub()
+    hub.dispositivos.adicionar_lote(frota)
+    for dispositivo in frota:
+        dispositivo.attach(hub)
+    return hub
+
+
+# -------------------------------
+# Processos de chegada
+# -------------------------------
+class ProcessoPoisson:
+    """Chegadas independentes a uma taxa constante (intervalos exponenciais)."""
+
+    def __init__(self, taxa_s, semente=None):
+        if taxa_s <= 0:
+            raise ValueError(f"Taxa inválida: {taxa_s}")
+        self.taxa_media_s = taxa_s
+        self._rng = random.Random(semente)
+
+    def taxa(self, t):
+        return self.taxa_media_s
+
+    def proximo(self, t):
+        return t + self._rng.expovariate(self.taxa_media_s)
+
+
+class ProcessoDiurno:
+    """
+    Poisson não homogêneo: a taxa segue o perfil por hora do dia, com média
+    'taxa_media_s'. Gerado por afinamento (candidatas na taxa máxima,
+    aceitas com probabilidade taxa(t) / máxima). 'segundos_por_hora'
+    comprime o dia: 1 faz as 24 h passarem em 24 s.
+    """
+
+    def __init__(self, taxa_media_s, perfil=PERFIL_RESIDENCIAL, segundos_por_hora=3600.0, hora_inicial=0, semente=None):
+        if taxa_media_s <= 0 or len(perfil) != 24:
+            raise ValueError("Taxa precisa ser positiva e o perfil ter 24 horas.")
+        media = sum(perfil) / len(perfil)
+        self.taxa_media_s = taxa_media_s
+        self.segundos_por_hora = segundos_por_hora
+        self.hora_inicial = hora_inicial
+        self._fatores = [fator / media for fator in perfil]
+        self._taxa_maxima = taxa_media_s * max(self._fatores)
+        self._rng = random.Random(semente)
+
+    def taxa(self, t):
+        hora = int(self.hora_inicial + t / self.segundos_por_hora) % 24
+        return self.taxa_media_s * self._fatores[hora]
+
+    def proximo(self, t):
+        while True:
+            t += self._rng.expovariate(self._taxa_maxima)
+            if self._rng.random() * self._taxa_maxima <= self.taxa(t):
+                return t
+
+
+def criar_processo(padrao, taxa_s, semente=None, **opcoes):
+    if padrao == "poisson":
+        return ProcessoPoisson(taxa_s, semente)
+    if padrao == "diurno":
+        return ProcessoDiurno(taxa_s, semente=semente, **opcoes)
+    raise ValueError(f"Padrão de chegada desconhecido: {padrao}")
+
+
+# -------------------------------
+# Gerador
+# -------------------------------
+class GeradorCarga:
+    """
+    Dispara comandos (em luzes, tomadas, portas, persianas e cafeteiras) e
+    ativações de sensores nos instantes sorteados pelos processos. Cada
+    comando é escolhido entre os aceitos no estado atual do dispositivo.
+
+    A carga é de malha aberta: se o hub não acompanhar, as chegadas se
+    acumulam e aparecem como atraso em 'resposta' (fila + serviço), enquanto
+    'servico' mede só a execução do comando.
+    """
+
+    def __init__(self, frota, comandos, sensores=None, semente=42):
+        self.frota = frota
+        self._rng = random.Random(semente)
+        self._alvos = {
+            "comando": [d for d in frota if d.tipo != "SENSOR"],
+            "sensor": [d for d in frota if d.tipo == "SENSOR"],
+        }
+        self.processos = {nome: processo for nome, processo in (("comando", comandos), ("sensor", sensores))
+                          if processo is not None and self._alvos[nome]}
+
+    def _escolher(self, nome):
+        dispositivo = self._rng.choice(self._alvos[nome])
+        disponiveis = dispositivo.comandos_disponiveis()
+        return dispositivo, (self._rng.choice(disponiveis) if disponiveis else None)
+
+    def _chegadas(self, duracao_s):
+        fila = [(processo.proximo(0.0), nome) for nome, processo in self.processos.items()]
+        heapq.heapify(fila)
+        while fila and fila[0][0] < duracao_s:
+            previsto, nome = fila[0]
+            heapq.heapreplace(fila, (self.processos[nome].proximo(previsto), nome))
+            yield previsto, nome
+
+    def executar(self, duracao_s):
+        """Roda em tempo real por 'duracao_s' segundos e devolve vazão, latências e códigos."""
+
+        servico = {nome: Histograma() for nome in self.processos}
+        resposta = Histograma()
+        codigos = Counter()
+
+        inicio = time.perf_counter()
+        for previsto, nome in self._chegadas(duracao_s):
+            decorrido = time.perf_counter() - inicio
+            if decorrido >= duracao_s:
+                # saturado: o que chegaria depois do fim fica de fora
+                break
+            if previsto > decorrido:
+                time.sleep(previsto - decorrido)
+
+            dispositivo, comando = self._escolher(nome)
+            if comando is None:
+                codigos["SEM_COMANDO"] += 1
+                continue
+
+            t0 = time.perf_counter()
+            codigo = dispositivo.tentar_comando(comando)
+            t1 = time.perf_counter()
+
+            servico[nome].registrar(t1 - t0)
+            resposta.registrar(max(0.0, t1 - inicio - previsto))
+            codigos[codigo.name] += 1
+        duracao = time.perf_counter() - inicio
+
+        operacoes = sum(h.total for h in servico.values())
+        return {
+            "alvo_ops_s": sum(p.taxa_media_s for p in self.processos.values()),
+            "operacoes": operacoes,
+            "duracao_s": duracao,
+            "vazao_ops_s": operacoes / duracao if duracao else 0.0,
+            "servico": {nome: h.resumo() for nome, h in servico.items()},
+            "resposta": resposta.resumo(),
+            "codigos": dict(codigos),
+        }
+
+    def simular(self, duracao_s, inicio=None):
+        """
+        Mesmo fluxo de chegadas sem esperar o relógio: aplica os comandos e
+        devolve os eventos aceitos com timestamps simulados a partir de 'inicio'.
+        """
+        inicio = inicio or datetime(2025, 1, 1)
+        eventos = []
+        for previsto, nome in self._chegadas(duracao_s):
+            dispositivo, comando = self._escolher(nome)
+            if comando is not None and dispositivo.tentar_comando(comando) is CodigoComando.OK:
+                eventos.append({"id_dispositivo": dispositivo.id, "evento": comando,
+                                "timestamp": (inicio + timedelta(seconds=previsto)).isoformat()})
+        return eventos
+
+
+@logs_no_nivel("CRITICAL")
+def executar(n, taxa, duracao, padrao="poisson", taxa_sensores=None, segundos_por_hora=3600.0, hub=False,
+             salvar_eventos=None, caminho_config=None, semente=42):
+    frota = criar_frota(n, semente=semente)
+    if caminho_config:
+        salvar_config(frota, caminho_config)
+    conectado = conectar_hub(frota) if hub else None
+
+    opcoes = {"segundos_por_hora": segundos_por_hora} if padrao == "diurno" else {}
+    taxa_sensores = taxa / 4 if taxa_sensores is None else taxa_sensores
+    gerador = GeradorCarga(
+        frota,
+        criar_processo(padrao, taxa, semente, **opcoes),
+        criar_processo(padrao, taxa_sensores, semente + 1, **opcoes) if taxa_sensores else None,
+        semente=semente,
+    )
+
+    if salvar_eventos:
+        eventos = gerador.simular(duracao)
+        with open(salvar_eventos, "w", encoding="utf-8") as f:
+            json.dump(eventos, f)
+        print(f"{len(eventos):,} eventos simulados ({duracao:g} s, {n} dispositivos) salvos em '{salvar_eventos}'.")
+        resultado = {"eventos": len(eventos)}
+    else:
+        resultado = gerador.executar(duracao)
+        print(f"{'alvo':>9}: {resultado['alvo_ops_s']:>10,.0f} ops/s ({padrao}) | atingido "
+              f"{resultado['vazao_ops_s']:,.0f} ops/s em {resultado['duracao_s']:.1f} s | {resultado['operacoes']:,} operações")
+        for nome, r in list(resultado["servico"].items()) + [("resposta", resultado["resposta"])]:
+            print(f"{nome:>9}: {r['total']:>10,} | p50 {r['p50_ms']:7.3f} ms | p99 {r['p99_ms']:7.3f} ms | máx. {r['max_ms']:8.3f} ms")
+        print(f"{'códigos':>9}: {resultado['codigos']}")
+
+    if conectado:
+        encerrar_hub(conectado)
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=10000)
+    parser.add_argument("--taxa", type=float, default=1000.0, help="comandos/s (média, no padrão diurno)")
+    parser.add_argument("--taxa-sensores", type=float, help="ativações de sensor/s (padrão: taxa / 4; 0 desliga)")
+    parser.add_argument("--padrao", choices=("poisson", "diurno"), default="poisson")
+    parser.add_argument("--segundos-por-hora", type=float, default=3600.0, help="só no padrão diurno")
+    parser.add_argument("--duracao", type=float, default=10.0, help="segundos (reais, ou simulados com --salvar-eventos)")
+    parser.add_argument("--hub", action="store_true", help="liga a frota a um AutomacaoResidencial")
+    parser.add_argument("--salvar-eventos")
+    parser.add_argument("--salvar-config")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+    executar(args.n, args.taxa, args.duracao, args.padrao, args.taxa_sensores, args.segundos_por_hora, args.hub,
+             args.salvar_eventos, args.salvar_config, args.semente)
@@ -0,0 +1,222 @@
+"""
+Suíte de benchmarks dos caminhos quentes do hub, com resultado em JSON e
+comparação contra uma execução de referência (baseline).
+
+    python -m smart_home.benchmarks.suite --escala rapida --saida base.json
+    python -m smart_home.benchmarks.suite --escala rapida --baseline base.json --tolerancia 0.25
+
+Cada caso roda algumas vezes e guarda a mediana; a comparação usa o tempo
+por operação, e o processo sai com código 1 se algum caso ficou mais lento
+que a baseline além da tolerância.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from smart_home.benchmarks.bench_consumo import gerar_eventos
+from smart_home.benchmarks.comum import criar_hub, encerrar_hub
+from smart_home.benchmarks.gerador_carga import criar_frota
+from smart_home.core.cafeteira import Cafeteira
+from smart_home.core.luz import Luz
+from smart_home.core.persiana import Persiana
+from smart_home.core.porta import Port
+from smart_home.core.sensor import Sensor
+from smart_home.core.tomada import TomadaInteligente
+from smart_home.hub.consumo_tomada import calcular_consumo_tomada
+from smart_home.hub.observer import Observer, Subject
+from smart_home.utils.logs import logs_no_nivel
+
+CLASSES = (Luz, Port, TomadaInteligente, Sensor, Cafeteira, Persiana)
+
+ESCALAS = {
+    "rapida": {
+        "construcao": 20_000, "comandos": 50_000, "notify": 50_000, "rotinas": (100, 1_000),
+        "consumo": (10 ** 3, 10 ** 4, 10 ** 5), "frota": (1_000, 10_000), "repeticoes": 5,
+    },
+    "completa": {
+        "construcao": 200_000, "comandos": 500_000, "notify": 500_000, "rotinas": (100, 1_000, 10_000),
+        "consumo": (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7), "frota": (1_000, 10_000, 100_000), "repeticoes": 5,
+    },
+}
+
+
+# -------------------------------
+# Medição
+# -------------------------------
+def medir(funcao, operacoes, repeticoes, preparar=None):
+    """Roda preparar() (fora do tempo) + funcao(estado) 'repeticoes' vezes."""
+
+    tempos = []
+    for _ in range(repeticoes):
+        estado = preparar() if preparar else None
+        gc.collect()
+        inicio = time.perf_counter()
+        funcao(estado)
+        tempos.append(time.perf_counter() - inicio)
+
+    mediana = statistics.median(tempos)
+    return {"operacoes": operacoes, "repeticoes": repeticoes, "mediana_s": mediana,
+            "min_s": min(tempos), "ops_s": operacoes / mediana if mediana else 0.0}
+
+
+class _ObserverVazio(Observer):
+
+    sincrono = True
+
+    def update(self, subject, *args, **kwargs):
+        pass
+
+
+# -------------------------------
+# Casos
+# -------------------------------
+def casos_construcao(n, repeticoes):
+    for classe in CLASSES:
+        def construir(_, classe=classe):
+            for i in range(n):
+                classe(f"d_{i}", "Dispositivo")
+        yield f"construcao/{classe.__name__}", medir(construir, n, repeticoes)
+
+
+def casos_comandos(n, repeticoes):
+    def alternar(luz):
+        for i in range(n // 2):
+            luz.executar_comando("ligar")
+            luz.executar_comando("desligar")
+    yield "comandos/executar_comando", medir(alternar, n // 2 * 2, repeticoes, lambda: Luz("luz", "Luz"))
+
+
+def casos_notify(n, repeticoes):
+    for quantidade in (1, 10, 100):
+        subject = Subject()
+        for _ in range(quantidade):
+            subject.attach(_ObserverVazio())
+        # mesmo número de entregas em cada leque
+        notificacoes = max(1, n // quantidade)
+
+        def notificar(_, subject=subject):
+            for _ in range(notificacoes):
+                subject.notify(event="ligar")
+        yield f"notify/{quantidade}_observers", medir(notificar, notificacoes, repeticoes)
+
+
+def casos_rotinas(tamanhos, repeticoes):
+    for n in tamanhos:
+        ids = [f"disp_{i}" for i in range(n)]
+        rotinas = {
+            "ligar": {"nome": "Ligar", "acoes": [{"id_dispositivo": i, "comando": "ligar"} for i in ids]},
+            "desligar": {"nome": "Desligar", "acoes": [{"id_dispositivo": i, "comando": "desligar"} for i in ids]},
+        }
+        hub = criar_hub([Luz(i, i) for i in ids], rotinas)
+
+        def executar(_, hub=hub):
+            hub.executar_rotinas("ligar")
+            hub.executar_rotinas("desligar")
+        yield f"rotinas/{n}_dispositivos", medir(executar, 2 * n, repeticoes)
+        encerrar_hub(hub)
+
+
+def casos_consumo(tamanhos, repeticoes):
+    for n in tamanhos:
+        eventos, tomadas = gerar_eventos(n)
+        yield (f"consumo/{n}_eventos",
+               medir(lambda _: calcular_consumo_tomada(eventos, tomadas), n, repeticoes if n < 10 ** 6 else 1))
+        del eventos
+
+
+def casos_frota(tamanhos, repeticoes):
+    with tempfile.TemporaryDirectory() as pasta:
+        for n in tamanhos:
+            caminho = os.path.join(pasta, f"config_{n}.json")
+            hub = criar_hub(criar_frota(n))
+            yield f"frota/salvar_{n}", medir(lambda _: hub.salvar_dispositivos(caminho), n, repeticoes)
+            yield f"frota/carregar_{n}", medir(lambda _: hub.carregar_dispositivos(caminho), n, repeticoes)
+            encerrar_hub(hub)
+
+
+@logs_no_nivel("CRITICAL")
+def executar(escala="rapida", filtro=None, repeticoes=None):
+    parametros = ESCALAS[escala]
+    repeticoes = repeticoes or parametros["repeticoes"]
+
+    grupos = {
+        "construcao": lambda: casos_construcao(parametros["construcao"], repeticoes),
+        "comandos": lambda: casos_comandos(parametros["comandos"], repeticoes),
+        "notify": lambda: casos_notify(parametros["notify"], repeticoes),
+        "rotinas": lambda: casos_rotinas(parametros["rotinas"], repeticoes),
+        "consumo": lambda: casos_consumo(parametros["consumo"], repeticoes),
+        "frota": lambda: casos_frota(parametros["frota"], repeticoes),
+    }
+
+    casos = {}
+    for grupo, gerar in grupos.items():
+        if filtro and grupo not in filtro:
+            continue
+        for nome, resultado in gerar():
+            casos[nome] = resultado
+            print(f"{nome:>32}: {resultado['mediana_s'] * 1000:10.2f} ms (mín. {resultado['min_s'] * 1000:10.2f}) "
+                  f"| {resultado['ops_s']:>14,.0f} ops/s", flush=True)
+
+    return {
+        "meta": {"escala": escala, "repeticoes": repeticoes, "python": platform.python_version(),
+                 "plataforma": platform.platform(), "data": datetime.now().isoformat(timespec="seconds")},
+        "casos": casos,
+    }
+
+
+# -------------------------------
+# Baseline
+# -------------------------------
+def comparar(atual, baseline, tolerancia=0.25):
+    """Compara o tempo por operação de cada caso; devolve os nomes que regrediram."""
+
+    regressoes = []
+    print(f"\n--- Comparação com a baseline ({baseline['meta'].get('data', '?')}, tolerância {tolerancia:.0%}) ---")
+    for nome, caso in atual["casos"].items():
+        anterior = baseline["casos"].get(nome)
+        if anterior is None:
+            print(f"{nome:>32}: novo")
+            continue
+
+        razao = (caso["mediana_s"] / caso["operacoes"]) / (anterior["mediana_s"] / anterior["operacoes"])
+        if razao > 1 + tolerancia:
+            situacao = "REGRESSÃO"
+            regressoes.append(nome)
+        elif razao < 1 / (1 + tolerancia):
+            situacao = "melhorou"
+        else:
+            situacao = "ok"
+        print(f"{nome:>32}: {razao:6.2f}x o tempo da baseline | {situacao}")
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="rapida")
+    parser.add_argument("--grupos", nargs="+", help="só estes grupos (construcao, comandos, notify, ...)")
+    parser.add_argument("--repeticoes", type=int)
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    args = parser.parse_args()
+
+    resultados = executar(args.escala, args.grupos, args.repeticoes)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=4)
+        print(f"Resultados salvos em '{args.saida}'.")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressoes = comparar(resultados, json.load(f), args.tolerancia)
+        if regressoes:
+            print(f"{len(regressoes)} regressão(ões): {', '.join(regressoes)}")
+            sys.exit(1)
@@ -1,14 +1,22 @@
 # smart_home/cli/menu.py
 
+import atexit
 import json
+import os
+from collections import Counter
 from smart_home.core.porta import Port
 from smart_home.core.tomada import TomadaInteligente
+from smart_home.hub.armazenamento import ArmazenamentoEventos
 from smart_home.hub.automacao import AutomacaoResidencial
+from smart_home.hub.journal import JournalEventos
+from smart_home.hub.observer import ativar_despacho_assincrono, desativar_despacho_assincrono
 from smart_home.core.luz import CorRGB, ValidacaoAtributo, Luz
 from smart_home.core.sensor import Sensor
 from smart_home.core.cafeteira import Cafeteira
 from smart_home.core.persiana import Persiana
 from smart_home.utils.helpers import get_full_path
+from smart_home.utils.logs import configurar_logs, encerrar_logs
+from smart_home.utils.metricas import ativar_metricas
 
 
 def exibir_menu():
@@ -26,36 +34,86 @@ def exibir_menu():
     print("10 - Sair")
     print("11 - Criar rotina")
     print("12 - Exportar eventos para CSV")
+    print("13 - Executar comando em lote")
+    print("14 - Agendar comando")
+    print("15 - Exportar métricas (Prometheus)")
 
 
-def carregar_eventos():
+_armazenamento = None
 
-    caminho_eventos = get_full_path("data/eventos.json")
 
-    try:
+def obter_armazenamento():
+
+    """Banco de eventos compartilhado (data/eventos.db), fechado na saída do processo."""
+
+    global _armazenamento
+
+    if _armazenamento is None:
+
+        _armazenamento = ArmazenamentoEventos(get_full_path("data/eventos.db"))
+
+        atexit.register(_armazenamento.fechar)
+
+    return _armazenamento
+
+
+def migrar_eventos():
+
+    armazenamento = obter_armazenamento()
+
+    # migra o histórico antigo (journal em data/eventos/ ou data/eventos.json) na primeira carga
+    if armazenamento.total == 0:
 
-        with open(caminho_eventos, "r", encoding="utf-8") as f:
+        diretorio_journal = get_full_path("data/eventos")
 
-            return json.load(f)
+        caminho_legado = get_full_path("data/eventos.json")
 
-    except (FileNotFoundError, json.JSONDecodeError):
+        if os.path.isdir(diretorio_journal) and os.listdir(diretorio_journal):
 
-        return []
+            journal = JournalEventos(diretorio_journal)
 
+            armazenamento.anexar_lote(journal.iterar())
 
-def salvar_eventos(eventos):
+            journal.fechar()
 
-    """Salva eventos no arquivo JSON."""
+        else:
+
+            try:
 
-    caminho_eventos = get_full_path("data/eventos.json")
+                with open(caminho_legado, "r", encoding="utf-8") as f:
 
-    with open(caminho_eventos, "w", encoding="utf-8") as f:
+                    armazenamento.anexar_lote(json.load(f))
 
-        json.dump(eventos, f, indent=4, ensure_ascii=False)
+            except (FileNotFoundError, json.JSONDecodeError):
+
+                pass
 
 
 def main():
 
+    # no menu interativo as mensagens precisam sair antes do próximo prompt,
+    # então aqui o handler é síncrono; serviços usam a fila (assincrono=True)
+    configurar_logs("INFO", assincrono=False)
+    atexit.register(encerrar_logs)
+
+    # latências por comando/observer/rotina; SMART_HOME_METRICAS_PORTA também expõe /metrics
+    metricas = ativar_metricas()
+
+    porta_metricas = os.environ.get("SMART_HOME_METRICAS_PORTA")
+
+    if porta_metricas:
+
+        metricas.servir_http(int(porta_metricas))
+
+    # observers (regras, rotinas) fora da transição; SMART_HOME_DESPACHO = bloquear, descartar_antigo ou coalescer
+    politica_despacho = os.environ.get("SMART_HOME_DESPACHO")
+
+    if politica_despacho:
+
+        ativar_despacho_assincrono(politica=politica_despacho, trabalhadores=4)
+
+        atexit.register(desativar_despacho_assincrono)
+
     try:
 
         caminho_config = get_full_path("config/config_exemplo.json")
@@ -70,8 +128,31 @@ def main():
 
         return
 
-    # eventos ficam persistidos em arquivo
-    eventos_log = carregar_eventos()
+    # eventos ficam persistidos no banco; o histórico é lido sob demanda, nunca inteiro
+    migrar_eventos()
+
+    # contadores de energia: último checkpoint + eventos gravados depois dele
+    caminho_agregados = get_full_path("data/agregados_energia.json")
+
+    automacao.restaurar_agregados(obter_armazenamento(), caminho_agregados)
+
+    # todo evento de estado (menu, lote, rotinas, regras, agendas) é gravado pelo hub
+    automacao.registrar_eventos(obter_armazenamento())
+
+    # checkpoint já na posição atual: a retenção só apaga eventos que estão num checkpoint
+    automacao.salvar_checkpoint_agregados(caminho_agregados)
+
+    atexit.register(automacao.salvar_checkpoint_agregados, caminho_agregados)
+
+    # eventos antigos viram séries por hora/dia numa thread de fundo
+    atexit.register(automacao.iniciar_retencao(obter_armazenamento()).fechar)
+
+    # rotinas com "agenda" e comandos com atraso
+    agendador = automacao.iniciar_agendador()
+
+    agendador.a_cada(300, lambda: automacao.salvar_checkpoint_agregados(caminho_agregados), nome="checkpoint_agregados")
+
+    atexit.register(agendador.fechar)
 
     while True:
 
@@ -119,35 +200,19 @@ def main():
 
                 continue
 
-            # Mapear comandos por tipo
+            # comandos vêm da tabela de transições da classe do dispositivo
 
-            comandos_por_tipo = {
-
-                "LUZ": ["ligar", "desligar"],
-
-                "PORTA": ["abrir", "trancar"],
-
-                "TOMADA": ["ligar", "desligar"],
-
-                "CAFETEIRA": ["ligar", "desligar"],
-
-                "PERSIANA": ["abrir", "fechar", "parar"],
-
-                "SENSOR": ["ativar", "desativar"]
-
-            }
-
-            comandos_validos = comandos_por_tipo.get(dispositivo.tipo, [])
+            comandos_validos = list(dispositivo.machine.gatilhos)
 
             print(f"Dispositivo selecionado: {dispositivo.nome} ({dispositivo.tipo})")
 
-            if comandos_validos:
+            print(f"Comandos suportados: {', '.join(comandos_validos)}")
 
-                print(f"Comandos suportados: {', '.join(comandos_validos)}")
+            print(f"Disponíveis no estado '{dispositivo.state}': {', '.join(dispositivo.comandos_disponiveis()) or 'nenhum'}")
 
             comando = input("Digite o comando: ").lower()
 
-            if comandos_validos and comando not in comandos_validos:
+            if comando not in comandos_validos:
 
                 print(f"[ERRO] Comando inválido para {dispositivo.tipo}.")
 
@@ -155,24 +220,10 @@ def main():
 
             try:
 
-                dispositivo.executar_comando(comando)
-
-                # cria evento e adiciona no log
+                # recusas (estado inválido, condição) já são reportadas pelo dispositivo
 
-                evento = {
-
-                    "id_dispositivo": id_dispositivo,
-
-                    "evento": comando,
-
-                    "timestamp": dispositivo.ultimo_evento.isoformat() if hasattr(dispositivo,"ultimo_evento") else "N/A"
-                }
-
-                eventos_log.append(evento)
-
-                salvar_eventos(eventos_log)
-
-                print(f"[INFO] Comando '{comando}' executado em '{dispositivo.nome}'.")
+                # o evento é gravado pelo registrador do hub
+                dispositivo.executar_comando(comando)
 
             except Exception as e:
 
@@ -314,7 +365,13 @@ def main():
 
                 id_rotina = input("Digite o ID da rotina: ")
 
-                automacao.executar_rotinas(id_rotina)
+                resultados = automacao.executar_rotinas(id_rotina)
+
+                for r in resultados:
+
+                    situacao = "OK" if r.sucesso else f"ERRO ({r.erro})"
+
+                    print(f"> {r.comando} em {r.id_dispositivo}: {situacao} [{r.duracao_s * 1000:.1f} ms]")
 
         elif opcao == "6":
 
@@ -326,7 +383,8 @@ def main():
 
         elif opcao == "7":
 
-            automacao.salvar_dispositivos(get_full_path("config/config_exemplo.json"))
+            # grava só o que mudou; a base é reescrita quando o log de alterações cresce
+            automacao.salvar_alteracoes(get_full_path("config/config_exemplo.json"), get_full_path("config/rotinas.json"))
 
         elif opcao == "8":
 
@@ -379,6 +437,7 @@ def main():
             automacao.remover_dispositivo(id_dispositivo)
 
         elif opcao == "10":
+            automacao.salvar_checkpoint_agregados(caminho_agregados)
             print("Saindo...")
             break
 
@@ -410,23 +469,39 @@ def main():
 
             else:
 
-                automacao.rotinas[id_rotina] = {
+                nova_rotina = {
 
                     "nome": nome_rotina,
                     "acoes": acoes
                 }
 
-                caminho_rotinas = get_full_path("config/rotinas.json")
+                quando = input("Evento que dispara a rotina (ENTER para nenhum): ").strip()
 
-                with open(caminho_rotinas, "w", encoding="utf-8") as f:
+                if quando:
 
-                    json.dump(automacao.rotinas, f, indent=4, ensure_ascii=False)
+                    nova_rotina["quando"] = quando
+
+                    origem = input("ID do dispositivo de origem (ENTER para qualquer): ").strip()
+
+                    if origem:
+
+                        nova_rotina["origem"] = origem
+
+                agenda = input("Agenda cron (ex: 0 23 * * *, ENTER para nenhuma): ").strip()
+
+                if agenda:
+
+                    nova_rotina["agenda"] = {"cron": agenda}
+
+                automacao.adicionar_rotina(id_rotina, nova_rotina)
+
+                automacao.salvar_alteracoes(caminho_rotinas=get_full_path("config/rotinas.json"))
 
                 print(f"[INFO] Rotina '{nome_rotina}' criada e salva em rotinas.json.")
 
         elif opcao == "12":
 
-            if not eventos_log:
+            if obter_armazenamento().vazio():
 
                 print("[INFO] Nenhum evento registrado até agora.")
 
@@ -436,7 +511,50 @@ def main():
 
                 caminho_csv = get_full_path(f"data/{nome_arquivo}")
 
-                automacao.exportar_eventos_csv(eventos_log, caminho_csv)
+                id_filtro = input("ID do dispositivo (ENTER para todos): ").strip() or None
+
+                # consulta indexada no banco, lida em streaming
+                automacao.exportar_eventos_csv(obter_armazenamento(), caminho_csv, dispositivos=id_filtro)
+
+        elif opcao == "13":
+
+            print("\n--- Comando em Lote ---")
+
+            tipo = input("Tipo (vazio = todos): ").strip().upper() or None
+
+            estado = input("Estado atual (vazio = qualquer): ").strip() or None
+
+            comando = input("Digite o comando: ").strip().lower()
+
+            codigos = automacao.executar_em_lote({"tipo": tipo, "estado": estado}, comando)
+
+            resumo = Counter(codigo.name for codigo in codigos.values())
+
+            print(f"[INFO] Resultado: {dict(resumo) or 'nenhum dispositivo selecionado'}")
+
+        elif opcao == "14":
+
+            id_dispositivo = input("Digite o ID do dispositivo: ")
+
+            comando = input("Digite o comando: ").strip().lower()
+
+            try:
+
+                minutos = float(input("Executar daqui a quantos minutos?: "))
+
+                automacao.agendar_comando(id_dispositivo, comando, minutos * 60)
+
+                print(f"[INFO] '{comando}' em '{id_dispositivo}' agendado para daqui a {minutos:g} min.")
+
+            except ValueError as e:
+
+                print(f"[ERRO] {e}")
+
+        elif opcao == "15":
+
+            nome_arquivo = input("Digite o nome do arquivo (ex: metricas.prom): ").strip() or "metricas.prom"
+
+            metricas.salvar_prometheus(get_full_path(f"data/{nome_arquivo}"))
 
         else:
 
@@ -1,33 +1,42 @@
 from .dispositivo_base import DispositivoBase
-from datetime import datetime
+from smart_home.hub import relogio
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
 
 class Cafeteira(DispositivoBase):
+    __slots__ = ("_momento_ligado",)
+
+    ESTADOS = ["desligada", "ligada", "preparando"]
+    ESTADO_INICIAL = "desligada"
+
+    # Definindo as transições
+    TRANSICOES = [
+        {"trigger": "ligar", "source": "desligada", "dest": "ligada", "after": "_on_ligar"},
+        {"trigger": "desligar", "source": ["ligada", "preparando"], "dest": "desligada", "after": "_on_desligar"},
+        {"trigger": "preparar", "source": "ligada", "dest": "preparando", "after": "_on_preparar"},
+    ]
+
     def __init__(self, id_dispositivo, nome):
-        estados = ["desligada", "ligada", "preparando"]
-        super().__init__(id_dispositivo, nome, tipo="CAFETEIRA", estados=estados, estado_inicial="desligada")
+        super().__init__(id_dispositivo, nome, tipo="CAFETEIRA")
 
         self._momento_ligado = None
 
-        # Definindo as transições
-        self.machine.add_transition("ligar", "desligada", "ligada", after="_on_ligar")
-        self.machine.add_transition("desligar", ["ligada", "preparando"], "desligada", after="_on_desligar")
-        self.machine.add_transition("preparar", "ligada", "preparando", after="_on_preparar")
-
     def _on_ligar(self):
-        self._momento_ligado = datetime.utcnow()
-        self.notify(event="ligar", detalhes=self.detalhes())
-        print(f"[INFO] Cafeteira {self.nome} ligada")
+        self._momento_ligado = relogio.atual.timestamp()
+        self.notificar_evento("ligar")
+        logger.info("Cafeteira %s ligada", self.nome)
 
     def _on_desligar(self):
         self._momento_ligado = None
-        self.notify(event="desligar", detalhes=self.detalhes())
-        print(f"[INFO] Cafeteira {self.nome} desligada")
+        self.notificar_evento("desligar")
+        logger.info("Cafeteira %s desligada", self.nome)
 
     def _on_preparar(self):
-        self.notify(event="preparar", detalhes=self.detalhes())
-        print(f"[INFO] Cafeteira {self.nome} iniciou o preparo do café")
+        self.notificar_evento("preparar")
+        logger.info("Cafeteira %s iniciou o preparo do café", self.nome)
 
-    def detalhes(self):
+    def _detalhes_fixos(self):
         return {
             "id": self.id,
             "nome": self.nome,
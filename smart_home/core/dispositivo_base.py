@@ -1,51 +1,229 @@
+import threading
+import time
 from abc import ABC, abstractmethod
-from transitions import Machine
+from collections.abc import Mapping
+from datetime import datetime
 from smart_home.hub.observer import Subject
-from typing import Any, List
+from smart_home.hub import relogio, state_machine
+from smart_home.hub.state_machine import CodigoComando, TabelaTransicoes, criar_gatilho
+from typing import Any, Dict, List, Optional
+from smart_home.utils import metricas
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
+
+
+class Detalhes(Mapping):
+    """
+    Detalhes de um dispositivo numa versão. Os campos fixos são montados uma
+    vez por versão; os campos vivos (ex.: consumo parcial de uma tomada
+    ligada) são calculados só quando lidos. Somente leitura: a mesma
+    instância serve a todos os leitores até a próxima alteração.
+    """
+
+    __slots__ = ("versao", "_fixos", "_vivos", "_dispositivo")
+
+    def __init__(self, dispositivo, versao, fixos, vivos):
+        self.versao = versao
+        self._fixos = fixos
+        self._vivos = vivos
+        self._dispositivo = dispositivo
+
+    def __getitem__(self, chave):
+        if chave in self._fixos:
+            return self._fixos[chave]
+        return getattr(self._dispositivo, self._vivos[chave])()
+
+    def __iter__(self):
+        yield from self._fixos
+        yield from self._vivos
+
+    def __len__(self):
+        return len(self._fixos) + len(self._vivos)
+
+    def como_dict(self):
+        """Cópia em dict comum (para JSON), com os campos vivos calculados agora."""
+
+        if not self._vivos:
+            return dict(self._fixos)
+        return {**self._fixos, **{campo: getattr(self._dispositivo, metodo)() for campo, metodo in self._vivos.items()}}
+
+    def __repr__(self):
+        return repr(self.como_dict())
+
+
+def _callbacks(transicao):
+    after = transicao.get("after") or []
+    return [after] if isinstance(after, str) else list(after)
+
 
 class DispositivoBase(ABC, Subject):
+    # sem __dict__ por instância: cada dispositivo ocupa só os slots declarados
+    __slots__ = ("id", "_nome", "tipo", "state", "ultimo_evento", "_versao", "_cache_detalhes", "_trava")
+
     state: Any
 
-    def __init__(self, id_dispositivo: str, nome: str, tipo: str, estados: List[str], estado_inicial: str):
+    # cada subclasse declara seus estados e transições; a tabela é compilada
+    # uma vez por classe (em __init_subclass__) e compartilhada pelas instâncias
+    ESTADOS: List[str] = []
+    ESTADO_INICIAL: Optional[str] = None
+    TRANSICOES: List[dict] = []
+    machine: TabelaTransicoes
+
+    # campo de detalhes -> método que o calcula na hora da leitura
+    CAMPOS_VIVOS: Dict[str, str] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        if "TRANSICOES" not in cls.__dict__:
+            return
+
+        # toda transição invalida os detalhes antes dos callbacks da classe,
+        # que já notificam com os detalhes da nova versão
+        transicoes = [dict(t, after=["invalidar_detalhes", *_callbacks(t)]) for t in cls.TRANSICOES]
+        cls.machine = TabelaTransicoes(cls.ESTADOS, cls.ESTADO_INICIAL, transicoes)
+        for gatilho in cls.machine.gatilhos:
+            if not hasattr(cls, gatilho):
+                setattr(cls, gatilho, criar_gatilho(gatilho))
+
+    def __init__(self, id_dispositivo: str, nome: str, tipo: str, estado_inicial: Optional[str] = None):
         super().__init__()
         self.id = id_dispositivo
-        self.nome = nome
+        self._nome = nome
         self.tipo = tipo
-        self._estados = estados
-        self._estado_inicial = estado_inicial
-        self.machine = Machine(model=self, states=estados, initial=estado_inicial)
+        self.state = estado_inicial or self.machine.estado_inicial
+        self.ultimo_evento: Optional[datetime] = None
+        self._versao = 0
+        self._cache_detalhes: Optional[Detalhes] = None
+        # transições deste dispositivo (ver TabelaTransicoes)
+        self._trava = threading.RLock()
+
+    @property
+    def nome(self):
+        return self._nome
+
+    @nome.setter
+    def nome(self, nome):
+        # o nome está nos detalhes em cache
+        self._nome = nome
+        self.invalidar_detalhes()
 
     def get_estado(self):
         return self.state
 
-    def executar_comando(self, comando):
+    def restaurar_estado(self, estado):
+        """Aplica um estado salvo sem rodar transição, callbacks ou observers."""
 
+        if estado not in self.machine.estados:
+            raise ValueError(f"Estado '{estado}' inválido para {self.tipo}")
+        with self._trava:
+            self.state = estado
+            self.invalidar_detalhes()
+
+    def pode_executar(self, comando):
+        """Consulta a tabela da classe: o comando é aceito no estado atual?"""
+
+        return self.machine.pode(self.state, comando)
+
+    def comandos_disponiveis(self):
+        return self.machine.gatilhos_em(self.state)
+
+    def tentar_comando(self, comando):
+
+        """Executa o gatilho 'comando' e devolve um CodigoComando; não levanta exceção."""
+
+        # métricas desligadas: só esta leitura e as comparações com None
+        registro = metricas.registro
+        inicio = time.perf_counter() if registro is not None else 0.0
+
+        # a tabela checa (estado, comando) antes de rodar condições e callbacks;
+        # só um callback com defeito chega ao except
         try:
 
-            metodo = getattr(self, comando)
+            codigo = self.machine.tentar(self, comando)
+
+        except Exception as e:
+
+            logger.error("Falha ao executar '%s' em '%s': %s", comando, self.nome, e)
+            codigo = CodigoComando.ERRO
 
-            if callable(metodo):
+        else:
 
-                metodo()
-                print(f"[INFO] Comando '{comando}' executado em '{self.nome}'.")
+            if codigo is state_machine.OK:
+
+                self.ultimo_evento = relogio.atual.agora()
+                logger.info("Comando '%s' executado em '%s'.", comando, self.nome)
+
+            elif codigo is state_machine.CONDICAO_FALHOU:
+
+                logger.error("Condição não satisfeita para '%s' em '%s'.", comando, self.nome)
+
+            elif codigo is state_machine.COMANDO_INEXISTENTE:
+
+                logger.error("O comando '%s' não existe para o dispositivo '%s'.", comando, self.nome)
 
             else:
 
-                print(f"[ERRO] '{comando}' não é um comando válido para '{self.nome}'.")
+                logger.error(
+                    "O comando '%s' não pode ser executado no estado atual ('%s') do dispositivo '%s'.",
+                    comando, self.state, self.nome
+                )
 
-        except AttributeError:
+        if registro is not None:
 
-            print(f"[ERRO] O comando '{comando}' não existe para o dispositivo '{self.nome}'.")
+            # o comando vem do usuário: os inexistentes dividem um rótulo só, senão cada erro de digitação vira uma série
+            if codigo is state_machine.COMANDO_INEXISTENTE:
+                comando = "invalido"
+            registro.histograma("smart_home_comando_segundos", tipo=self.tipo, comando=comando).registrar(
+                time.perf_counter() - inicio)
+            registro.contador("smart_home_comandos_total", tipo=self.tipo, comando=comando, codigo=codigo.name).incrementar()
 
-        except Exception as e:
+        return codigo
 
-            # Mensagem de erro mais clara baseada no estado atual
+    def executar_comando(self, comando):
 
-            print(
-                f"[ERRO] O comando '{comando}' não pode ser executado "
-                f"no estado atual ('{self.state}') do dispositivo '{self.nome}'."
-            )
+        """Executa o gatilho 'comando'; devolve True se a transição aconteceu."""
+
+        return self.tentar_comando(comando) is state_machine.OK
+
+    # -------------------------------
+    # Detalhes
+    # -------------------------------
+    @property
+    def versao(self):
+        return self._versao
+
+    def invalidar_detalhes(self):
+        """Chamado a cada transição e atributo alterado: a próxima leitura monta uma nova versão."""
+
+        self._versao += 1
+        self._cache_detalhes = None
+
+    def notify(self, *args, **kwargs):
+        # dentro de uma transição a entrega espera a trava do dispositivo ser solta
+        adiadas = state_machine.notificacoes_adiadas()
+        if adiadas is None:
+            Subject.notify(self, *args, **kwargs)
+        else:
+            adiadas.append((Subject.notify, (self, *args), kwargs))
+
+    def notificar_evento(self, evento, **kwargs):
+        # sem observers os detalhes nem são montados; com eles, a versão montada
+        # aqui é a mesma que listar/salvar/relatórios vão ler depois
+        if self._observers:
+            detalhes = self.detalhes()
+            if Subject.despachante is not None:
+                # entregue depois: os campos vivos valem o que valiam no evento
+                detalhes = detalhes.como_dict()
+            self.notify(event=evento, detalhes=detalhes, **kwargs)
 
-    @abstractmethod
     def detalhes(self):
-        pass
+        cache = self._cache_detalhes
+        if cache is None:
+            cache = self._cache_detalhes = Detalhes(self, self._versao, self._detalhes_fixos(), self.CAMPOS_VIVOS)
+        return cache
+
+    @abstractmethod
+    def _detalhes_fixos(self):
+        """Campos que só mudam com estado ou atributos (os vivos ficam em CAMPOS_VIVOS)."""
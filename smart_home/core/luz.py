@@ -1,6 +1,9 @@
 from .dispositivo_base import DispositivoBase
 from enum import Enum
-from datetime import datetime
+from smart_home.hub import relogio
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
 
 
 class CorRGB(Enum):
@@ -23,29 +26,34 @@ class ValidacaoAtributo(Exception):
     pass
 
 class Luz(DispositivoBase):
+    __slots__ = ("_brilho", "_cor", "_momento_ligado")
+
+    ESTADOS = ["ligada", "desligada"]
+    ESTADO_INICIAL = "desligada"
+    TRANSICOES = [
+        {"trigger": "ligar", "source": "desligada", "dest": "ligada", "after": "_on_ligar"},
+        {"trigger": "desligar", "source": "ligada", "dest": "desligada", "after": "_on_desligar"},
+    ]
+
     def __init__(self, id_dispositivo, nome, brilho=100, cor=CorRGB.WHITE):
-        estados = ["ligada", "desligada"]
-        super().__init__(id_dispositivo, nome, tipo="LUZ", estados=estados, estado_inicial="desligada")
+        super().__init__(id_dispositivo, nome, tipo="LUZ")
 
         self._brilho = None
         self._cor = None
         self._momento_ligado = None
 
-        self.machine.add_transition("ligar", "desligada", "ligada", after="_on_ligar")
-        self.machine.add_transition("desligar", "ligada", "desligada", after="_on_desligar")
-
         self._brilho = brilho
         self._cor = cor
 
     def _on_ligar(self):
-        self._momento_ligado = datetime.utcnow()
-        self.notify(event="ligar", detalhes=self.detalhes())
-        print(f"[INFO] Luz {self.nome} ligada")
+        self._momento_ligado = relogio.atual.timestamp()
+        self.notificar_evento("ligar")
+        logger.info("Luz %s ligada", self.nome)
 
     def _on_desligar(self):
         self._momento_ligado = None
-        self.notify(event="desligar", detalhes=self.detalhes())
-        print(f"[INFO] Luz {self.nome} desligada")
+        self.notificar_evento("desligar")
+        logger.info("Luz %s desligada", self.nome)
 
     @property
     def brilho(self):
@@ -56,7 +64,9 @@ class Luz(DispositivoBase):
         if not isinstance(valor, int) or not (0 <= valor <= 100):
             raise ValidacaoAtributo(f"Brilho inválido: {valor}")
         self._brilho = valor
-        print(f"[INFO] Brilho ajustado para {valor}%")
+        self.invalidar_detalhes()
+        self.notify(event='atributo', detalhes={"brilho": valor})
+        logger.info("Brilho ajustado para %s%%", valor)
 
     @property
     def cor(self):
@@ -67,9 +77,11 @@ class Luz(DispositivoBase):
         if not isinstance(cor, CorRGB):
             raise ValidacaoAtributo(f"Cor inválida: {cor}")
         self._cor = cor
-        print(f"[INFO] Cor definida para {cor.name}")
+        self.invalidar_detalhes()
+        self.notify(event='atributo', detalhes={"cor": cor.name})
+        logger.info("Cor definida para %s", cor.name)
 
-    def detalhes(self):
+    def _detalhes_fixos(self):
         return {
             "id": self.id,
             "nome": self.nome,
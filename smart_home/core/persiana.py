@@ -1,27 +1,35 @@
 from .dispositivo_base import DispositivoBase
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
 
 class Persiana(DispositivoBase):
-    def __init__(self, id_dispositivo, nome):
-        estados = ["fechada", "aberta", "entreaberta"]
-        super().__init__(id_dispositivo, nome, tipo="PERSIANA", estados=estados, estado_inicial="fechada")
+    __slots__ = ()
 
-        self.machine.add_transition("abrir", "fechada", "aberta", after="_on_abrir")
-        self.machine.add_transition("fechar", ["aberta", "entreaberta"], "fechada", after="_on_fechar")
-        self.machine.add_transition("parar", "aberta", "entreaberta", after="_on_parar")
+    ESTADOS = ["fechada", "aberta", "entreaberta"]
+    ESTADO_INICIAL = "fechada"
+    TRANSICOES = [
+        {"trigger": "abrir", "source": "fechada", "dest": "aberta", "after": "_on_abrir"},
+        {"trigger": "fechar", "source": ["aberta", "entreaberta"], "dest": "fechada", "after": "_on_fechar"},
+        {"trigger": "parar", "source": "aberta", "dest": "entreaberta", "after": "_on_parar"},
+    ]
+
+    def __init__(self, id_dispositivo, nome):
+        super().__init__(id_dispositivo, nome, tipo="PERSIANA")
 
     def _on_abrir(self):
-        self.notify(event="abrir", detalhes=self.detalhes())
-        print(f"[INFO] Persiana {self.nome} aberta")
+        self.notificar_evento("abrir")
+        logger.info("Persiana %s aberta", self.nome)
 
     def _on_fechar(self):
-        self.notify(event="fechar", detalhes=self.detalhes())
-        print(f"[INFO] Persiana {self.nome} fechada")
+        self.notificar_evento("fechar")
+        logger.info("Persiana %s fechada", self.nome)
 
     def _on_parar(self):
-        self.notify(event="parar", detalhes=self.detalhes())
-        print(f"[INFO] Persiana {self.nome} entreaberta")
+        self.notificar_evento("parar")
+        logger.info("Persiana %s entreaberta", self.nome)
 
-    def detalhes(self):
+    def _detalhes_fixos(self):
         return {
             "id": self.id,
             "nome": self.nome,
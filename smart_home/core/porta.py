@@ -1,68 +1,63 @@
 from .dispositivo_base import DispositivoBase
 from smart_home.hub.observer import Subject
+from smart_home.hub.state_machine import TransicaoInvalida
+from smart_home.utils.logs import obter_logger
 
-class TransicaoInvalida(Exception):
-    pass
+logger = obter_logger(__name__)
 
 class Port(DispositivoBase, Subject):
 
-    def __init__(self, id_dispositivo, nome):
-
-        estados = ['trancada', 'destrancada', 'aberta']
+    __slots__ = ()
+
+    ESTADOS = ['trancada', 'destrancada', 'aberta']
+    ESTADO_INICIAL = 'destrancada'
+    TRANSICOES = [
+        {'trigger': 'abrir', 'source': 'destrancada', 'dest': 'aberta', 'after': '_on_abrir'},
+        {'trigger': 'fechar', 'source': 'aberta', 'dest': 'destrancada', 'after': '_on_fechar'},
+        {'trigger': 'destrancar', 'source': 'trancada', 'dest': 'destrancada', 'after': '_on_destrancar'},
+        {'trigger': 'trancar', 'source': 'destrancada', 'dest': 'trancada', 'conditions': ['pode_trancar'], 'after': '_on_trancar'},
+    ]
+
+    MENSAGENS_INVALIDAS = {
+        ('abrir', 'trancada'): "Porta está trancada, não pode abrir. Primeiro destranque.",
+        ('abrir', 'aberta'): "Porta já está aberta.",
+        ('fechar', 'destrancada'): "Porta já está fechada (destrancada).",
+        ('fechar', 'trancada'): "Porta já está fechada e trancada.",
+        ('trancar', 'aberta'): "Porta aberta, não pode trancar.",
+        ('trancar', 'trancada'): "Porta já está trancada.",
+        ('destrancar', 'destrancada'): "Porta já está destrancada.",
+        ('destrancar', 'aberta'): "Porta aberta não precisa ser destrancada.",
+    }
 
-        super().__init__(id_dispositivo, nome, tipo='PORTA', estados=estados, estado_inicial='destrancada')
+    def __init__(self, id_dispositivo, nome):
 
-        self.machine.add_transition('abrir', 'destrancada', 'aberta', after='_on_abrir')
-        self.machine.add_transition('fechar', 'aberta', 'destrancada', after='_on_fechar')
-        self.machine.add_transition('destrancar', 'trancada', 'destrancada', after='_on_destrancar')
-        self.machine.add_transition('trancar', 'destrancada', 'trancada', conditions=['pode_trancar'], after='_on_trancar')
+        super().__init__(id_dispositivo, nome, tipo='PORTA')
 
     def abrir(self):
 
-        if self.state == 'trancada':
-
-            raise Exception("Porta está trancada, não pode abrir. Primeiro destranque.")
-
-        elif self.state == 'aberta':
-
-            raise Exception("Porta já está aberta.")
-
-        self.machine.abrir()
+        return self._disparar('abrir')
 
     def fechar(self):
-        if self.state == 'destrancada':
 
-            raise Exception("Porta já está fechada (destrancada).")
-
-        elif self.state == 'trancada':
-
-            raise Exception("Porta já está fechada e trancada.")
-
-        self.machine.fechar()
+        return self._disparar('fechar')
 
     def trancar(self):
 
-        if self.state == 'aberta':
-
-            raise Exception("Porta aberta, não pode trancar.")
-
-        elif self.state == 'trancada':
-
-            raise Exception("Porta já está trancada.")
-
-        self.machine.trancar()
+        return self._disparar('trancar')
 
     def destrancar(self):
 
-        if self.state == 'destrancada':
+        return self._disparar('destrancar')
 
-            raise Exception("Porta já está destrancada.")
+    def _disparar(self, gatilho):
 
-        elif self.state == 'aberta':
+        # chamadas diretas (porta.abrir()) mantêm as mensagens da porta;
+        # executar_comando consulta a tabela antes e nunca chega aqui com estado inválido
+        if not self.machine.pode(self.state, gatilho):
 
-            raise Exception("Porta aberta não precisa ser destrancada.")
+            raise TransicaoInvalida(self.MENSAGENS_INVALIDAS.get((gatilho, self.state), f"Não é possível {gatilho} a porta."))
 
-        self.machine.destrancar()
+        return self.machine.disparar(self, gatilho)
 
     def pode_trancar(self):
 
@@ -70,26 +65,26 @@ class Port(DispositivoBase, Subject):
 
     def _on_abrir(self):
 
-        self.notify(event='abrir', detalhes=self.detalhes())
+        self.notificar_evento('abrir')
 
-        print("[INFO] Porta aberta")
+        logger.info("Porta %s aberta", self.nome)
 
     def _on_fechar(self):
 
-        self.notify(event='fechar', detalhes=self.detalhes())
-        print("[INFO] Porta fechada")
+        self.notificar_evento('fechar')
+        logger.info("Porta %s fechada", self.nome)
 
     def _on_destrancar(self):
 
-        self.notify(event='destrancar', detalhes=self.detalhes())
-        print("[INFO] Porta destrancada")
+        self.notificar_evento('destrancar')
+        logger.info("Porta %s destrancada", self.nome)
 
     def _on_trancar(self):
 
-        self.notify(event='trancar', detalhes=self.detalhes())
-        print("[INFO] Porta trancada")
+        self.notificar_evento('trancar')
+        logger.info("Porta %s trancada", self.nome)
 
-    def detalhes(self):
+    def _detalhes_fixos(self):
 
         return {
 
@@ -1,26 +1,34 @@
 from .dispositivo_base import DispositivoBase
-from datetime import datetime
+from smart_home.hub import relogio
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
 
 class Sensor(DispositivoBase):
+    __slots__ = ("_ultimo_ativado",)
+
+    ESTADOS = ["inativo", "ativo"]
+    ESTADO_INICIAL = "inativo"
+    TRANSICOES = [
+        {"trigger": "ativar", "source": "inativo", "dest": "ativo", "after": "_on_ativar"},
+        {"trigger": "desativar", "source": "ativo", "dest": "inativo", "after": "_on_desativar"},
+    ]
+
     def __init__(self, id_dispositivo, nome):
-        estados = ["inativo", "ativo"]
-        super().__init__(id_dispositivo, nome, tipo="SENSOR", estados=estados, estado_inicial="inativo")
+        super().__init__(id_dispositivo, nome, tipo="SENSOR")
 
         self._ultimo_ativado = None
 
-        self.machine.add_transition("ativar", "inativo", "ativo", after="_on_ativar")
-        self.machine.add_transition("desativar", "ativo", "inativo", after="_on_desativar")
-
     def _on_ativar(self):
-        self._ultimo_ativado = datetime.utcnow()
-        self.notify(event="ativar", detalhes=self.detalhes())
-        print(f"[INFO] Sensor {self.nome} ativado")
+        self._ultimo_ativado = relogio.atual.agora()
+        self.notificar_evento("ativar")
+        logger.info("Sensor %s ativado", self.nome)
 
     def _on_desativar(self):
-        self.notify(event="desativar", detalhes=self.detalhes())
-        print(f"[INFO] Sensor {self.nome} desativado")
+        self.notificar_evento("desativar")
+        logger.info("Sensor %s desativado", self.nome)
 
-    def detalhes(self):
+    def _detalhes_fixos(self):
         return {
             "id": self.id,
             "nome": self.nome,
@@ -1,8 +1,11 @@
 from .dispositivo_base import DispositivoBase
-from datetime import datetime
 from typing import Optional
 
+from ..hub import relogio
 from ..hub.observer import Subject
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
 
 
 class ValidacaoAtribute(Exception):
@@ -11,18 +14,26 @@ class ValidacaoAtribute(Exception):
 
 class TomadaInteligente(DispositivoBase, Subject):
 
-    def __init__(self, id_dispositivo, nome, potencia_W=100):
+    __slots__ = ("_potencia_W", "_consumo_wh", "_momento_ligado")
+
+    ESTADOS = ['ligada', 'desligada']
+    ESTADO_INICIAL = 'desligada'
+    TRANSICOES = [
+        {'trigger': 'ligar', 'source': 'desligada', 'dest': 'ligada', 'after': '_registrar_inicio'},
+        {'trigger': 'desligar', 'source': 'ligada', 'dest': 'desligada', 'after': '_calcular_consumo'},
+    ]
 
-        estados = ['ligada', 'desligada']
+    # consumo parcial depende do relógio: calculado só quando lido
+    CAMPOS_VIVOS = {"consumo_wh": "consumo_total"}
 
-        super().__init__(id_dispositivo, nome, tipo='TOMADA', estados=estados, estado_inicial='desligada')
+    def __init__(self, id_dispositivo, nome, potencia_W=100):
+
+        super().__init__(id_dispositivo, nome, tipo='TOMADA')
 
         self._potencia_W = potencia_W
         self._consumo_wh = 0.0
-        self._momento_ligado: Optional[datetime] = None
-
-        self.machine.add_transition('ligar', 'desligada', 'ligada', after='_registrar_inicio')
-        self.machine.add_transition('desligar', 'ligada', 'desligada', after='_calcular_consumo')
+        # segundos desde a época (relogio.atual.timestamp()) enquanto ligada
+        self._momento_ligado: Optional[float] = None
 
     @property
     def potencia_W(self):
@@ -35,37 +46,43 @@ class TomadaInteligente(DispositivoBase, Subject):
         if valor < 0:
             raise ValidacaoAtribute("Potência deve ser > 0")
         self._potencia_W = valor
+        self.invalidar_detalhes()
+        self.notify(event='atributo', detalhes={"potencia_W": valor})
+
+    def restaurar_estado(self, estado):
+
+        super().restaurar_estado(estado)
+        # uma tomada restaurada ligada passa a contar consumo a partir da carga
+        self._momento_ligado = relogio.atual.timestamp() if estado == 'ligada' else None
 
     def _registrar_inicio(self):
 
-        self._momento_ligado = datetime.utcnow()
-        self.notify(event='ligar', detalhes=self.detalhes())
-        print(f"[INFO] Tomada {self.nome} ligada")
+        self._momento_ligado = relogio.atual.timestamp()
+        self.notificar_evento('ligar')
+        logger.info("Tomada %s ligada", self.nome)
 
     def _calcular_consumo(self):
 
-        if not self._momento_ligado:
-            return
-
-        agora = datetime.utcnow()
-        duracao = agora - self._momento_ligado
-        horas = duracao.total_seconds() / 3600.0
-        wh = self._potencia_W * horas
-        self._consumo_wh += wh
+        wh = 0.0
+        if self._momento_ligado is not None:
+            wh = self._potencia_W * self._horas_ligada()
+            self._consumo_wh += wh
 
         # reset
         self._momento_ligado = None
-        self.notify(event='desligar', detalhes=self.detalhes())
-        print(f"[INFO] Tomada {self.nome} desligada — consumo adicionado: {wh:.3f} Wh")
+        self.notificar_evento('desligar', wh=wh)
+        logger.info("Tomada %s desligada — consumo adicionado: %.3f Wh", self.nome, wh)
+
+    def _horas_ligada(self):
+
+        # relógio trocado para trás (ex.: simulado -> real) não gera consumo negativo
+        return max(0.0, relogio.atual.timestamp() - self._momento_ligado) / 3600.0
 
     def consumo_total(self):
 
         total = self._consumo_wh
-        if self.state == "ligada" and self._momento_ligado:
-            agora = datetime.utcnow()
-            duracao = agora - self._momento_ligado
-            horas = duracao.total_seconds() / 3600.0
-            total += self._potencia_W * horas
+        if self.state == "ligada" and self._momento_ligado is not None:
+            total += self._potencia_W * self._horas_ligada()
         return round(total, 2)
 
     def gerar_consumo_simulado(self, minutos: int = 1):
@@ -74,10 +91,10 @@ class TomadaInteligente(DispositivoBase, Subject):
             return 0.0
         wh = (self._potencia_W * (minutos / 60.0))
         self._consumo_wh += wh
-        self.notify(event='consumo', detalhes=self.detalhes())
+        self.notificar_evento('consumo', wh=wh)
         return wh
 
-    def detalhes(self):
+    def _detalhes_fixos(self):
 
         return {
 
@@ -86,5 +103,4 @@ class TomadaInteligente(DispositivoBase, Subject):
             "tipo": self.tipo,
             "estado": getattr(self, 'state', None),
             "potencia_W": self.potencia_W,
-            "consumo_wh": self.consumo_total(),  # já mostra consumo parcial em tempo real
         }
\ No newline at end of file
@@ -0,0 +1,354 @@
+import heapq
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from smart_home.hub import relogio as relogios
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
+
+
+# -------------------------------
+# Expressões cron
+# -------------------------------
+# minuto hora dia mês dia_da_semana (0 ou 7 = domingo)
+_CAMPOS_CRON = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _campo_cron(texto, minimo, maximo):
+    valores = set()
+    try:
+        for parte in texto.split(","):
+            faixa, _, passo = parte.partition("/")
+            if faixa == "*":
+                inicio, fim = minimo, maximo
+            elif "-" in faixa:
+                inicio, fim = map(int, faixa.split("-", 1))
+            else:
+                inicio = int(faixa)
+                fim = maximo if passo else inicio
+            passo = int(passo) if passo else 1
+            if not minimo <= inicio <= fim <= maximo or passo < 1:
+                raise ValueError
+            valores.update(range(inicio, fim + 1, passo))
+    except ValueError:
+        raise ValueError(f"Campo cron inválido: '{texto}' (aceito {minimo}-{maximo})") from None
+    return frozenset(valores)
+
+
+class ExpressaoCron:
+    """
+    Cron de cinco campos ("0 23 * * *" = todo dia às 23:00), com '*',
+    listas, faixas e passos. Como no cron, se dia do mês e dia da semana
+    forem ambos restritos, basta um deles conferir.
+    """
+
+    def __init__(self, expressao):
+        campos = expressao.split()
+        if len(campos) != 5:
+            raise ValueError(f"Expressão cron precisa de 5 campos: '{expressao}'")
+
+        self.expressao = expressao
+        self.minutos, self.horas, self.dias, self.meses, semana = (
+            _campo_cron(campo, *limites) for campo, limites in zip(campos, _CAMPOS_CRON)
+        )
+        self.dias_semana = frozenset(d % 7 for d in semana)
+        self._dia_ou_semana = campos[2] != "*" and campos[4] != "*"
+
+    def _confere_dia(self, data):
+        dia = data.day in self.dias
+        semana = (data.weekday() + 1) % 7 in self.dias_semana
+        return dia or semana if self._dia_ou_semana else dia and semana
+
+    def proxima(self, depois):
+        """Primeira ocorrência estritamente depois de 'depois' (datetime)."""
+
+        momento = depois.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limite = momento + timedelta(days=5 * 366)
+
+        while momento < limite:
+            if momento.month not in self.meses:
+                momento = (momento.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._confere_dia(momento):
+                momento = momento.replace(hour=0, minute=0) + timedelta(days=1)
+            elif momento.hour not in self.horas:
+                momento = momento.replace(minute=0) + timedelta(hours=1)
+            elif momento.minute not in self.minutos:
+                momento += timedelta(minutes=1)
+            else:
+                return momento
+
+        raise ValueError(f"Expressão cron sem ocorrência: '{self.expressao}'")
+
+    def __repr__(self):
+        return f"<ExpressaoCron '{self.expressao}'>"
+
+
+# -------------------------------
+# Tarefas e métricas
+# -------------------------------
+class Tarefa:
+
+    __slots__ = ("id", "nome", "acao", "quando", "intervalo_s", "cron", "alvo", "cancelada", "execucoes")
+
+    def __init__(self, id_tarefa, nome, acao, quando, intervalo_s=None, cron=None):
+        self.id = id_tarefa
+        self.nome = nome
+        self.acao = acao
+        self.quando = quando
+        self.intervalo_s = intervalo_s
+        self.cron = cron
+        # cron: minuto da próxima ocorrência, na hora local
+        self.alvo = None
+        self.cancelada = False
+        self.execucoes = 0
+
+    def __repr__(self):
+        tipo = f"cron '{self.cron.expressao}'" if self.cron else (
+            f"a cada {self.intervalo_s} s" if self.intervalo_s else "única")
+        return f"<Tarefa {self.id} '{self.nome}' ({tipo}, {self.execucoes} execução(ões))>"
+
+
+class MetricasAtraso:
+    """Atraso de disparo (jitter): quanto depois do prazo a tarefa saiu da fila."""
+
+    def __init__(self, amostras=10000):
+        self._amostras = deque(maxlen=amostras)
+        self.disparos = 0
+        self.soma_s = 0.0
+        self.maximo_s = 0.0
+
+    def registrar(self, atraso_s):
+        self._amostras.append(atraso_s)
+        self.disparos += 1
+        self.soma_s += atraso_s
+        if atraso_s > self.maximo_s:
+            self.maximo_s = atraso_s
+
+    def resumo(self):
+        """Média e máximo de todos os disparos; p50/p99 das amostras recentes (ms)."""
+
+        amostras = sorted(self._amostras)
+
+        def percentil(p):
+            return amostras[min(len(amostras) - 1, int(p * len(amostras)))] * 1000 if amostras else 0.0
+
+        return {
+            "disparos": self.disparos,
+            "media_ms": self.soma_s / self.disparos * 1000 if self.disparos else 0.0,
+            "p50_ms": percentil(0.50),
+            "p99_ms": percentil(0.99),
+            "max_ms": self.maximo_s * 1000,
+        }
+
+
+# -------------------------------
+# Agendador
+# -------------------------------
+class Agendador:
+    """
+    Fila de prioridade (heap) de tarefas por prazo no relógio monotônico.
+
+    Inserir e retirar custam O(log n), então 100k timers pendentes não
+    pesam; cancelar só marca a tarefa, e o heap é reconstruído quando as
+    marcadas passam da metade. Tarefas periódicas mantêm o ritmo fixo
+    (prazo anterior + intervalo) e pulam os disparos perdidos se ficarem
+    para trás. Com trabalhadores > 0 as ações rodam num pool, e uma ação
+    lenta não atrasa as próximas.
+
+    Tarefas cron guardam o minuto alvo na hora local. Como o relógio
+    monotônico não acompanha ajustes do relógio nem o horário de verão, a
+    tarefa acorda no máximo a cada _RECONFERIR_CRON_S e só dispara quando
+    agora_local() chegou ao alvo; a ocorrência seguinte é procurada depois
+    do alvo, então um mesmo minuto nunca dispara duas vezes.
+    """
+
+    _RECONFERIR_CRON_S = 60.0
+
+    def __init__(self, relogio=None, trabalhadores=0, amostras_atraso=10000):
+
+        self._relogio = relogio
+        self.metricas = MetricasAtraso(amostras_atraso)
+        self._heap = []
+        self._tarefas = {}
+        self._canceladas = 0
+        self._ids = itertools.count(1)
+        self._condicao = threading.Condition()
+        self._pool = ThreadPoolExecutor(trabalhadores, thread_name_prefix="agendador") if trabalhadores else None
+        self._thread = None
+        self._ativo = False
+
+    @property
+    def relogio(self):
+        # sem relógio próprio, segue o relógio do hub (relogio.atual)
+        return self._relogio or relogios.atual
+
+    # -------------------------------
+    # Agendamento
+    # -------------------------------
+    def _inserir(self, tarefa):
+        heapq.heappush(self._heap, (tarefa.quando, tarefa.id, tarefa))
+        # novo prazo mais próximo: acorda a thread para recalcular a espera
+        if self._heap[0][2] is tarefa:
+            self._condicao.notify()
+
+    def _agendar(self, acao, nome, quando=None, intervalo_s=None, cron=None):
+        with self._condicao:
+            tarefa = Tarefa(next(self._ids), nome, acao, quando, intervalo_s, cron)
+            if cron:
+                self._armar_cron(tarefa, self.relogio.agora_local())
+            self._tarefas[tarefa.id] = tarefa
+            self._inserir(tarefa)
+        return tarefa.id
+
+    def em(self, atraso_s, acao, nome=None):
+        """Executa 'acao' uma vez, daqui a 'atraso_s' segundos."""
+
+        return self._agendar(acao, nome or "atraso", quando=self.relogio.monotonico() + atraso_s)
+
+    def a_cada(self, intervalo_s, acao, nome=None, atraso_inicial_s=None):
+        """Executa 'acao' a cada 'intervalo_s' segundos (a primeira após atraso_inicial_s ou um intervalo)."""
+
+        if intervalo_s <= 0:
+            raise ValueError(f"Intervalo inválido: {intervalo_s}")
+        primeiro = intervalo_s if atraso_inicial_s is None else atraso_inicial_s
+        return self._agendar(acao, nome or "periodica", quando=self.relogio.monotonico() + primeiro,
+                             intervalo_s=intervalo_s)
+
+    def cron(self, expressao, acao, nome=None):
+        """Executa 'acao' nas ocorrências da expressão cron (hora local do relógio)."""
+
+        if not isinstance(expressao, ExpressaoCron):
+            expressao = ExpressaoCron(expressao)
+        return self._agendar(acao, nome or expressao.expressao, cron=expressao)
+
+    def cancelar(self, id_tarefa):
+        with self._condicao:
+            tarefa = self._tarefas.pop(id_tarefa, None)
+            if tarefa is None:
+                return False
+            tarefa.cancelada = True
+            self._canceladas += 1
+            if self._canceladas > len(self._heap) // 2:
+                self._heap = [item for item in self._heap if not item[2].cancelada]
+                heapq.heapify(self._heap)
+                self._canceladas = 0
+        return True
+
+    def tarefa(self, id_tarefa):
+        return self._tarefas.get(id_tarefa)
+
+    @property
+    def pendentes(self):
+        return len(self._tarefas)
+
+    def _armar_cron(self, tarefa, depois):
+        tarefa.alvo = tarefa.cron.proxima(depois)
+        self._prazo_cron(tarefa)
+
+    def _prazo_cron(self, tarefa):
+        # o quanto falta na hora local, em segundos monotônicos, até o teto de reconferência
+        relogio = self.relogio
+        falta = (tarefa.alvo - relogio.agora_local()).total_seconds()
+        tarefa.quando = relogio.monotonico() + max(0.0, min(falta, self._RECONFERIR_CRON_S))
+
+    # -------------------------------
+    # Disparo
+    # -------------------------------
+    def _retirar_vencidas(self, agora):
+        vencidas = []
+        while self._heap and self._heap[0][0] <= agora:
+            prazo, _, tarefa = heapq.heappop(self._heap)
+            if tarefa.cancelada:
+                self._canceladas -= 1
+                continue
+            if tarefa.cron and self.relogio.agora_local() < tarefa.alvo:
+                # o monotônico venceu antes da hora local (reconferência,
+                # relógio atrasado, fim do horário de verão): espera o alvo
+                self._prazo_cron(tarefa)
+                self._inserir(tarefa)
+                continue
+            vencidas.append((prazo, tarefa))
+            self._rearmar(tarefa, agora)
+        return vencidas
+
+    def _rearmar(self, tarefa, agora):
+        if tarefa.intervalo_s:
+            tarefa.quando += tarefa.intervalo_s
+            if tarefa.quando <= agora:
+                perdidos = (agora - tarefa.quando) // tarefa.intervalo_s + 1
+                tarefa.quando += perdidos * tarefa.intervalo_s
+        elif tarefa.cron:
+            self._armar_cron(tarefa, max(self.relogio.agora_local(), tarefa.alvo))
+        else:
+            del self._tarefas[tarefa.id]
+            return
+        self._inserir(tarefa)
+
+    def _disparar(self, vencidas):
+        for prazo, tarefa in vencidas:
+            self.metricas.registrar(self.relogio.monotonico() - prazo)
+            tarefa.execucoes += 1
+            if self._pool:
+                self._pool.submit(self._executar, tarefa)
+            else:
+                self._executar(tarefa)
+
+    @staticmethod
+    def _executar(tarefa):
+        try:
+            tarefa.acao()
+        except Exception as e:
+            logger.error("Falha na tarefa agendada '%s': %s", tarefa.nome, e)
+
+    def executar_pendentes(self):
+        """Dispara, na thread atual, tudo que já venceu; usado com RelogioSimulado parado."""
+
+        with self._condicao:
+            vencidas = self._retirar_vencidas(self.relogio.monotonico())
+        self._disparar(vencidas)
+        return len(vencidas)
+
+    # -------------------------------
+    # Thread de execução
+    # -------------------------------
+    def iniciar(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._ativo = True
+        self._thread = threading.Thread(target=self._trabalhar, name="agendador", daemon=True)
+        self._thread.start()
+
+    def _trabalhar(self):
+        while True:
+            with self._condicao:
+                while self._ativo:
+                    relogio = self.relogio
+                    agora = relogio.monotonico()
+                    if self._heap and self._heap[0][0] <= agora:
+                        break
+                    self._condicao.wait(relogio.segundos_reais(self._heap[0][0] - agora) if self._heap else None)
+                if not self._ativo:
+                    return
+                vencidas = self._retirar_vencidas(agora)
+            self._disparar(vencidas)
+
+    def parar(self):
+        with self._condicao:
+            self._ativo = False
+            self._condicao.notify_all()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def fechar(self):
+        self.parar()
+        if self._pool:
+            self._pool.shutdown(wait=True)
+        resumo = self.metricas.resumo()
+        if resumo["disparos"]:
+            logger.info("Agendador encerrado: %d disparo(s), atraso p99 %.2f ms (máx. %.2f ms).",
+                        resumo["disparos"], resumo["p99_ms"], resumo["max_ms"])
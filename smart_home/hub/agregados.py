@@ -0,0 +1,243 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from smart_home.hub import relogio
+from smart_home.hub.observer import Observer
+from smart_home.utils import metricas
+
+# granularidade -> formato da chave do bucket (ordem lexicográfica = ordem temporal)
+GRANULARIDADES = {
+    "hora": "%Y-%m-%dT%H",
+    "dia": "%Y-%m-%d",
+    "mes": "%Y-%m",
+}
+
+
+class AgregadosEnergia(Observer):
+    """
+    Contadores de energia materializados por tomada, em buckets de hora, dia
+    e mês, atualizados a cada evento 'ligar'/'desligar'/'consumo'.
+
+    Um relatório para qualquer janela soma buckets (O(buckets)) em vez de
+    reprocessar o log. O estado é salvo em checkpoints junto com a posição
+    do journal, e pode ser reconstruído a partir do journal após uma queda.
+    """
+
+    def __init__(self):
+
+        self._buckets = {g: {} for g in GRANULARIDADES}
+        self._abertos = {}
+        self.posicao_journal = 0
+        # posição do último checkpoint gravado (ou carregado): eventos até ela podem ser resumidos e apagados
+        self.posicao_salva = 0
+        self._lock = threading.RLock()
+
+    # -------------------------------
+    # Atualização incremental
+    # -------------------------------
+    def update(self, subject, event=None, wh=None, **kwargs):
+        if getattr(subject, "tipo", None) == "TOMADA":
+            self.registrar(subject.id, event, relogio.atual.agora(), wh)
+
+    def registrar(self, id_dispositivo, event, agora, wh=None):
+        with self._lock:
+            if event == "ligar":
+                self._abertos[id_dispositivo] = agora
+
+            elif event == "desligar":
+                inicio = self._abertos.pop(id_dispositivo, None) or agora
+                if wh:
+                    self._distribuir(id_dispositivo, inicio, agora, wh)
+
+            elif event == "consumo" and wh:
+                self._somar(id_dispositivo, agora, wh)
+
+    def _somar(self, id_dispositivo, momento, wh):
+        for granularidade, formato in GRANULARIDADES.items():
+            buckets = self._buckets[granularidade].setdefault(id_dispositivo, {})
+            chave = momento.strftime(formato)
+            buckets[chave] = buckets.get(chave, 0.0) + wh
+
+    def _distribuir(self, id_dispositivo, inicio, fim, wh):
+        """Reparte 'wh' proporcionalmente entre as horas do intervalo [inicio, fim]."""
+
+        total_s = (fim - inicio).total_seconds()
+        if total_s <= 0:
+            self._somar(id_dispositivo, fim, wh)
+            return
+
+        cursor = inicio
+        while cursor < fim:
+            proxima_hora = cursor.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+            fatia_fim = min(proxima_hora, fim)
+            self._somar(id_dispositivo, cursor, wh * (fatia_fim - cursor).total_seconds() / total_s)
+            cursor = fatia_fim
+
+    # -------------------------------
+    # Consultas
+    # -------------------------------
+    def consumo(self, id_dispositivo=None, inicio=None, fim=None, granularidade="hora"):
+        """
+        Wh por tomada na janela [inicio, fim), com precisão da granularidade
+        escolhida. Sem id_dispositivo devolve um dict {id: wh}.
+        """
+        formato = GRANULARIDADES[granularidade]
+        inicio = datetime.fromisoformat(inicio) if isinstance(inicio, str) else inicio
+        fim = datetime.fromisoformat(fim) if isinstance(fim, str) else fim
+        chave_inicio = inicio.strftime(formato) if inicio else None
+        chave_fim = fim.strftime(formato) if fim else None
+
+        def somar(buckets):
+            return round(sum(
+                wh for chave, wh in buckets.items()
+                if (chave_inicio is None or chave >= chave_inicio) and (chave_fim is None or chave < chave_fim)
+            ), 2)
+
+        with self._lock:
+            por_dispositivo = self._buckets[granularidade]
+            if id_dispositivo is not None:
+                return somar(por_dispositivo.get(id_dispositivo, {}))
+            return {id_d: somar(buckets) for id_d, buckets in por_dispositivo.items()}
+
+    def serie(self, id_dispositivo, granularidade="hora"):
+        with self._lock:
+            return dict(sorted(self._buckets[granularidade].get(id_dispositivo, {}).items()))
+
+    # -------------------------------
+    # Reconstrução a partir do journal
+    # -------------------------------
+    def aplicar_eventos(self, eventos, potencias):
+        """
+        Reaplica eventos do journal ({id_dispositivo, evento, timestamp}, com
+        'wh' quando gravado pelo RegistradorEventos). 'potencias' =
+        {id_tomada: potencia_W}. Eventos sem timestamp ISO são ignorados.
+        """
+        with self._lock:
+            for evento in eventos:
+                self.posicao_journal += 1
+                id_dispositivo = evento.get("id_dispositivo")
+                if id_dispositivo not in potencias:
+                    continue
+
+                try:
+                    momento = datetime.fromisoformat(evento.get("timestamp"))
+                except (TypeError, ValueError):
+                    continue
+
+                tipo = evento.get("evento")
+                if tipo == "ligar":
+                    self._abertos[id_dispositivo] = momento
+                elif tipo == "desligar" and id_dispositivo in self._abertos:
+                    inicio = self._abertos.pop(id_dispositivo)
+                    wh = evento.get("wh")
+                    if wh is None:
+                        wh = potencias[id_dispositivo] * (momento - inicio).total_seconds() / 3600.0
+                    self._distribuir(id_dispositivo, inicio, momento, wh)
+                elif tipo == "consumo" and evento.get("wh"):
+                    self._somar(id_dispositivo, momento, evento["wh"])
+
+    @classmethod
+    def reconstruir(cls, journal, potencias, caminho_checkpoint=None):
+        """Carrega o último checkpoint (se houver) e reaplica o journal a partir da posição salva."""
+
+        agregados = cls.carregar_checkpoint(caminho_checkpoint) if caminho_checkpoint else None
+        agregados = agregados or cls()
+        agregados.aplicar_eventos(journal.iterar(agregados.posicao_journal), potencias)
+        # no banco as posições são o seq, que tem buracos onde a retenção apagou eventos
+        agregados.posicao_journal = max(agregados.posicao_journal, journal.total)
+        return agregados
+
+    # -------------------------------
+    # Checkpoints
+    # -------------------------------
+    def como_dict(self):
+        with self._lock:
+            return {
+                "posicao_journal": self.posicao_journal,
+                "abertos": {id_d: m.isoformat() for id_d, m in self._abertos.items()},
+                "buckets": self._buckets,
+            }
+
+    @classmethod
+    def de_dict(cls, dados):
+        agregados = cls()
+        agregados.posicao_journal = dados.get("posicao_journal", 0)
+        agregados._abertos = {id_d: datetime.fromisoformat(m) for id_d, m in dados.get("abertos", {}).items()}
+        for granularidade in GRANULARIDADES:
+            agregados._buckets[granularidade] = dados.get("buckets", {}).get(granularidade, {})
+        return agregados
+
+    @metricas.cronometrado("smart_home_persistencia_segundos", operacao="agregados_checkpoint")
+    def salvar_checkpoint(self, caminho, posicao_journal=None):
+        """'posicao_journal' pode ser uma função: é lida sob a trava, junto com o estado."""
+
+        with self._lock:
+            if callable(posicao_journal):
+                posicao_journal = posicao_journal()
+            if posicao_journal is not None:
+                self.posicao_journal = posicao_journal
+            dados = self.como_dict()
+
+        temporario = f"{caminho}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+        with self._lock:
+            self.posicao_salva = max(self.posicao_salva, dados["posicao_journal"])
+
+    @classmethod
+    def carregar_checkpoint(cls, caminho):
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        agregados = cls.de_dict(dados)
+        agregados.posicao_salva = agregados.posicao_journal
+        return agregados
+
+
+class RegistradorEventos(Observer):
+    """
+    Observer síncrono ligado a todos os dispositivos do hub. Cada evento de
+    estado (menu, rotina, regra, agendador, consumo simulado) vai para os
+    agregados e, se houver, para o armazenamento de eventos, com o mesmo
+    instante e sob a trava dos agregados: o checkpoint e a posição no
+    armazenamento nunca divergem, e a reconstrução após uma queda chega ao
+    mesmo estado.
+    """
+
+    sincrono = True
+
+    # edição de atributo não é evento de estado
+    IGNORADOS = frozenset({"atributo"})
+
+    def __init__(self, agregados, armazenamento=None):
+
+        self.agregados = agregados
+        self.armazenamento = armazenamento
+
+    def update(self, subject, event=None, wh=None, **kwargs):
+        if event is None or event in self.IGNORADOS:
+            return
+
+        agora = relogio.atual.agora()
+        agregados = self.agregados
+        with agregados._lock:
+            if subject.tipo == "TOMADA":
+                agregados.registrar(subject.id, event, agora, wh)
+
+            if self.armazenamento is not None:
+                evento = {"id_dispositivo": subject.id, "evento": event, "timestamp": agora.isoformat()}
+                if wh is not None:
+                    evento["wh"] = wh
+                self.armazenamento.anexar(evento)
+
+    def salvar_checkpoint(self, caminho):
+        armazenamento = self.armazenamento
+        self.agregados.salvar_checkpoint(caminho, posicao_journal=lambda: armazenamento.total if armazenamento else None)
@@ -0,0 +1,189 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from smart_home.utils import metricas
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
+
+
+# seq AUTOINCREMENT: posições nunca são reaproveitadas, então 'a_partir_de'
+# continua válido para quem guardou uma posição (ex.: checkpoint dos agregados)
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS eventos (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_dispositivo TEXT,
+    evento TEXT,
+    timestamp TEXT,
+    dados TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_eventos_dispositivo ON eventos (id_dispositivo, timestamp);
+CREATE INDEX IF NOT EXISTS idx_eventos_evento ON eventos (evento, timestamp);
+"""
+
+_CAMPOS = ("id_dispositivo", "evento", "timestamp")
+
+
+def para_iso(valor):
+    # timestamps ficam em ISO 8601: comparação de texto = comparação temporal
+    return valor.isoformat() if isinstance(valor, datetime) else valor
+
+
+class ArmazenamentoEventos:
+    """
+    Eventos em SQLite (modo WAL) com índices por (id_dispositivo, timestamp)
+    e (evento, timestamp). Mesma interface de escrita e leitura do
+    JournalEventos (anexar, commit, iterar, total), mais consultas por
+    dispositivo, tipo de evento e janela de tempo.
+
+    As inserções ficam num buffer e são gravadas numa única transação
+    quando o lote enche ou o intervalo expira.
+    """
+
+    def __init__(self, caminho, tamanho_lote=256, intervalo_commit=1.0):
+
+        self.caminho = caminho
+        self.tamanho_lote = max(1, tamanho_lote)
+        self.intervalo_commit = intervalo_commit
+
+        self._lock = threading.RLock()
+        self._buffer = []
+        self._ultimo_commit = time.monotonic()
+
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        # com WAL, NORMAL só arrisca as últimas transações numa queda do sistema, nunca corrompe
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.executescript(_ESQUEMA)
+
+        # o maior seq já usado, mesmo que a retenção tenha apagado a linha
+        self.total = self._conexao.execute(
+            "SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'eventos'), 0)").fetchone()[0]
+
+    # -------------------------------
+    # Escrita
+    # -------------------------------
+    @staticmethod
+    def _linha(evento):
+        extras = {k: v for k, v in evento.items() if k not in _CAMPOS}
+        return (evento.get("id_dispositivo"), evento.get("evento"), para_iso(evento.get("timestamp")),
+                json.dumps(extras, ensure_ascii=False) if extras else None)
+
+    def anexar(self, evento):
+        with self._lock:
+            self._buffer.append(self._linha(evento))
+            self.total += 1
+
+            if (len(self._buffer) >= self.tamanho_lote
+                    or time.monotonic() - self._ultimo_commit >= self.intervalo_commit):
+                self.commit()
+
+    def anexar_lote(self, eventos):
+        linhas = [self._linha(e) for e in eventos]
+        with self._lock:
+            self._buffer.extend(linhas)
+            self.total += len(linhas)
+            self.commit()
+
+    @metricas.cronometrado("smart_home_persistencia_segundos", operacao="armazenamento_commit")
+    def commit(self):
+        with self._lock:
+            self._ultimo_commit = time.monotonic()
+
+            if not self._buffer:
+                return
+
+            with self._conexao:
+                self._conexao.execute("BEGIN")
+                self._conexao.executemany(
+                    "INSERT INTO eventos (id_dispositivo, evento, timestamp, dados) VALUES (?, ?, ?, ?)",
+                    self._buffer,
+                )
+            self._buffer.clear()
+
+    def fechar(self):
+        with self._lock:
+            self.commit()
+            self._conexao.close()
+
+    # -------------------------------
+    # Leitura
+    # -------------------------------
+    @staticmethod
+    def _evento(linha):
+        id_dispositivo, evento, timestamp, dados = linha
+        resultado = {"id_dispositivo": id_dispositivo, "evento": evento, "timestamp": timestamp}
+        if dados:
+            resultado.update(json.loads(dados))
+        return resultado
+
+    def _executar(self, sql, parametros=()):
+        self.commit()
+        with self._lock:
+            cursor = self._conexao.execute(sql, parametros)
+        while True:
+            with self._lock:
+                linhas = cursor.fetchmany(1000)
+            if not linhas:
+                return
+            yield from map(self._evento, linhas)
+
+    def iterar(self, a_partir_de=0):
+        """Percorre os eventos em ordem de gravação, a partir da posição 'a_partir_de'."""
+
+        return self._executar(
+            "SELECT id_dispositivo, evento, timestamp, dados FROM eventos WHERE seq > ? ORDER BY seq",
+            (a_partir_de,),
+        )
+
+    def vazio(self):
+        """True se não há nenhum evento gravado (uma linha lida, sem carregar o histórico)."""
+
+        self.commit()
+        with self._lock:
+            return self._conexao.execute("SELECT 1 FROM eventos LIMIT 1").fetchone() is None
+
+    def consultar(self, dispositivos=None, eventos=None, inicio=None, fim=None):
+        """
+        Eventos na janela [inicio, fim), em ordem de timestamp. 'dispositivos'
+        e 'eventos' aceitam um valor ou uma coleção; None não filtra.
+        """
+        sql, parametros = self._filtro(dispositivos, eventos, inicio, fim)
+        return self._executar(
+            f"SELECT id_dispositivo, evento, timestamp, dados FROM eventos {sql} ORDER BY timestamp, seq",
+            parametros,
+        )
+
+    def contar(self, dispositivos=None, eventos=None, inicio=None, fim=None):
+        sql, parametros = self._filtro(dispositivos, eventos, inicio, fim)
+        self.commit()
+        with self._lock:
+            return self._conexao.execute(f"SELECT COUNT(*) FROM eventos {sql}", parametros).fetchone()[0]
+
+    @staticmethod
+    def _filtro(dispositivos, eventos, inicio, fim):
+        condicoes, parametros = [], []
+
+        for coluna, valor in (("id_dispositivo", dispositivos), ("evento", eventos)):
+            if valor is None:
+                continue
+            if isinstance(valor, str):
+                condicoes.append(f"{coluna} = ?")
+                parametros.append(valor)
+            else:
+                # a lista vai como um único parâmetro JSON: sem limite de variáveis do SQLite
+                condicoes.append(f"{coluna} IN (SELECT value FROM json_each(?))")
+                parametros.append(json.dumps(list(valor)))
+
+        if inicio is not None:
+            condicoes.append("timestamp >= ?")
+            parametros.append(para_iso(inicio))
+        if fim is not None:
+            condicoes.append("timestamp < ?")
+            parametros.append(para_iso(fim))
+
+        sql = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        return sql, parametros
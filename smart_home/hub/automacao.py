@@ -1,12 +1,32 @@
 import json
 import os
 import csv
+import gc
+import time
 from smart_home.core.porta import Port
 from smart_home.core.luz import Luz, CorRGB
 from smart_home.core.tomada import TomadaInteligente
+from smart_home.core.sensor import Sensor
+from smart_home.core.cafeteira import Cafeteira
+from smart_home.core.persiana import Persiana
 from smart_home.hub.singleton import Singleton
+from smart_home.hub.agendador import Agendador
 from smart_home.hub.eventos import Evento
-from smart_home.hub.consumo_tomada import calcular_consumo_tomada
+from smart_home.hub.armazenamento import ArmazenamentoEventos
+from smart_home.hub.consumo_tomada import calcular_consumo_tomada, iterar_consumo_tomada
+from smart_home.hub.registro import RegistroDispositivos
+from smart_home.hub.carregador import carregar_config
+from smart_home.hub import snapshot
+from smart_home.hub.persistencia import ArquivoIncremental, RastreadorAlteracoes
+from smart_home.hub.regras import DespachanteRegras
+from smart_home.hub.retencao import RetencaoEventos
+from smart_home.hub.agregados import AgregadosEnergia, RegistradorEventos
+from smart_home.hub.execucao import ExecutorRotinas, executar_em_lote
+from smart_home.hub.state_machine import CodigoComando
+from smart_home.utils import metricas
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
 
 
 # -------------------------------
@@ -32,28 +52,48 @@ from smart_home.hub.consumo_tomada import calcular_consumo_tomada
 # Factory de Dispositivos
 # -------------------------------
 class DeviceFactory:
-    @staticmethod
-    def criar_dispositivo(config):
-        tipo = config['tipo']
-        nome = config.get('nome', 'Sem Nome')
-        atributos = config.get('atributos', {})
+    """
+    Fábrica por registro: cada tipo aponta para um construtor
+    (id, nome, atributos) -> dispositivo. Aceita tanto o formato com
+    "atributos" quanto o formato plano gravado por salvar_dispositivos.
+    """
 
-        if tipo == 'LUZ':
-            cor_str = atributos.get('cor', 'WHITE')
-            brilho = atributos.get('brilho', 100)
-            cor = CorRGB.from_str(cor_str, CorRGB.WHITE)  # ✅ corrigido
-            return Luz(config['id'], nome, brilho=brilho, cor=cor)
+    _construtores = {}
 
-        elif tipo == 'TOMADA':
-            potencia = atributos.get('potencia_W', 100)
-            return TomadaInteligente(config['id'], nome, potencia_W=potencia)
+    @classmethod
+    def registrar(cls, tipo, construtor):
+        cls._construtores[tipo] = construtor
 
-        elif tipo == 'PORTA':
-            return Port(config['id'], nome)
+    @classmethod
+    def tipos(cls):
+        return tuple(cls._construtores)
 
-        else:
+    @classmethod
+    def criar_dispositivo(cls, config):
+        tipo = config['tipo']
+        construtor = cls._construtores.get(tipo)
+        if construtor is None:
             raise ValueError(f"Tipo de dispositivo desconhecido: {tipo}")
 
+        atributos = config.get('atributos', config)
+        dispositivo = construtor(config['id'], config.get('nome', 'Sem Nome'), atributos)
+
+        # estado salvo é aplicado direto, sem transição nem notificação
+        estado = config.get('estado')
+        if estado and estado != dispositivo.state:
+            dispositivo.restaurar_estado(estado)
+
+        return dispositivo
+
+
+DeviceFactory.registrar('LUZ', lambda id_, nome, a: Luz(
+    id_, nome, brilho=a.get('brilho', 100), cor=CorRGB.from_str(a.get('cor', 'WHITE'), CorRGB.WHITE)))
+DeviceFactory.registrar('TOMADA', lambda id_, nome, a: TomadaInteligente(id_, nome, potencia_W=a.get('potencia_W', 100)))
+DeviceFactory.registrar('PORTA', lambda id_, nome, a: Port(id_, nome))
+DeviceFactory.registrar('SENSOR', lambda id_, nome, a: Sensor(id_, nome))
+DeviceFactory.registrar('CAFETEIRA', lambda id_, nome, a: Cafeteira(id_, nome))
+DeviceFactory.registrar('PERSIANA', lambda id_, nome, a: Persiana(id_, nome))
+
 
 # -------------------------------
 # Observer de Rotinas
@@ -67,21 +107,49 @@ class RotinaObserver:
             "acao": "ligar",
             "alvo": "luz_sala"
         }
+
+        "origem" pode ser omitida ou "*" (qualquer origem), e no lugar de
+        "acao"/"alvo" a regra pode trazer uma lista "acoes" de uma rotina.
         """
         self.regra = regra
         self.dispositivos = dispositivos
 
-    def atualizar(self, evento: Evento):
-        if evento.tipo == self.regra["quando"] and evento.origem == self.regra["origem"]:
-            alvo = self.regra["alvo"]
-            acao = self.regra["acao"]
+    def corresponde(self, evento: Evento):
+        quando = self.regra.get("quando") or "*"
+        origem = self.regra.get("origem") or "*"
+        return quando in ("*", evento.tipo) and origem in ("*", evento.origem)
+
+    def executar(self, evento: Evento):
+        registro = metricas.registro
+        if registro is None:
+            return self._executar(evento)
+        inicio = time.perf_counter()
+        try:
+            return self._executar(evento)
+        finally:
+            registro.histograma("smart_home_regra_segundos", regra=str(self.regra.get("id", "?"))).registrar(
+                time.perf_counter() - inicio)
+
+    def _executar(self, evento: Evento):
+        if "acoes" in self.regra:
+            acoes = [(a["id_dispositivo"], a["comando"]) for a in self.regra["acoes"]]
+        else:
+            acoes = [(self.regra["alvo"], self.regra["acao"])]
 
+        executou = False
+        for alvo, acao in acoes:
             dispositivo = self.dispositivos.get(alvo)
-            if dispositivo and hasattr(dispositivo, acao):
-                getattr(dispositivo, acao)()
-                print(f"[ROTINA] Executada: {self.regra}")
+            if dispositivo and acao in dispositivo.machine.gatilhos:
+                if dispositivo.executar_comando(acao):
+                    executou = True
+                    logger.info("Rotina executada: %s -> '%s' em '%s'", self.regra.get('id', self.regra), acao, alvo)
             else:
-                print(f"[AVISO] Dispositivo ou ação inválida na rotina: {self.regra}")
+                logger.warning("Dispositivo ou ação inválida na rotina: %s", self.regra)
+        return executou
+
+    def atualizar(self, evento: Evento):
+        if self.corresponde(evento):
+            self.executar(evento)
 
 
 # -------------------------------
@@ -91,164 +159,497 @@ class AutomacaoResidencial(Singleton):
 
     def __init__(self, caminho_config, caminho_rotinas, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.observers = []
         if not hasattr(self, '_inicializado'):
+            self.observers = []
+            self.regras = DespachanteRegras()
+            self.registrador = RegistradorEventos(AgregadosEnergia())
+            self.executor = ExecutorRotinas()
+            self.retencao = None
+            self.agendador = Agendador(trabalhadores=4)
+            self._agendas_rotinas = {}
+            self.rastreador = RastreadorAlteracoes()
+            self.rastreador_rotinas = RastreadorAlteracoes()
+            self._incrementais = {}
             self._caminho_config = caminho_config
             self._caminho_rotinas = caminho_rotinas
             self.dispositivos = self.carregar_dispositivos(caminho_config)
+            for dispositivo in self.dispositivos:
+                self._acompanhar(dispositivo)
             self.rotinas = self.carregar_rotinas(caminho_rotinas)
+            for id_rotina, rotina in self.rotinas.items():
+                self._indexar_regra_rotina(id_rotina, rotina)
+                self._agendar_rotina_configurada(id_rotina, rotina)
             self._inicializado = True
 
     # -------------------------------
     # Dispositivos
     # -------------------------------
-    def carregar_dispositivos(self, caminho_json):
-        if not os.path.exists(caminho_json) or os.stat(caminho_json).st_size == 0:
-            print(f"[WARN] Arquivo '{caminho_json}' não encontrado ou vazio. Lista de dispositivos vazia.")
-            return []
+    @metricas.cronometrado("smart_home_persistencia_segundos", operacao="carregar_dispositivos")
+    def carregar_dispositivos(self, caminho_json, tamanho_lote=1000, trabalhadores=0, aceitar=None):
+        self.tempos_carga = {}
+        if not caminho_json:
+            # sem arquivo configurado: nem base nem '.delta' (que seria procurado no diretório atual)
+            return RegistroDispositivos()
+        incremental = self._arquivo_incremental(caminho_json)
 
-        try:
-            with open(caminho_json, 'r') as f:
-                dados = json.load(f)
-        except json.JSONDecodeError as e:
-            print(f"[ERRO] Falha ao decodificar '{caminho_json}': {e}")
-            return []
-
-        dispositivos = []
-        for d in dados.get('dispositivos', []):
-            try:
-                dispositivo = DeviceFactory.criar_dispositivo(d)
-
-                estado_inicial = d.get('estado')
-                if estado_inicial and estado_inicial != dispositivo.state:
-                    dispositivo.executar_comando(estado_inicial)
-
-                dispositivos.append(dispositivo)
-            except Exception as e:
-                print(f"[ERRO] Não foi possível carregar '{d.get('nome', 'Sem Nome')}' (ID {d.get('id')}): {e}")
+        if not os.path.exists(caminho_json) or os.stat(caminho_json).st_size == 0:
+            if not incremental.linhas_delta:
+                logger.warning("Arquivo '%s' não encontrado ou vazio. Lista de dispositivos vazia.", caminho_json)
+            dispositivos = RegistroDispositivos()
+        else:
+            dispositivos, self.tempos_carga = carregar_config(
+                caminho_json, DeviceFactory.criar_dispositivo, tamanho_lote=tamanho_lote, trabalhadores=trabalhadores,
+                aceitar=aceitar,
+            )
+
+        # alterações gravadas depois da última compactação da base
+        for id_dispositivo, registro in incremental.deltas():
+            dispositivos.remover(id_dispositivo)
+            if registro is not None and (aceitar is None or aceitar(registro)):
+                try:
+                    dispositivos.adicionar(DeviceFactory.criar_dispositivo(registro))
+                except Exception as e:
+                    logger.error("Não foi possível carregar '%s' (ID %s): %s", registro.get('nome', 'Sem Nome'), id_dispositivo, e)
 
         return dispositivos
 
+    def _acompanhar(self, dispositivo):
+        # o hub repassa eventos às regras; o rastreador marca o registro para o próximo salvamento
+        dispositivo.attach(self)
+        dispositivo.attach(self.rastreador)
+        dispositivo.attach(self.registrador)
+
     def buscar_por_id(self, id_dispositivo):
-        return next((d for d in self.dispositivos if d.id == id_dispositivo), None)
+        return self.dispositivos.get(id_dispositivo)
 
     def listar_dispositivos(self):
         return [d.detalhes() for d in self.dispositivos]
 
     def adicionar_dispostivo(self, novo_dispositivo):
-        if self.buscar_por_id(novo_dispositivo.id):
-            print(f"[ERRO] Um dispositivo com o ID '{novo_dispositivo.id}' já existe")
+        if not self.dispositivos.adicionar(novo_dispositivo):
+            logger.error("Um dispositivo com o ID '%s' já existe", novo_dispositivo.id)
             return False
 
-        self.dispositivos.append(novo_dispositivo)
-        print(f"[INFO] Dispositivo: {novo_dispositivo.nome} (ID: {novo_dispositivo.id}) adicionado com sucesso.")
+        self._acompanhar(novo_dispositivo)
+        self.rastreador.marcar(novo_dispositivo.id)
+
+        logger.info("Dispositivo: %s (ID: %s) adicionado com sucesso.", novo_dispositivo.nome, novo_dispositivo.id)
         return True
 
     def remover_dispositivo(self, id_dispositivo):
-        dispositivo_a_remover = self.buscar_por_id(id_dispositivo)
+        dispositivo_a_remover = self.dispositivos.remover(id_dispositivo)
 
         if dispositivo_a_remover:
-            self.dispositivos.remove(dispositivo_a_remover)
-            print(f"[INFO] Dispositivo {dispositivo_a_remover.nome} (ID: {id_dispositivo}) removido com sucesso.")
+            dispositivo_a_remover.detach(self)
+            dispositivo_a_remover.detach(self.rastreador)
+            dispositivo_a_remover.detach(self.registrador)
+            self.rastreador.marcar_removido(id_dispositivo)
+            logger.info("Dispositivo %s (ID: %s) removido com sucesso.", dispositivo_a_remover.nome, id_dispositivo)
             return True
         else:
-            print(f"[ERRO] Dispositivo com o ID '{id_dispositivo}' não encontrado")
+            logger.error("Dispositivo com o ID '%s' não encontrado", id_dispositivo)
             return False
 
+    @metricas.cronometrado("smart_home_persistencia_segundos", operacao="salvar_dispositivos")
     def salvar_dispositivos(self, caminho_json):
-        dispositivos_para_salvar = [d.detalhes() for d in self.dispositivos]
-        dados_config = {"dispositivos": dispositivos_para_salvar}
+        """
+        Reescreve a configuração inteira, de forma atômica, e descarta o log
+        de deltas do arquivo: deltas antigos não podem voltar por cima da
+        base nova na próxima carga.
+        """
+        try:
+            if caminho_json == self._caminho_config:
+                # pendências primeiro no log (e marcações zeradas): se o processo
+                # cair entre a troca da base e a limpeza do log, o log reaplicado
+                # só traz o que a base já tem
+                self.salvar_alteracoes(caminho_config=caminho_json)
+            self._arquivo_incremental(caminho_json).compactar(
+                {"dispositivos": [d.detalhes().como_dict() for d in self.dispositivos]})
+            logger.info("Configuração salva em '%s'.", caminho_json)
+        except OSError as e:
+            logger.error("Não foi possível salvar o arquivo: %s", e)
+
+    # -------------------------------
+    # Persistência incremental
+    # -------------------------------
+    def _arquivo_incremental(self, caminho):
+        if caminho not in self._incrementais:
+            self._incrementais[caminho] = ArquivoIncremental(caminho)
+        return self._incrementais[caminho]
+
+    @metricas.cronometrado("smart_home_persistencia_segundos", operacao="salvar_alteracoes")
+    def salvar_alteracoes(self, caminho_config=None, caminho_rotinas=None):
+        """
+        Grava só os dispositivos e rotinas alterados desde o último
+        salvamento (log de deltas ao lado de cada arquivo). A base é
+        reescrita por inteiro apenas quando o log atinge o limite de
+        compactação. Sem caminhos, grava os dois arquivos do hub; com só
+        um deles, só aquele. Devolve (dispositivos gravados, rotinas gravadas).
+        """
+        if caminho_config is None and caminho_rotinas is None:
+            caminho_config, caminho_rotinas = self._caminho_config, self._caminho_rotinas
+
+        gravados = rotinas_gravadas = 0
+
+        if caminho_config:
+            alterados = self.rastreador.coletar()
+            incremental = self._arquivo_incremental(caminho_config)
+            gravados = incremental.registrar([
+                (id_d, self.dispositivos[id_d].detalhes().como_dict() if vivo and id_d in self.dispositivos else None)
+                for id_d, vivo in alterados.items()
+            ])
+            if incremental.precisa_compactar():
+                incremental.compactar({"dispositivos": [d.detalhes().como_dict() for d in self.dispositivos]})
+
+        if caminho_rotinas:
+            alteradas = self.rastreador_rotinas.coletar()
+            incremental = self._arquivo_incremental(caminho_rotinas)
+            rotinas_gravadas = incremental.registrar([
+                (id_r, self.rotinas[id_r] if viva and id_r in self.rotinas else None)
+                for id_r, viva in alteradas.items()
+            ])
+            if incremental.precisa_compactar():
+                incremental.compactar(self.rotinas)
+
+        logger.info("Alterações salvas: %d dispositivo(s), %d rotina(s).", gravados, rotinas_gravadas)
+        return gravados, rotinas_gravadas
+
+    # -------------------------------
+    # Snapshot binário
+    # -------------------------------
+    @metricas.cronometrado("smart_home_persistencia_segundos", operacao="salvar_snapshot")
+    def salvar_snapshot(self, caminho):
+        """Estado completo do hub (dispositivos com campos internos, rotinas, contadores)."""
+
+        inicio = time.perf_counter()
+        extras = {
+            "rotinas": self.rotinas,
+            "estatisticas_regras": self.regras.estatisticas(),
+            "agregados": self.agregados.como_dict(),
+        }
+        snapshot.salvar_snapshot(caminho, list(self.dispositivos), extras)
+        logger.info("Snapshot de %d dispositivo(s) salvo em '%s' (%.1f ms).",
+                    len(self.dispositivos), caminho, (time.perf_counter() - inicio) * 1000)
+
+    @metricas.cronometrado("smart_home_persistencia_segundos", operacao="restaurar_snapshot")
+    def restaurar_snapshot(self, caminho):
+        """Substitui dispositivos, rotinas, regras e agregados pelo conteúdo do snapshot."""
 
+        inicio = time.perf_counter()
+
+        # milhões de objetos novos e permanentes: coletas no meio da carga só custam tempo
+        gc_ativo = gc.isenabled()
+        gc.disable()
         try:
-            with open(caminho_json, 'w', encoding='utf-8') as f:
-                json.dump(dados_config, f, indent=4)
-            print(f"[INFO] Configuração salva em '{caminho_json}'.")
-        except IOError as e:
-            print(f"[ERRO] Não foi possível salvar o arquivo: {e}")
+            dispositivos, extras = snapshot.carregar_snapshot(caminho)
+
+            self.dispositivos = RegistroDispositivos()
+            self.dispositivos.adicionar_lote(dispositivos)
+            for dispositivo in dispositivos:
+                self._acompanhar(dispositivo)
+        finally:
+            if gc_ativo:
+                gc.enable()
+
+        # regras apontam para o registro: são recriadas a partir das rotinas
+        self.rotinas = extras.get("rotinas", {})
+        self.regras = DespachanteRegras()
+        for id_tarefa in self._agendas_rotinas.values():
+            self.agendador.cancelar(id_tarefa)
+        self._agendas_rotinas = {}
+        for id_rotina, rotina in self.rotinas.items():
+            self._indexar_regra_rotina(id_rotina, rotina)
+            self._agendar_rotina_configurada(id_rotina, rotina)
+        self.regras.restaurar_estatisticas(extras.get("estatisticas_regras", {}))
+
+        self.agregados = AgregadosEnergia.de_dict(extras.get("agregados", {}))
+        if self.retencao:
+            self.retencao.dispositivos = self.dispositivos
+
+        logger.info("Snapshot '%s' restaurado: %d dispositivo(s) em %.1f ms.",
+                    caminho, len(self.dispositivos), (time.perf_counter() - inicio) * 1000)
+        return self.dispositivos
 
     # -------------------------------
     # Eventos
     # -------------------------------
     def registrar_observer(self, observer):
-        if observer not in self.observers:
+        if isinstance(observer, RotinaObserver):
+            self.regras.adicionar(observer)
+        elif observer not in self.observers:
             self.observers.append(observer)
 
     def remover_observer(self, observer):
-        if observer in self.observers:
+        if isinstance(observer, RotinaObserver):
+            self.regras.remover(observer)
+        elif observer in self.observers:
             self.observers.remove(observer)
 
     def notificar(self, evento: Evento):
-        print(f"[EVENTO] {evento}")
+        logger.debug("Evento: %s", evento)
+        self.regras.despachar(evento)
         for obs in self.observers:
             obs.atualizar(evento)
 
-    def exportar_eventos_csv(self, eventos, nome_arquivo):
+    def update(self, subject, event=None, detalhes=None, **kwargs):
+        # ponte entre o notify dos dispositivos e os observers do hub
+        # (agregados e armazenamento recebem pelo RegistradorEventos, síncrono).
+        # Edição de atributo não é evento do hub: só o RastreadorAlteracoes,
+        # anexado ao dispositivo, precisa dela, e regras "*" não devem disparar
+        if event and event != "atributo":
+            self.notificar(Evento(event, subject.id, detalhes))
+
+    @property
+    def agregados(self):
+        return self.registrador.agregados
+
+    @agregados.setter
+    def agregados(self, agregados):
+        self.registrador.agregados = agregados
+
+    def registrar_eventos(self, armazenamento):
+        """A partir daqui todo evento de estado dos dispositivos é gravado em 'armazenamento'."""
+
+        self.registrador.armazenamento = armazenamento
+
+    def salvar_checkpoint_agregados(self, caminho):
+        self.registrador.salvar_checkpoint(caminho)
+
+    def iniciar_retencao(self, armazenamento, intervalo_s=3600.0, **janelas):
+        """
+        Liga a compactação periódica do histórico (ver RetencaoEventos);
+        'janelas' aceita janela_bruta e janela_horaria (timedelta).
+        """
+        if self.retencao is None:
+            self.retencao = RetencaoEventos(armazenamento, self.dispositivos, agregados=lambda: self.agregados,
+                                            **janelas)
+        self.retencao.iniciar(intervalo_s)
+        return self.retencao
+
+    def historico(self, id_dispositivo, inicio=None, fim=None, granularidade="hora"):
+        """Série do dispositivo juntando eventos brutos e resumos (requer iniciar_retencao)."""
+
+        if self.retencao is None:
+            logger.error("Retenção não iniciada: histórico resumido indisponível.")
+            return []
+        return self.retencao.serie(id_dispositivo, inicio, fim, granularidade)
+
+    def exportar_eventos_csv(self, eventos, nome_arquivo, dispositivos=None, tipos_evento=None, inicio=None, fim=None):
+        """
+        'eventos' é um iterável de eventos ou um ArmazenamentoEventos; no
+        segundo caso os filtros viram uma consulta pelos índices.
+        """
+        if isinstance(eventos, ArmazenamentoEventos):
+            eventos = eventos.consultar(dispositivos, tipos_evento, inicio, fim)
+
         fieldnames = ["id_dispositivo", "evento", "timestamp"]
         self._salvar_csv(nome_arquivo, fieldnames, eventos)
 
     # -------------------------------
     # Rotinas
     # -------------------------------
+    @metricas.cronometrado("smart_home_persistencia_segundos", operacao="carregar_rotinas")
     def carregar_rotinas(self, caminho_rotinas):
-        if not os.path.exists(caminho_rotinas) or os.stat(caminho_rotinas).st_size == 0:
-            print(f"[WARN] Arquivo '{caminho_rotinas}' não encontrado ou vazio. Lista de rotinas vazia.")
-            return {}
-
-        try:
-            with open(caminho_rotinas, 'r', encoding='utf-8') as f:
-                dados = json.load(f)
-
-            rotinas_dict = {}
-            if "rotinas" in dados and isinstance(dados["rotinas"], list):
-                rotinas_dict = {r["id"]: r for r in dados["rotinas"]}
-            elif isinstance(dados, dict):
-                rotinas_dict = {
-                    rid: {"id": rid, "nome": r.get("nome", rid), "acoes": r.get("acoes", [])}
-                    for rid, r in dados.items() if isinstance(r, dict)
-                }
-
-            print(f"[INFO] {len(rotinas_dict)} rotina(s) carregada(s).")
+        rotinas_dict = {}
+        if not caminho_rotinas:
             return rotinas_dict
+        incremental = self._arquivo_incremental(caminho_rotinas)
 
-        except (IOError, json.JSONDecodeError) as e:
-            print(f"[ERRO] Falha ao ler '{caminho_rotinas}': {e}")
-            return {}
+        if not os.path.exists(caminho_rotinas) or os.stat(caminho_rotinas).st_size == 0:
+            if not incremental.linhas_delta:
+                logger.warning("Arquivo '%s' não encontrado ou vazio. Lista de rotinas vazia.", caminho_rotinas)
+                return {}
+        else:
+            try:
+                with open(caminho_rotinas, 'r', encoding='utf-8') as f:
+                    dados = json.load(f)
+
+                if "rotinas" in dados and isinstance(dados["rotinas"], list):
+                    rotinas_dict = {r["id"]: r for r in dados["rotinas"]}
+                elif isinstance(dados, dict):
+                    rotinas_dict = {
+                        rid: self._normalizar_rotina(rid, r)
+                        for rid, r in dados.items() if isinstance(r, dict)
+                    }
+
+            except (IOError, json.JSONDecodeError) as e:
+                logger.error("Falha ao ler '%s': %s", caminho_rotinas, e)
+                return {}
+
+        for id_rotina, rotina in incremental.deltas():
+            if rotina is None:
+                rotinas_dict.pop(id_rotina, None)
+            else:
+                rotinas_dict[id_rotina] = self._normalizar_rotina(id_rotina, rotina)
 
-    def executar_rotinas(self, id_rotina):
+        logger.info("%d rotina(s) carregada(s).", len(rotinas_dict))
+        return rotinas_dict
+
+    @staticmethod
+    def _normalizar_rotina(id_rotina, rotina):
+        normalizada = {"id": id_rotina, "nome": rotina.get("nome", id_rotina), "acoes": rotina.get("acoes", [])}
+        for chave in ("quando", "origem", "agenda"):
+            if rotina.get(chave):
+                normalizada[chave] = rotina[chave]
+        return normalizada
+
+    def _indexar_regra_rotina(self, id_rotina, rotina):
+        # rotinas com gatilho ("quando"/"origem") viram regras indexadas
+        self.regras.remover_por_id(id_rotina)
+        if rotina.get("quando") or rotina.get("origem"):
+            regra = dict(rotina, id=id_rotina)
+            self.regras.adicionar(RotinaObserver(regra, self.dispositivos))
+
+    def _agendar_rotina_configurada(self, id_rotina, rotina):
+        # "agenda" na rotina: "0 23 * * *" ou {"cron": ...} / {"a_cada_s": ...}
+        anterior = self._agendas_rotinas.pop(id_rotina, None)
+        if anterior is not None:
+            self.agendador.cancelar(anterior)
+
+        agenda = rotina.get("agenda")
+        if not agenda:
+            return
+        if isinstance(agenda, str):
+            agenda = {"cron": agenda}
+        try:
+            self._agendas_rotinas[id_rotina] = self.agendar_rotina(
+                id_rotina, cron=agenda.get("cron"), a_cada_s=agenda.get("a_cada_s"))
+        except ValueError as e:
+            logger.error("Agenda inválida na rotina '%s': %s", id_rotina, e)
+
+    def adicionar_rotina(self, id_rotina, rotina):
+        self.rotinas[id_rotina] = self._normalizar_rotina(id_rotina, rotina)
+        self._indexar_regra_rotina(id_rotina, self.rotinas[id_rotina])
+        self._agendar_rotina_configurada(id_rotina, self.rotinas[id_rotina])
+        self.rastreador_rotinas.marcar(id_rotina)
+        return self.rotinas[id_rotina]
+
+    def executar_rotinas(self, id_rotina, paralelo=True):
+        """
+        Executa a rotina e devolve um ResultadoComando por ação (na ordem da
+        rotina). Dispositivos diferentes rodam em paralelo; a ordem dos
+        comandos de um mesmo dispositivo é mantida.
+        """
         rotina = self.rotinas.get(id_rotina)
 
         if not rotina:
-            print(f"[ERRO] Rotina com o ID '{id_rotina}' não encontrada.")
-            return
+            logger.error("Rotina com o ID '%s' não encontrada.", id_rotina)
+            return []
 
         comandos = rotina.get("comandos") or rotina.get("acoes") or []
         if not comandos:
-            print(f"[ERRO] A rotina '{rotina['nome']}' não contém comandos/ações válidos.")
-            return
+            logger.error("A rotina '%s' não contém comandos/ações válidos.", rotina['nome'])
+            return []
 
-        ids_invalidos = [c["id_dispositivo"] for c in comandos if not self.buscar_por_id(c["id_dispositivo"])]
+        # resolve cada dispositivo uma única vez (validação + execução)
+        passos = [(c, self.buscar_por_id(c["id_dispositivo"])) for c in comandos]
+        ids_invalidos = [c["id_dispositivo"] for c, d in passos if d is None]
         if ids_invalidos:
-            print(f"[ERRO] A rotina '{rotina['nome']}' contém dispositivos inválidos: {', '.join(ids_invalidos)}")
-            return
+            logger.error("A rotina '%s' contém dispositivos inválidos: %s", rotina['nome'], ', '.join(ids_invalidos))
+            return []
 
-        print(f"\n---- Executando rotina: {rotina['nome']} ----")
-        for comando_info in comandos:
-            dispositivo_id = comando_info["id_dispositivo"]
-            comando = comando_info["comando"]
-            dispositivo = self.buscar_por_id(dispositivo_id)
+        registro = metricas.registro
+        if registro is None:
+            return self.executor.executar([(d, c["comando"]) for c, d in passos], paralelo=paralelo)
 
-            try:
-                dispositivo.executar_comando(comando)
-                print(f"> Executado '{comando}' em '{dispositivo.nome}' (ID: {dispositivo_id})")
-            except Exception as e:
-                print(f"> [ERRO] Falha ao executar '{comando}' em '{dispositivo.nome}': {e}")
+        inicio = time.perf_counter()
+        resultados = self.executor.executar([(d, c["comando"]) for c, d in passos], paralelo=paralelo)
+        registro.histograma("smart_home_rotina_segundos", rotina=id_rotina).registrar(time.perf_counter() - inicio)
+        falhas = sum(not r.sucesso for r in resultados)
+        if falhas:
+            registro.contador("smart_home_rotina_falhas_total", rotina=id_rotina).incrementar(falhas)
+        return resultados
+
+    # -------------------------------
+    # Agendamento
+    # -------------------------------
+    def iniciar_agendador(self):
+        """Liga a thread que dispara rotinas agendadas e comandos com atraso."""
+
+        self.agendador.iniciar()
+        return self.agendador
+
+    def agendar_rotina(self, id_rotina, cron=None, a_cada_s=None, atraso_s=None):
+        """
+        Agenda executar_rotinas(id_rotina) por expressão cron, a cada
+        'a_cada_s' segundos ou uma vez após 'atraso_s'. Devolve o id da
+        tarefa (para agendador.cancelar).
+        """
+        if id_rotina not in self.rotinas:
+            raise ValueError(f"Rotina com o ID '{id_rotina}' não encontrada.")
+        if sum(opcao is not None for opcao in (cron, a_cada_s, atraso_s)) != 1:
+            raise ValueError("Informe exatamente um entre cron, a_cada_s e atraso_s.")
 
-        print("---- Rotina concluída ----")
+        def acao():
+            self.executar_rotinas(id_rotina)
+
+        nome = f"rotina:{id_rotina}"
+        if cron is not None:
+            return self.agendador.cron(cron, acao, nome)
+        if a_cada_s is not None:
+            return self.agendador.a_cada(a_cada_s, acao, nome)
+        return self.agendador.em(atraso_s, acao, nome)
+
+    def agendar_comando(self, id_dispositivo, comando, atraso_s):
+        """Executa 'comando' no dispositivo daqui a 'atraso_s' segundos (ex.: desligar a tomada em 30 min)."""
+
+        dispositivo = self.buscar_por_id(id_dispositivo)
+        if dispositivo is None:
+            raise ValueError(f"Dispositivo '{id_dispositivo}' não encontrado.")
+        if comando not in dispositivo.machine.gatilhos:
+            raise ValueError(f"Comando '{comando}' inválido para {dispositivo.tipo}.")
+
+        def acao():
+            codigo = dispositivo.tentar_comando(comando)
+            if codigo is not CodigoComando.OK:
+                logger.warning("Comando agendado '%s' em '%s' recusado: %s.", comando, id_dispositivo, codigo.name)
+
+        return self.agendador.em(atraso_s, acao, f"{comando}:{id_dispositivo}")
+
+    # -------------------------------
+    # Comandos em lote
+    # -------------------------------
+    def selecionar_dispositivos(self, filtro=None):
+        """
+        filtro: dict com qualquer combinação de "ids" (lista), "tipo" e
+        "estado". Sem filtro, todos os dispositivos.
+        """
+        filtro = filtro or {}
+        ids, tipo, estado = filtro.get("ids"), filtro.get("tipo"), filtro.get("estado")
+
+        if ids is not None:
+            selecionados = [d for d in map(self.dispositivos.get, ids) if d is not None]
+            return [d for d in selecionados
+                    if (tipo is None or d.tipo == tipo) and (estado is None or d.state == estado)]
+
+        if estado is not None:
+            return self.dispositivos.por_estado(estado, tipo)
+        if tipo is not None:
+            return self.dispositivos.por_tipo(tipo)
+        return list(self.dispositivos)
+
+    def executar_em_lote(self, filtro, comando):
+        """
+        Aplica 'comando' a todos os dispositivos do filtro (ver
+        selecionar_dispositivos). Dispositivos que não aceitam o comando no
+        estado atual são pulados. Devolve {id: CodigoComando}; ids pedidos que
+        não existem aparecem como NAO_ENCONTRADO.
+        """
+        codigos = executar_em_lote(self.selecionar_dispositivos(filtro), comando)
+
+        for id_dispositivo in (filtro or {}).get("ids") or ():
+            if id_dispositivo not in self.dispositivos:
+                codigos[id_dispositivo] = CodigoComando.NAO_ENCONTRADO
+
+        ok = sum(1 for c in codigos.values() if c == CodigoComando.OK)
+        logger.info("Lote '%s': %d de %d dispositivo(s) executado(s).", comando, ok, len(codigos))
+        return codigos
 
     # -------------------------------
     # Relatórios
     # -------------------------------
-    def _salvar_csv(self, nome_arquivo, fieldnames, linhas):
+    @staticmethod
+    def _salvar_csv(nome_arquivo, fieldnames, linhas):
         pasta = os.path.dirname(nome_arquivo)
         if pasta and not os.path.exists(pasta):
             os.makedirs(pasta, exist_ok=True)
@@ -259,11 +660,23 @@ class AutomacaoResidencial(Singleton):
                 writer.writeheader()
                 writer.writerows(linhas)
 
-            print(f"[INFO] Relatório gerado em '{nome_arquivo}'.")
+            logger.info("Relatório gerado em '%s'.", nome_arquivo)
         except IOError as e:
-            print(f"[ERRO] Não foi possível salvar relatório: {e}")
+            logger.error("Não foi possível salvar relatório: %s", e)
+
+    def restaurar_agregados(self, journal, caminho_checkpoint=None):
+        potencias = {d.id: d.potencia_W for d in self.dispositivos.por_tipo("TOMADA")}
+        self.agregados = AgregadosEnergia.reconstruir(journal, potencias, caminho_checkpoint)
+        return self.agregados
+
+    def gerar_relatorio(self, tipo_relatorio, nome_arquivo, eventos=None, inicio=None, fim=None):
+        relatorio = self.linhas_relatorio(tipo_relatorio, eventos, inicio, fim)
+        if relatorio is not None:
+            self._salvar_csv(nome_arquivo, *relatorio)
+
+    def linhas_relatorio(self, tipo_relatorio, eventos=None, inicio=None, fim=None):
+        """(colunas, linhas) do relatório, ou None se o tipo não puder ser gerado."""
 
-    def gerar_relatorio(self, tipo_relatorio, nome_arquivo):
         if tipo_relatorio == "dispositivos":
             linhas = []
             for d in self.dispositivos:
@@ -281,20 +694,52 @@ class AutomacaoResidencial(Singleton):
                     "estado": detalhes.get("estado"),
                     "extra_info": extra
                 })
-            self._salvar_csv(nome_arquivo, ["id", "nome", "tipo", "estado", "extra_info"], linhas)
+            return ["id", "nome", "tipo", "estado", "extra_info"], linhas
 
-        elif tipo_relatorio == "consumo_tomada":
+        if tipo_relatorio == "consumo_tomada":
             linhas = [
                 {"id": d.id, "nome": d.nome, "consumo_wh": d.consumo_total()}
-                for d in self.dispositivos if d.tipo == "TOMADA"
+                for d in self.dispositivos.por_tipo("TOMADA")
             ]
-            self._salvar_csv(nome_arquivo, ["id", "nome", "consumo_wh"], linhas)
+            return ["id", "nome", "consumo_wh"], linhas
 
-        else:
-            print("[ERRO] Tipo de relatório inválido.")
+        if tipo_relatorio == "consumo_agregado":
+            # responde pela soma dos buckets materializados, sem varrer eventos
+            nomes = {d.id: d.nome for d in self.dispositivos.por_tipo("TOMADA")}
+            linhas = [
+                {"id": id_d, "nome": nomes.get(id_d, ""), "consumo_wh": wh}
+                for id_d, wh in self.agregados.consumo(inicio=inicio, fim=fim).items()
+            ]
+            return ["id", "nome", "consumo_wh"], linhas
+
+        if tipo_relatorio == "consumo_historico":
+            # eventos brutos recentes + séries resumidas dos períodos já compactados
+            if self.retencao is None:
+                logger.error("Retenção não iniciada: histórico resumido indisponível.")
+                return None
+            linhas = [
+                {"id": d.id, "nome": d.nome, "consumo_wh": self.retencao.consumo_wh(d.id, inicio, fim)}
+                for d in self.dispositivos.por_tipo("TOMADA")
+            ]
+            return ["id", "nome", "consumo_wh"], linhas
+
+        if tipo_relatorio == "consumo_eventos":
+            # 'eventos' pode ser qualquer iterável (ex.: ler_eventos_jsonl) ou o
+            # ArmazenamentoEventos; as linhas são gravadas conforme os intervalos
+            # fecham, sem carregar o histórico inteiro; uma lista já carregada
+            # passa por calcular_consumo_tomada, que pareia as grandes em lote
+            tomadas = self.dispositivos.por_tipo("TOMADA")
+            if isinstance(eventos, list):
+                linhas = calcular_consumo_tomada(eventos, tomadas, inicio, fim)
+            else:
+                linhas = iterar_consumo_tomada(eventos or [], tomadas, inicio, fim)
+            return ["id_dispositivo", "total_wh", "periodo_inicio", "periodo_fim"], linhas
+
+        logger.error("Tipo de relatório inválido.")
+        return None
 
-    def _calcular_consumo_tomadas(self, eventos_log):
-        return calcular_consumo_tomada(eventos_log, self.dispositivos)
+    def _calcular_consumo_tomadas(self, eventos_log, inicio=None, fim=None):
+        return calcular_consumo_tomada(eventos_log, self.dispositivos.por_tipo("TOMADA"), inicio, fim)
 
     @classmethod
     def instancia(cls):
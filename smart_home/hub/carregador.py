@@ -0,0 +1,150 @@
+import gc
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from smart_home.hub.registro import RegistroDispositivos
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
+
+_INICIO_LISTA = re.compile(r'"dispositivos"\s*:\s*\[')
+_ESPACOS = " \t\r\n,"
+
+
+def iterar_config_dispositivos(caminho, tamanho_bloco=64 * 1024):
+    """
+    Lê a lista "dispositivos" do arquivo de configuração em streaming:
+    o arquivo é lido em blocos e cada entrada é decodificada assim que
+    fica completa, sem montar o documento inteiro na memória.
+    """
+    decoder = json.JSONDecoder()
+
+    with open(caminho, "r", encoding="utf-8") as f:
+        buffer = ""
+        inicio = None
+
+        while inicio is None:
+            bloco = f.read(tamanho_bloco)
+            if not bloco:
+                return
+            buffer += bloco
+            encontrado = _INICIO_LISTA.search(buffer)
+            if encontrado:
+                inicio = encontrado.end()
+
+        buffer, pos, fim_arquivo = buffer[inicio:], 0, False
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in _ESPACOS:
+                pos += 1
+
+            if pos < len(buffer):
+                if buffer[pos] == "]":
+                    return
+                try:
+                    entrada, pos = decoder.raw_decode(buffer, pos)
+                    yield entrada
+                    continue
+                except json.JSONDecodeError:
+                    if fim_arquivo:
+                        raise
+
+            elif fim_arquivo:
+                raise json.JSONDecodeError("Lista 'dispositivos' não foi fechada", buffer, pos)
+
+            # entrada incompleta: descarta o que já foi lido e traz mais um bloco
+            bloco = f.read(tamanho_bloco)
+            fim_arquivo = not bloco
+            buffer, pos = buffer[pos:] + bloco, 0
+
+
+def _construir_lote(lote, fabrica):
+    construidos = []
+    inicio = time.perf_counter()
+
+    for config in lote:
+        try:
+            construidos.append(fabrica(config))
+        except Exception as e:
+            logger.error("Não foi possível carregar '%s' (ID %s): %s", config.get('nome', 'Sem Nome'), config.get('id'), e)
+
+    return construidos, time.perf_counter() - inicio
+
+
+def carregar_config(caminho, fabrica, tamanho_lote=1000, trabalhadores=0, tamanho_bloco=64 * 1024, aceitar=None):
+    """
+    Carrega os dispositivos de 'caminho' em lotes de 'tamanho_lote'
+    entradas. Com trabalhadores > 0, cada lote é construído num pool de
+    threads enquanto o próximo é lido; a ordem do arquivo é mantida no
+    registro. 'aceitar' (config -> bool) escolhe quais entradas construir.
+
+    Devolve (RegistroDispositivos, tempos), onde tempos traz a duração de
+    cada fase em segundos: leitura (I/O + parse), construcao, registro e total.
+    """
+    tempos = {"leitura_s": 0.0, "construcao_s": 0.0, "registro_s": 0.0, "total_s": 0.0, "dispositivos": 0}
+    registro = RegistroDispositivos()
+    inicio_total = time.perf_counter()
+
+    def registrar(construidos, duracao):
+        tempos["construcao_s"] += duracao
+        inicio = time.perf_counter()
+        for id_dispositivo in registro.adicionar_lote(construidos):
+            logger.error("ID duplicado ignorado: '%s'", id_dispositivo)
+        tempos["registro_s"] += time.perf_counter() - inicio
+
+    entradas = iterar_config_dispositivos(caminho, tamanho_bloco)
+    if aceitar is not None:
+        # só as entradas aceitas são construídas (ex.: a fatia de um fragmento)
+        entradas = filter(aceitar, entradas)
+    pool = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="carga") if trabalhadores > 0 else None
+    pendentes = []
+
+    # a carga só cria objetos que vivem até o fim do processo: as coletas
+    # automáticas no meio dela percorrem tudo de novo sem liberar nada
+    gc_ativo = gc.isenabled()
+    gc.disable()
+
+    try:
+        while True:
+            inicio = time.perf_counter()
+            lote = list(islice(entradas, tamanho_lote))
+            tempos["leitura_s"] += time.perf_counter() - inicio
+
+            if not lote:
+                break
+
+            if pool is None:
+                registrar(*_construir_lote(lote, fabrica))
+                continue
+
+            pendentes.append(pool.submit(_construir_lote, lote, fabrica))
+            # registra os lotes já prontos, sempre na ordem do arquivo
+            while pendentes and pendentes[0].done():
+                registrar(*pendentes.pop(0).result())
+
+        for futuro in pendentes:
+            registrar(*futuro.result())
+
+    except (OSError, ValueError) as e:
+        # como no json.load de antes: arquivo corrompido não gera carga parcial
+        logger.error("Falha ao ler '%s': %s", caminho, e)
+        registro = RegistroDispositivos()
+
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+        if gc_ativo:
+            gc.enable()
+
+    tempos["total_s"] = time.perf_counter() - inicio_total
+    tempos["dispositivos"] = len(registro)
+
+    logger.info(
+        "%d dispositivo(s) carregado(s) em %.1f ms (leitura %.1f ms, construção %.1f ms, registro %.1f ms).",
+        tempos["dispositivos"], tempos["total_s"] * 1000, tempos["leitura_s"] * 1000,
+        tempos["construcao_s"] * 1000, tempos["registro_s"] * 1000,
+    )
+    return registro, tempos
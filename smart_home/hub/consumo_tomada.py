@@ -1,31 +1,77 @@
 from datetime import datetime
+from smart_home.hub.armazenamento import ArmazenamentoEventos, para_iso
+from smart_home.utils.logs import obter_logger
 
-def calcular_consumo_tomada(eventos_log, dispositivos):
+logger = obter_logger(__name__)
+
+# a partir deste tamanho uma lista de eventos vai para o pareamento em lote
+# do NumPy (consumo_vetorizado); abaixo dele o laço Python empata (bench_consumo)
+LIMIAR_VETORIZADO = 100_000
+
+
+def _na_janela(eventos, inicio, fim):
+    janela_inicio, janela_fim = para_iso(inicio), para_iso(fim)
+    return (e for e in eventos
+            if (janela_inicio is None or e['timestamp'] >= janela_inicio)
+            and (janela_fim is None or e['timestamp'] < janela_fim))
+
+
+def iterar_consumo_tomada(eventos, dispositivos, inicio=None, fim=None):
+    """
+    Versão em streaming: aceita qualquer iterável de eventos (lista, gerador
+    lendo JSON-Lines/CSV...) e devolve as linhas de consumo à medida que cada
+    intervalo fecha. Só a tabela de intervalos abertos fica em memória.
+
+    Com um ArmazenamentoEventos, só os 'ligar'/'desligar' das tomadas na
+    janela [inicio, fim) são lidos, pelo índice.
+    """
 
-    consumos = []
     tomadas_log = {}
     tomadas_potencia = {d.id: d.potencia_W for d in dispositivos if d.tipo == 'TOMADA'}
 
     if not tomadas_potencia:
-        print("[INFO] Nao ha tomadas cadastradas para gerar o relatorio.")
-        return []
+        logger.info("Nao ha tomadas cadastradas para gerar o relatorio.")
+        return
+
+    if isinstance(eventos, ArmazenamentoEventos):
+        eventos = eventos.consultar(list(tomadas_potencia), ("ligar", "desligar"), inicio, fim)
+    elif inicio is not None or fim is not None:
+        eventos = _na_janela(eventos, inicio, fim)
 
-    for evento in eventos_log:
+    for evento in eventos:
         id_dispositivo = evento.get('id_dispositivo')
         if id_dispositivo in tomadas_potencia:
             if evento['evento'] == 'ligar':
                 tomadas_log[id_dispositivo] = datetime.fromisoformat(evento['timestamp'])
             elif evento['evento'] == 'desligar' and id_dispositivo in tomadas_log:
-                inicio = tomadas_log.pop(id_dispositivo)
-                fim = datetime.fromisoformat(evento['timestamp'])
-                duracao_h = (fim - inicio).total_seconds() / 3600
+                ligada_em = tomadas_log.pop(id_dispositivo)
+                desligada_em = datetime.fromisoformat(evento['timestamp'])
+                duracao_h = (desligada_em - ligada_em).total_seconds() / 3600
                 potencia = tomadas_potencia[id_dispositivo]
                 consumo_wh = potencia * duracao_h
-                consumos.append({
+                yield {
                     'id_dispositivo': id_dispositivo,
                     'total_wh': round(consumo_wh, 2),
-                    'periodo_inicio': inicio.isoformat(),
-                    'periodo_fim': fim.isoformat()
-                })
+                    'periodo_inicio': ligada_em.isoformat(),
+                    'periodo_fim': desligada_em.isoformat()
+                }
+
+
+def calcular_consumo_tomada(eventos_log, dispositivos, inicio=None, fim=None):
+    """
+    Linhas de consumo das tomadas. Listas com LIMIAR_VETORIZADO eventos ou
+    mais são pareadas em lote pelo NumPy; sem NumPy, ou para armazenamentos
+    e iteráveis, o laço Python de iterar_consumo_tomada. O resultado é o mesmo.
+    """
+
+    if isinstance(eventos_log, list) and len(eventos_log) >= LIMIAR_VETORIZADO:
+        try:
+            from smart_home.hub.consumo_vetorizado import calcular_consumo_tomada_vetorizado
+        except ImportError:
+            logger.debug("NumPy indisponível; consumo das tomadas pelo laço Python.")
+        else:
+            if inicio is not None or fim is not None:
+                eventos_log = list(_na_janela(eventos_log, inicio, fim))
+            return calcular_consumo_tomada_vetorizado(eventos_log, dispositivos)
 
-    return consumos
+    return list(iterar_consumo_tomada(eventos_log, dispositivos, inicio, fim))
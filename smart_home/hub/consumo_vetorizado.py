@@ -0,0 +1,175 @@
+import numpy as np
+
+from smart_home.hub.consumo_tomada import iterar_consumo_tomada
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
+
+EVENTO_OUTRO, EVENTO_LIGAR, EVENTO_DESLIGAR = 0, 1, 2
+_CODIGOS_EVENTO = {"ligar": EVENTO_LIGAR, "desligar": EVENTO_DESLIGAR}
+
+_US_POR_SEGUNDO = 1_000_000
+
+
+class TimestampNaoSuportado(ValueError):
+    pass
+
+
+class ColunasEventos:
+    """
+    Eventos de tomadas em colunas tipadas:
+    dispositivo (int32, índice em 'ids'), evento (int8), instante (int64, µs
+    desde a época) e o texto ISO que datetime.isoformat() produziria.
+    A posição na coluna preserva a ordem original do log.
+    """
+
+    def __init__(self, ids, dispositivo, evento, instante, textos):
+        self.ids = ids
+        self.dispositivo = dispositivo
+        self.evento = evento
+        self.instante = instante
+        self.textos = textos
+
+    @classmethod
+    def de_eventos(cls, eventos_log, ids):
+        eventos_log = eventos_log if isinstance(eventos_log, list) else list(eventos_log)
+        codigos = {id_dispositivo: i for i, id_dispositivo in enumerate(ids)}
+
+        dispositivo = np.array([codigos.get(e.get('id_dispositivo'), -1) for e in eventos_log], dtype=np.int32)
+        evento = np.array([_CODIGOS_EVENTO.get(e.get('evento'), EVENTO_OUTRO) for e in eventos_log], dtype=np.int8)
+
+        relevantes = np.flatnonzero((dispositivo >= 0) & (evento != EVENTO_OUTRO))
+        timestamps = [eventos_log[i]['timestamp'] for i in relevantes.tolist()]
+        instante, textos = converter_timestamps(timestamps)
+
+        return cls(list(ids), dispositivo[relevantes], evento[relevantes], instante, textos)
+
+    def __len__(self):
+        return len(self.dispositivo)
+
+
+def converter_timestamps(timestamps):
+    """
+    Converte textos ISO 'AAAA-MM-DDTHH:MM:SS[.ffffff]' (sem fuso) em µs desde
+    a época, em lote. Qualquer outro formato levanta TimestampNaoSuportado.
+
+    Também devolve o texto que datetime.isoformat() produziria para cada
+    instante, que só difere do original quando a fração é '.000000'.
+    """
+    n = len(timestamps)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.array([], dtype=object)
+
+    texto = np.array(timestamps)
+    if texto.dtype.kind != 'U' or texto.itemsize // 4 not in (19, 26):
+        raise TimestampNaoSuportado("timestamps fora do formato ISO canônico")
+
+    codigos = texto.view(np.uint32).reshape(n, texto.itemsize // 4)
+    tamanho = np.char.str_len(texto)
+    com_fracao = tamanho == 26
+
+    canonico = (
+        ((tamanho == 19) | com_fracao)
+        & (codigos[:, 4] == ord('-')) & (codigos[:, 7] == ord('-')) & (codigos[:, 10] == ord('T'))
+        & (codigos[:, 13] == ord(':')) & (codigos[:, 16] == ord(':'))
+    )
+    if com_fracao.any():
+        canonico &= ~com_fracao | (codigos[:, 19] == ord('.'))
+    if not canonico.all():
+        raise TimestampNaoSuportado("timestamps fora do formato ISO canônico")
+
+    # dígitos inválidos ou datas impossíveis fazem o NumPy levantar ValueError
+    instante = texto.astype('datetime64[us]').astype(np.int64)
+
+    textos = np.array(timestamps, dtype=object)
+    if com_fracao.any():
+        fracao_zero = com_fracao & (instante % _US_POR_SEGUNDO == 0)
+        for i in np.flatnonzero(fracao_zero).tolist():
+            textos[i] = timestamps[i][:19]
+
+    return instante, textos
+
+
+def parear_intervalos(colunas):
+    """
+    Devolve (posicoes_inicio, posicoes_fim) dos intervalos ligar->desligar,
+    na ordem em que os 'desligar' aparecem no log.
+
+    Mesma regra do cálculo original: um 'desligar' fecha um intervalo se o
+    evento anterior do mesmo dispositivo foi um 'ligar' (um 'ligar' repetido
+    sobrescreve o início).
+    """
+    ordem = np.argsort(colunas.dispositivo, kind='stable')
+    dispositivo = colunas.dispositivo[ordem]
+    evento = colunas.evento[ordem]
+
+    fecha = (
+        (evento[1:] == EVENTO_DESLIGAR)
+        & (evento[:-1] == EVENTO_LIGAR)
+        & (dispositivo[1:] == dispositivo[:-1])
+    )
+    fim = ordem[1:][fecha]
+    inicio = ordem[:-1][fecha]
+
+    na_ordem_do_log = np.argsort(fim, kind='stable')
+    return inicio[na_ordem_do_log], fim[na_ordem_do_log]
+
+
+def consumo_intervalos(colunas, potencias, inicio, fim):
+    # mesma sequência de operações de ponto flutuante do cálculo original
+    duracao_h = ((colunas.instante[fim] - colunas.instante[inicio]) / 1e6) / 3600
+    return potencias[colunas.dispositivo[fim]] * duracao_h
+
+
+def _potencias(colunas, tomadas_potencia):
+    return np.array([tomadas_potencia[i] for i in colunas.ids], dtype=np.float64)
+
+
+def consumo_de_colunas(colunas, tomadas_potencia):
+    inicio, fim = parear_intervalos(colunas)
+    consumo = consumo_intervalos(colunas, _potencias(colunas, tomadas_potencia), inicio, fim)
+
+    ids = colunas.ids
+    return [
+        {
+            'id_dispositivo': ids[d],
+            'total_wh': round(wh, 2),
+            'periodo_inicio': i,
+            'periodo_fim': f
+        }
+        for d, wh, i, f in zip(colunas.dispositivo[fim].tolist(), consumo.tolist(),
+                               colunas.textos[inicio].tolist(), colunas.textos[fim].tolist())
+    ]
+
+
+def calcular_consumo_tomada_vetorizado(eventos_log, dispositivos):
+    """Mesmo resultado de iterar_consumo_tomada, com o pareamento feito em lote no NumPy."""
+
+    tomadas_potencia = {d.id: d.potencia_W for d in dispositivos if d.tipo == 'TOMADA'}
+
+    if not tomadas_potencia:
+        logger.info("Nao ha tomadas cadastradas para gerar o relatorio.")
+        return []
+
+    try:
+        colunas = ColunasEventos.de_eventos(eventos_log, list(tomadas_potencia))
+    except (ValueError, TypeError, KeyError):
+        # formatos fora do lote (ou inválidos): o cálculo original decide, inclusive os erros
+        return list(iterar_consumo_tomada(eventos_log, dispositivos))
+
+    return consumo_de_colunas(colunas, tomadas_potencia)
+
+
+def consumo_total_por_tomada(eventos_log, dispositivos):
+    """Soma de Wh por tomada sobre todos os intervalos fechados do log."""
+
+    tomadas_potencia = {d.id: d.potencia_W for d in dispositivos if d.tipo == 'TOMADA'}
+    if not tomadas_potencia:
+        return {}
+
+    colunas = ColunasEventos.de_eventos(eventos_log, list(tomadas_potencia))
+    inicio, fim = parear_intervalos(colunas)
+    consumo = consumo_intervalos(colunas, _potencias(colunas, tomadas_potencia), inicio, fim)
+
+    totais = np.bincount(colunas.dispositivo[fim], weights=consumo, minlength=len(colunas.ids))
+    return {id_dispositivo: round(total, 2) for id_dispositivo, total in zip(colunas.ids, totais.tolist())}
@@ -1,11 +1,30 @@
-from datetime import datetime
+import csv
+import json
+from smart_home.hub import relogio
 
 class Evento:
     def __init__(self, tipo: str, origem: str, dados: dict = None):
         self.tipo = tipo          # Ex: "mudanca_estado", "sensor_movimento", "acao"
         self.origem = origem      # Nome do dispositivo que gerou o evento
         self.dados = dados or {}  # Informações adicionais
-        self.timestamp = datetime.now()
+        self.timestamp = relogio.atual.agora_local()
 
     def __repr__(self):
         return f"<Evento {self.tipo} de {self.origem} em {self.timestamp:%H:%M:%S}>"
+
+
+def ler_eventos_jsonl(caminho):
+    """Gerador de eventos de um arquivo JSON-Lines (uma linha por evento)."""
+
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            linha = linha.strip()
+            if linha:
+                yield json.loads(linha)
+
+
+def ler_eventos_csv(caminho):
+    """Gerador de eventos de um CSV no formato de exportar_eventos_csv."""
+
+    with open(caminho, "r", newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
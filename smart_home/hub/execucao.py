@@ -0,0 +1,139 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from smart_home.hub import relogio
+
+from smart_home.hub.state_machine import CodigoComando
+from smart_home.utils import metricas
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
+
+
+class ResultadoComando:
+
+    __slots__ = ("id_dispositivo", "comando", "sucesso", "erro", "inicio", "duracao_s")
+
+    def __init__(self, id_dispositivo, comando, sucesso, erro=None, inicio=0.0, duracao_s=0.0):
+        self.id_dispositivo = id_dispositivo
+        self.comando = comando
+        self.sucesso = sucesso
+        self.erro = erro
+        self.inicio = inicio
+        self.duracao_s = duracao_s
+
+    def como_dict(self):
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+    def __repr__(self):
+        situacao = "ok" if self.sucesso else f"falha: {self.erro}"
+        return f"<ResultadoComando {self.comando} em {self.id_dispositivo} ({situacao}, {self.duracao_s * 1000:.2f} ms)>"
+
+
+class ExecutorRotinas:
+    """
+    Executa os passos de uma rotina agrupados por dispositivo: dispositivos
+    diferentes rodam em paralelo num pool de threads, e os comandos do mesmo
+    dispositivo continuam na ordem em que aparecem na rotina.
+    """
+
+    def __init__(self, max_trabalhadores=None):
+
+        self._pool = ThreadPoolExecutor(max_workers=max_trabalhadores, thread_name_prefix="rotina")
+
+    @staticmethod
+    def _executar_passo(dispositivo, comando):
+        inicio = time.perf_counter()
+        codigo = dispositivo.tentar_comando(comando)
+        sucesso = codigo is CodigoComando.OK
+        erro = None if sucesso else f"{codigo.name}: comando '{comando}' no estado '{dispositivo.state}'"
+        return ResultadoComando(dispositivo.id, comando, sucesso, erro, inicio, time.perf_counter() - inicio)
+
+    def _executar_grupo(self, grupo):
+        return [(posicao, self._executar_passo(dispositivo, comando)) for posicao, dispositivo, comando in grupo]
+
+    def executar(self, passos, paralelo=True):
+        """
+        passos: lista de (dispositivo, comando). Devolve um ResultadoComando
+        por passo, na mesma ordem da lista.
+        """
+        grupos = {}
+        for posicao, (dispositivo, comando) in enumerate(passos):
+            grupos.setdefault(dispositivo.id, []).append((posicao, dispositivo, comando))
+
+        resultados = [None] * len(passos)
+
+        if paralelo and len(grupos) > 1:
+            concluidos = [f.result() for f in [self._pool.submit(self._executar_grupo, g) for g in grupos.values()]]
+        else:
+            concluidos = [self._executar_grupo(g) for g in grupos.values()]
+
+        for grupo in concluidos:
+            for posicao, resultado in grupo:
+                resultados[posicao] = resultado
+
+        return resultados
+
+    def encerrar(self):
+        self._pool.shutdown(wait=True)
+
+
+def executar_em_lote(dispositivos, comando):
+    """
+    Aplica 'comando' a todos os dispositivos numa única passada.
+
+    Os dispositivos são agrupados por (classe, estado): a tabela de
+    transições é consultada uma vez por grupo, e grupos que não aceitam o
+    gatilho são marcados de uma vez, sem exceção nem log por dispositivo.
+    Com métricas ligadas, cada dispositivo executado entra nas mesmas séries
+    de tentar_comando; os rejeitados contam de uma vez por grupo.
+    Devolve {id: CodigoComando}.
+    """
+    grupos = {}
+    for dispositivo in dispositivos:
+        grupos.setdefault((type(dispositivo), dispositivo.state), []).append(dispositivo)
+
+    codigos = {}
+    agora = relogio.atual.agora()
+    ok = CodigoComando.OK
+    registro = metricas.registro
+
+    for (classe, estado), grupo in grupos.items():
+        maquina = getattr(classe, "machine", None)
+        verificado = maquina.verificar(estado, comando) if maquina else CodigoComando.COMANDO_INEXISTENTE
+        tipo = grupo[0].tipo
+
+        if verificado is not ok:
+            codigos.update(dict.fromkeys((d.id for d in grupo), verificado))
+            if registro is not None:
+                rotulo = "invalido" if verificado is CodigoComando.COMANDO_INEXISTENTE else comando
+                registro.contador("smart_home_comandos_total", tipo=tipo, comando=rotulo,
+                                  codigo=verificado.name).incrementar(len(grupo))
+            continue
+
+        tentar = maquina.tentar
+        if registro is not None:
+            histograma = registro.histograma("smart_home_comando_segundos", tipo=tipo, comando=comando)
+            contagem = {}
+
+        for dispositivo in grupo:
+            inicio = time.perf_counter() if registro is not None else 0.0
+            try:
+                codigo = tentar(dispositivo, comando)
+            except Exception as e:
+                logger.error("Falha ao executar '%s' em '%s' (lote): %s", comando, dispositivo.nome, e)
+                codigo = CodigoComando.ERRO
+
+            if codigo is ok:
+                dispositivo.ultimo_evento = agora
+            codigos[dispositivo.id] = codigo
+
+            if registro is not None:
+                histograma.registrar(time.perf_counter() - inicio)
+                contagem[codigo] = contagem.get(codigo, 0) + 1
+
+        if registro is not None:
+            for codigo, quantidade in contagem.items():
+                registro.contador("smart_home_comandos_total", tipo=tipo, comando=comando,
+                                  codigo=codigo.name).incrementar(quantidade)
+
+    return codigos
@@ -0,0 +1,331 @@
+import multiprocessing
+import os
+import threading
+import zlib
+from types import SimpleNamespace
+
+from smart_home.hub.automacao import AutomacaoResidencial
+from smart_home.hub.consumo_tomada import calcular_consumo_tomada, iterar_consumo_tomada
+from smart_home.hub.persistencia import ArquivoIncremental
+from smart_home.hub.state_machine import CodigoComando
+from smart_home.utils.logs import configurar_logs, obter_logger
+
+logger = obter_logger(__name__)
+
+
+class ErroFragmento(RuntimeError):
+    pass
+
+
+def fragmento_de(id_dispositivo, total):
+    """Fragmento dono do dispositivo. crc32 e não hash(): o hash de str muda a cada processo."""
+
+    return zlib.crc32(id_dispositivo.encode("utf-8")) % total
+
+
+# -------------------------------
+# Processo de cada fragmento
+# -------------------------------
+def _comandos(hub, pares):
+    codigos = []
+    for id_dispositivo, comando in pares:
+        dispositivo = hub.dispositivos.get(id_dispositivo)
+        codigos.append(CodigoComando.NAO_ENCONTRADO if dispositivo is None else dispositivo.tentar_comando(comando))
+    return codigos
+
+
+def _relatorio(hub, tipo, inicio, fim):
+    relatorio = hub.linhas_relatorio(tipo, None, inicio, fim)
+    return None if relatorio is None else (relatorio[0], list(relatorio[1]))
+
+
+_OPERACOES = {
+    "contar": lambda hub: len(hub.dispositivos),
+    "ausentes": lambda hub, ids: [i for i in ids if i not in hub.dispositivos],
+    "comandos": _comandos,
+    "passos": lambda hub, passos, paralelo: hub.executor.executar(
+        [(hub.dispositivos[i], comando) for i, comando in passos], paralelo=paralelo),
+    "lote": lambda hub, filtro, comando: hub.executar_em_lote(filtro, comando),
+    "listar": lambda hub: [d.detalhes().como_dict() for d in hub.dispositivos],
+    "relatorio": _relatorio,
+    "potencias": lambda hub: {d.id: d.potencia_W for d in hub.dispositivos.por_tipo("TOMADA")},
+    "rotinas": lambda hub, caminho: hub.carregar_rotinas(caminho),
+}
+
+
+def _executar_fragmento(indice, total, caminho_config, conexao, nivel_log):
+    # hub vazio (sem os avisos de arquivo ausente); a fatia é carregada a seguir.
+    # Com 'fork' o filho herdaria o singleton de um hub já criado no pai.
+    configurar_logs("ERROR", assincrono=False)
+    AutomacaoResidencial._instance = None
+    hub = AutomacaoResidencial("", "")
+    configurar_logs(nivel_log, assincrono=False)
+    hub.dispositivos = hub.carregar_dispositivos(
+        caminho_config, aceitar=lambda config: fragmento_de(config["id"], total) == indice)
+    for dispositivo in hub.dispositivos:
+        hub._acompanhar(dispositivo)
+    conexao.send(("ok", len(hub.dispositivos)))
+
+    try:
+        while True:
+            operacao, args = conexao.recv()
+            if operacao == "fechar":
+                break
+            try:
+                conexao.send(("ok", _OPERACOES[operacao](hub, *args)))
+            except Exception as e:
+                conexao.send(("erro", f"{type(e).__name__}: {e}"))
+    except EOFError:
+        pass
+    finally:
+        hub.executor.encerrar()
+        hub.agendador.fechar()
+        conexao.close()
+
+
+# -------------------------------
+# Coordenador
+# -------------------------------
+class HubFragmentado:
+    """
+    Hub dividido em processos: cada dispositivo mora no fragmento
+    crc32(id) % processos, que roda seu próprio AutomacaoResidencial só
+    com a sua fatia da configuração. O coordenador não guarda dispositivos;
+    ele encaminha comandos, lotes e passos de rotina pelo pipe de cada
+    fragmento e junta as respostas. Os pedidos a vários fragmentos são
+    todos enviados antes de esperar a primeira resposta, então os
+    fragmentos trabalham ao mesmo tempo.
+
+    Rotinas são executadas sob demanda (executar_rotinas); gatilhos
+    ("quando"/"origem") e agendas só existem no hub de processo único.
+    """
+
+    def __init__(self, caminho_config, caminho_rotinas, processos=None, metodo_inicio="spawn", nivel_log="WARNING"):
+        self.processos = processos or os.cpu_count() or 1
+        contexto = multiprocessing.get_context(metodo_inicio)
+        # uma trava por pipe: pedidos a fragmentos diferentes não esperam um pelo outro
+        self._travas = [threading.Lock() for _ in range(self.processos)]
+        self._conexoes = []
+        self._filhos = []
+
+        for indice in range(self.processos):
+            local, remota = contexto.Pipe()
+            filho = contexto.Process(target=_executar_fragmento, name=f"fragmento-{indice}",
+                                     args=(indice, self.processos, caminho_config, remota, nivel_log), daemon=True)
+            filho.start()
+            remota.close()
+            self._conexoes.append(local)
+            self._filhos.append(filho)
+
+        self.tamanhos = [self._receber(indice) for indice in range(self.processos)]
+        logger.info("%d dispositivo(s) em %d fragmento(s): %s", sum(self.tamanhos), self.processos, self.tamanhos)
+
+        self.rotinas = self._pedir({0: ("rotinas", (caminho_rotinas,))})[0]
+        especiais = [r for r, rotina in self.rotinas.items() if rotina.get("quando") or rotina.get("origem")
+                     or rotina.get("agenda")]
+        if especiais:
+            logger.warning("Gatilhos e agendas não rodam no hub fragmentado: %s", ", ".join(especiais))
+
+    # -------------------------------
+    # Comunicação
+    # -------------------------------
+    def _receber(self, indice):
+        try:
+            situacao, resposta = self._conexoes[indice].recv()
+        except EOFError:
+            raise ErroFragmento(f"O fragmento {indice} foi encerrado.") from None
+        if situacao == "erro":
+            raise ErroFragmento(f"Fragmento {indice}: {resposta}")
+        return resposta
+
+    def _pedir(self, pedidos):
+        """
+        pedidos: {fragmento: (operacao, args)}. Envia todos, depois colhe;
+        devolve {fragmento: resposta}. Só os pipes envolvidos ficam presos,
+        sempre na ordem dos índices (duas threads nunca esperam uma pela outra).
+        """
+        indices = sorted(pedidos)
+        travas = [self._travas[indice] for indice in indices]
+        presas = 0
+        try:
+            for trava in travas:
+                trava.acquire()
+                presas += 1
+            for indice in indices:
+                self._conexoes[indice].send(pedidos[indice])
+            # colhe todas antes de levantar um erro: uma resposta não lida
+            # ficaria no pipe e seria lida pelo próximo pedido
+            respostas, erro = {}, None
+            for indice in indices:
+                try:
+                    respostas[indice] = self._receber(indice)
+                except ErroFragmento as e:
+                    erro = erro or e
+            if erro is not None:
+                raise erro
+            return respostas
+        finally:
+            for trava in travas[:presas]:
+                trava.release()
+
+    def _para_todos(self, operacao, *args):
+        return self._pedir({indice: (operacao, args) for indice in range(self.processos)})
+
+    def _dividir(self, ids):
+        fatias = {}
+        for id_dispositivo in ids:
+            fatias.setdefault(fragmento_de(id_dispositivo, self.processos), []).append(id_dispositivo)
+        return fatias
+
+    # -------------------------------
+    # Comandos
+    # -------------------------------
+    def executar_comando(self, id_dispositivo, comando):
+        indice = fragmento_de(id_dispositivo, self.processos)
+        return self._pedir({indice: ("comandos", ([(id_dispositivo, comando)],))})[indice][0]
+
+    def executar_comandos(self, pares):
+        """
+        pares: lista de (id_dispositivo, comando). Cada fragmento recebe os
+        seus numa única mensagem e os executa na ordem da lista. Devolve um
+        CodigoComando por par, na mesma ordem.
+        """
+        posicoes, fatias = {}, {}
+        for posicao, (id_dispositivo, comando) in enumerate(pares):
+            indice = fragmento_de(id_dispositivo, self.processos)
+            posicoes.setdefault(indice, []).append(posicao)
+            fatias.setdefault(indice, []).append((id_dispositivo, comando))
+
+        codigos = [None] * len(pares)
+        respostas = self._pedir({indice: ("comandos", (fatia,)) for indice, fatia in fatias.items()})
+        for indice, resposta in respostas.items():
+            for posicao, codigo in zip(posicoes[indice], resposta):
+                codigos[posicao] = codigo
+        return codigos
+
+    def executar_em_lote(self, filtro, comando):
+        """Como AutomacaoResidencial.executar_em_lote; cada fragmento aplica o filtro à sua fatia."""
+
+        filtro = filtro or {}
+        if filtro.get("ids") is None:
+            respostas = self._para_todos("lote", filtro, comando)
+        else:
+            respostas = self._pedir({indice: ("lote", (dict(filtro, ids=ids), comando))
+                                     for indice, ids in self._dividir(filtro["ids"]).items()})
+
+        codigos = {}
+        for resposta in respostas.values():
+            codigos.update(resposta)
+
+        ok = sum(1 for c in codigos.values() if c == CodigoComando.OK)
+        logger.info("Lote '%s': %d de %d dispositivo(s) executado(s).", comando, ok, len(codigos))
+        return codigos
+
+    def executar_rotinas(self, id_rotina, paralelo=True):
+        """
+        Como AutomacaoResidencial.executar_rotinas: os passos são repartidos
+        por fragmento (a ordem de cada dispositivo é mantida) e os
+        resultados voltam na ordem da rotina.
+        """
+        rotina = self.rotinas.get(id_rotina)
+        if not rotina:
+            logger.error("Rotina com o ID '%s' não encontrada.", id_rotina)
+            return []
+
+        comandos = rotina.get("comandos") or rotina.get("acoes") or []
+        if not comandos:
+            logger.error("A rotina '%s' não contém comandos/ações válidos.", rotina['nome'])
+            return []
+
+        posicoes, fatias = {}, {}
+        for posicao, c in enumerate(comandos):
+            indice = fragmento_de(c["id_dispositivo"], self.processos)
+            posicoes.setdefault(indice, []).append(posicao)
+            fatias.setdefault(indice, []).append((c["id_dispositivo"], c["comando"]))
+
+        # nada roda se algum dispositivo não existir, como no hub de processo único
+        ausentes = self._pedir({indice: ("ausentes", ([i for i, _ in fatia],)) for indice, fatia in fatias.items()})
+        ids_invalidos = [i for resposta in ausentes.values() for i in resposta]
+        if ids_invalidos:
+            logger.error("A rotina '%s' contém dispositivos inválidos: %s", rotina['nome'], ', '.join(ids_invalidos))
+            return []
+
+        resultados = [None] * len(comandos)
+        respostas = self._pedir({indice: ("passos", (fatia, paralelo)) for indice, fatia in fatias.items()})
+        for indice, resposta in respostas.items():
+            for posicao, resultado in zip(posicoes[indice], resposta):
+                resultados[posicao] = resultado
+        return resultados
+
+    # -------------------------------
+    # Consultas e relatórios
+    # -------------------------------
+    def __len__(self):
+        return sum(self._para_todos("contar").values())
+
+    def listar_dispositivos(self):
+        """Detalhes (dicts) de todos os dispositivos, fragmento a fragmento."""
+
+        return [d for resposta in self._para_todos("listar").values() for d in resposta]
+
+    def gerar_relatorio(self, tipo_relatorio, nome_arquivo, eventos=None, inicio=None, fim=None):
+        if tipo_relatorio == "consumo_eventos":
+            # os eventos ficam no coordenador; dos fragmentos só vêm as potências
+            tomadas = [SimpleNamespace(id=id_d, tipo="TOMADA", potencia_W=potencia)
+                       for resposta in self._para_todos("potencias").values() for id_d, potencia in resposta.items()]
+            if isinstance(eventos, list):
+                linhas = calcular_consumo_tomada(eventos, tomadas, inicio, fim)
+            else:
+                linhas = iterar_consumo_tomada(eventos or [], tomadas, inicio, fim)
+            AutomacaoResidencial._salvar_csv(nome_arquivo, ["id_dispositivo", "total_wh", "periodo_inicio", "periodo_fim"],
+                                             linhas)
+            return
+
+        respostas = self._para_todos("relatorio", tipo_relatorio, inicio, fim)
+        if any(resposta is None for resposta in respostas.values()):
+            logger.error("Relatório '%s' indisponível no hub fragmentado.", tipo_relatorio)
+            return
+        colunas = respostas[0][0]
+        linhas = [linha for _, linhas_fragmento in respostas.values() for linha in linhas_fragmento]
+        AutomacaoResidencial._salvar_csv(nome_arquivo, colunas, linhas)
+
+    def salvar_dispositivos(self, caminho_json):
+        """
+        Junta a configuração de todos os fragmentos num único arquivo (o
+        formato do hub), gravado de forma atômica e sem log de deltas antigo.
+        """
+
+        try:
+            ArquivoIncremental(caminho_json).compactar({"dispositivos": self.listar_dispositivos()})
+            logger.info("Configuração salva em '%s'.", caminho_json)
+        except OSError as e:
+            logger.error("Não foi possível salvar o arquivo: %s", e)
+
+    # -------------------------------
+    # Encerramento
+    # -------------------------------
+    def fechar(self):
+        for trava in self._travas:
+            trava.acquire()
+        try:
+            for conexao, filho in zip(self._conexoes, self._filhos):
+                if filho.is_alive():
+                    try:
+                        conexao.send(("fechar", ()))
+                    except (BrokenPipeError, OSError):
+                        pass
+            for conexao, filho in zip(self._conexoes, self._filhos):
+                filho.join(timeout=10)
+                if filho.is_alive():
+                    filho.terminate()
+                conexao.close()
+            self._conexoes, self._filhos = [], []
+        finally:
+            for trava in self._travas:
+                trava.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
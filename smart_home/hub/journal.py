@@ -0,0 +1,198 @@
+import json
+import os
+import threading
+import time
+from smart_home.utils import metricas
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
+
+
+POLITICAS_FSYNC = ("sempre", "lote", "nunca")
+
+# uma marca (offset em bytes) a cada _PASSO linhas de cada segmento
+_PASSO = 1024
+
+
+class JournalEventos:
+    """
+    Log de eventos somente-anexação em JSON-Lines, dividido em segmentos.
+
+    Cada evento vira uma linha; as linhas ficam num buffer e são gravadas
+    em grupo (group commit) quando o lote enche ou o intervalo expira.
+
+    politica_fsync:
+        "sempre" -> grava e faz fsync a cada evento
+        "lote"   -> faz fsync a cada commit de grupo
+        "nunca"  -> só entrega ao sistema operacional (flush)
+
+    O histórico do hub vive no ArmazenamentoEventos (SQLite). O journal só
+    é lido para migrar um diretório data/eventos/ antigo (migrar_eventos no
+    menu); a escrita fica para os benchmarks, que o usam como linha de base.
+
+    Para a retomada, cada segmento guarda quantas linhas tem e o offset de
+    uma linha a cada _PASSO: iterar(a_partir_de) pula segmentos inteiros
+    sem abri-los e, no segmento onde começa, vai direto à marca anterior.
+    """
+
+    def __init__(self, diretorio, prefixo="eventos", tamanho_max_segmento=8 * 1024 * 1024,
+                 politica_fsync="lote", tamanho_lote=64, intervalo_commit=1.0):
+
+        if politica_fsync not in POLITICAS_FSYNC:
+            raise ValueError(f"Política de fsync inválida: {politica_fsync}")
+
+        self.diretorio = diretorio
+        self.prefixo = prefixo
+        self.tamanho_max_segmento = tamanho_max_segmento
+        self.politica_fsync = politica_fsync
+        self.tamanho_lote = 1 if politica_fsync == "sempre" else max(1, tamanho_lote)
+        self.intervalo_commit = intervalo_commit
+
+        self._lock = threading.RLock()
+        self._buffer = []
+        self._ultimo_commit = time.monotonic()
+        self._arquivo = None
+        self._indice = []
+
+        os.makedirs(diretorio, exist_ok=True)
+
+        segmentos = self.segmentos()
+        self._numero_segmento = self._numero(segmentos[-1]) if segmentos else 1
+        # por segmento: [caminho, linhas, marcas]
+        self._indice = [[caminho, *self._recuperar_segmento(caminho)] for caminho in segmentos]
+        self.total = sum(linhas for _, linhas, _ in self._indice)
+        self._abrir_segmento()
+
+    # -------------------------------
+    # Segmentos
+    # -------------------------------
+    def _nome_segmento(self, numero):
+        return os.path.join(self.diretorio, f"{self.prefixo}-{numero:06d}.jsonl")
+
+    def _numero(self, caminho):
+        nome = os.path.basename(caminho)
+        return int(nome[len(self.prefixo) + 1:-len(".jsonl")])
+
+    def segmentos(self):
+        inicio = f"{self.prefixo}-"
+        nomes = [
+            n for n in os.listdir(self.diretorio)
+            if n.startswith(inicio) and n.endswith(".jsonl") and n[len(inicio):-6].isdigit()
+        ]
+        return [os.path.join(self.diretorio, n) for n in sorted(nomes)]
+
+    def _recuperar_segmento(self, caminho):
+        """
+        Descarta uma última linha incompleta (queda no meio da escrita).
+        Devolve (linhas, marcas).
+        """
+        with open(caminho, "rb+") as f:
+            dados = f.read()
+            if dados and not dados.endswith(b"\n"):
+                corte = dados.rfind(b"\n") + 1
+                f.truncate(corte)
+                dados = dados[:corte]
+                logger.warning("Linha incompleta descartada em '%s'.", caminho)
+
+        linhas, marcas, posicao = 0, [0], 0
+        while True:
+            fim = dados.find(b"\n", posicao)
+            if fim < 0:
+                return linhas, marcas
+            linhas += 1
+            posicao = fim + 1
+            if linhas % _PASSO == 0:
+                marcas.append(posicao)
+
+    def _abrir_segmento(self):
+        caminho = self._nome_segmento(self._numero_segmento)
+        self._arquivo = open(caminho, "ab")
+        if not self._indice or self._indice[-1][0] != caminho:
+            self._indice.append([caminho, 0, [0]])
+
+    def _rotacionar(self):
+        self._arquivo.close()
+        self._numero_segmento += 1
+        self._abrir_segmento()
+
+    # -------------------------------
+    # Escrita
+    # -------------------------------
+    def anexar(self, evento):
+        linha = json.dumps(evento, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+        with self._lock:
+            self._buffer.append(linha.encode("utf-8"))
+            self.total += 1
+
+            if (len(self._buffer) >= self.tamanho_lote
+                    or time.monotonic() - self._ultimo_commit >= self.intervalo_commit):
+                self.commit()
+
+    def anexar_lote(self, eventos):
+        with self._lock:
+            for evento in eventos:
+                self.anexar(evento)
+
+    @metricas.cronometrado("smart_home_persistencia_segundos", operacao="journal_commit")
+    def commit(self):
+        with self._lock:
+            self._ultimo_commit = time.monotonic()
+
+            if not self._buffer:
+                return
+
+            segmento = self._indice[-1]
+            posicao, linhas, marcas = self._arquivo.tell(), segmento[1], segmento[2]
+            for linha in self._buffer:
+                posicao += len(linha)
+                linhas += 1
+                if linhas % _PASSO == 0:
+                    marcas.append(posicao)
+            segmento[1] = linhas
+
+            self._arquivo.write(b"".join(self._buffer))
+            self._buffer.clear()
+            self._arquivo.flush()
+
+            if self.politica_fsync != "nunca":
+                os.fsync(self._arquivo.fileno())
+
+            if self._arquivo.tell() >= self.tamanho_max_segmento:
+                self._rotacionar()
+
+    def fechar(self):
+        with self._lock:
+            if self._arquivo and not self._arquivo.closed:
+                self.commit()
+                self._arquivo.close()
+
+    # -------------------------------
+    # Leitura
+    # -------------------------------
+    def iterar(self, a_partir_de=0):
+        """Percorre os eventos em ordem, pulando os 'a_partir_de' primeiros (retomada)."""
+
+        with self._lock:
+            self.commit()
+            indice = [(caminho, linhas, marcas[:]) for caminho, linhas, marcas in self._indice]
+        pular = a_partir_de
+
+        for caminho, linhas, marcas in indice:
+            if pular >= linhas:
+                pular -= linhas
+                continue
+
+            marca = pular // _PASSO
+            pular -= marca * _PASSO
+            with open(caminho, "rb") as f:
+                f.seek(marcas[marca])
+                for _, linha in zip(range(linhas - marca * _PASSO), f):
+                    if pular:
+                        pular -= 1
+                    elif linha.strip():
+                        yield json.loads(linha)
+            pular = 0
+
+    def carregar(self, a_partir_de=0):
+        return list(self.iterar(a_partir_de))
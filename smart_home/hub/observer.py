@@ -1,42 +1,361 @@
-from typing import List
+import contextvars
+import threading
+import time
+from collections import deque
+from typing import Optional, Tuple
+from smart_home.utils import metricas
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
+
+POLITICAS_FILA = ("bloquear", "descartar_antigo", "coalescer")
+
 
 class Subject:
 
+    # tupla imutável (copy-on-write): sem observers, todos os objetos
+    # compartilham a mesma tupla vazia e o notify não precisa copiar nada
+    __slots__ = ("_observers",)
+
+    # quando definido, observers não síncronos são entregues em segundo plano
+    despachante: Optional["DespachanteAssincrono"] = None
+
     def __init__(self):
 
-        self._observers: List = []
+        self._observers: Tuple = ()
 
     def attach(self, observer):
 
         if observer not in self._observers:
 
-            self._observers.append(observer)
+            self._observers = self._observers + (observer,)
 
     def detach(self, observer):
 
-        try:
+        if observer in self._observers:
 
-            self._observers.remove(observer)
+            self._observers = tuple(o for o in self._observers if o is not observer)
 
-        except ValueError:
+    def notify(self, *args, **kwargs):
 
-            pass
+        observers = self._observers
 
-    def notify(self, *args, **kwargs):
+        if not observers:
+
+            return
+
+        despachante = Subject.despachante
+
+        # uma checagem por notify; com métricas ligadas cada entrega é cronometrada
+        registro = metricas.registro
+
+        if despachante is None and registro is None:
+
+            for obs in observers:
+
+                _entregar(obs, self, args, kwargs)
+
+            return
+
+        if despachante is None:
+
+            for obs in observers:
+
+                _entregar_medindo(registro, obs, self, args, kwargs)
+
+            return
+
+        assincronos = []
+
+        for obs in observers:
+
+            if getattr(obs, "sincrono", False):
+
+                if registro is None:
+
+                    _entregar(obs, self, args, kwargs)
+
+                else:
+
+                    _entregar_medindo(registro, obs, self, args, kwargs)
+
+            else:
+
+                assincronos.append(obs)
+
+        if assincronos:
+
+            despachante.enfileirar(self, tuple(assincronos), args, kwargs)
+
+
+def _entregar(obs, subject, args, kwargs):
+
+    try:
+
+        obs.update(subject, *args, **kwargs)
+
+    except Exception as e:
+
+        logger.error("Observer %s falhou ao processar notificação: %s", type(obs).__name__, e)
+
+
+def _entregar_medindo(registro, obs, subject, args, kwargs):
+
+    nome = type(obs).__name__
+
+    inicio = time.perf_counter()
+
+    try:
 
-        for obs in list(self._observers):
+        obs.update(subject, *args, **kwargs)
 
-            try:
+    except Exception as e:
 
-                obs.update(self, *args, **kwargs)
+        registro.contador("smart_home_notify_erros_total", observer=nome).incrementar()
 
-            except Exception:
+        logger.error("Observer %s falhou ao processar notificação: %s", nome, e)
+
+    registro.histograma("smart_home_notify_segundos", observer=nome).registrar(time.perf_counter() - inicio)
 
-                pass
 
 class Observer:
 
+    # observers síncronos (ex.: índices) são sempre chamados dentro da transição
+    sincrono = False
+
     def update(self, subject, *args, **kwargs):
 
         raise NotImplementedError("O metodo 'update' deve ser implementado pela subclasse.")
 
+
+class DespachanteAssincrono:
+    """
+    Entrega notificações fora da transição de estado.
+
+    Cada par (observer, dispositivo) tem sua própria fila FIFO, o que
+    garante a ordem dos eventos de um dispositivo para cada observer. Os
+    trabalhadores atendem as filas em rodízio, um item por vez, e uma fila
+    nunca é atendida por dois trabalhadores ao mesmo tempo: um observer
+    lento ocupa no máximo um trabalhador e não segura a entrega dos outros.
+
+    'capacidade' limita o total de entregas pendentes. Quando enche, a
+    política decide:
+        "bloquear"         -> quem notifica espera espaço
+        "descartar_antigo" -> a entrega pendente mais antiga é descartada
+        "coalescer"        -> se a última entrega pendente da mesma fila for
+                              do mesmo tipo de evento, ela é substituída pela
+                              nova (a ordem se mantém); sem substituição,
+                              descarta a mais antiga
+
+    Um trabalhador nunca espera pela própria fila: um observer que dispara
+    comandos (rotinas, regras) com tudo cheio tem a entrega feita na hora,
+    se aquela fila estiver vazia, ou enfileirada acima da capacidade.
+    """
+
+    def __init__(self, capacidade=1024, politica="bloquear", trabalhadores=1):
+
+        if politica not in POLITICAS_FILA:
+            raise ValueError(f"Política de fila inválida: {politica}")
+
+        self.capacidade = capacidade
+        self.politica = politica
+        self._condicao = threading.Condition()
+        self._filas = {}
+        # filas com itens esperando trabalhador; 'agendadas' = prontas + em execução
+        self._prontas = deque()
+        self._agendadas = set()
+        self._em_execucao = 0
+        self._pendentes = 0
+        # ordem de chegada (para descartar a mais antiga), com itens já entregues removidos aos poucos
+        self._ordem = deque()
+        self._ativo = True
+
+        self.enfileirados = 0
+        self.entregues = 0
+        self.descartados = 0
+        self.coalescidos = 0
+        self.excedentes = 0
+        self.erros = {}
+        self.ultimos_erros = {}
+
+        self._threads = [
+            threading.Thread(target=self._trabalhar, name=f"despachante-{i}", daemon=True)
+            for i in range(max(1, trabalhadores))
+        ]
+        self._idents = set()
+        for thread in self._threads:
+            thread.start()
+            self._idents.add(thread.ident)
+
+    # -------------------------------
+    # Produção
+    # -------------------------------
+    def enfileirar(self, subject, observers, args, kwargs):
+        evento = kwargs.get("event", args[0] if args else None)
+        chave_subject = id(subject)
+        do_trabalhador = threading.get_ident() in self._idents
+        imediatos = []
+
+        with self._condicao:
+            for obs in observers:
+                chave = (id(obs), chave_subject)
+                fila = self._filas.get(chave)
+
+                if self._pendentes >= self.capacidade:
+                    # com folga na fila nada é mesclado: cada evento chega com os próprios dados
+                    if self.politica == "coalescer" and fila and fila[-1][4] == evento:
+                        fila[-1][2:4] = args, kwargs
+                        fila[-1][6] = contextvars.copy_context()
+                        self.coalescidos += 1
+                        continue
+                    if do_trabalhador:
+                        # esperar aqui travaria o trabalhador na própria fila
+                        if not fila and chave not in self._agendadas:
+                            imediatos.append(obs)
+                            continue
+                        self.excedentes += 1
+                    elif self.politica == "bloquear":
+                        while self._pendentes >= self.capacidade and self._ativo:
+                            self._condicao.wait()
+                        fila = self._filas.get(chave)
+                    else:
+                        while self._pendentes >= self.capacidade and self._descartar_mais_antigo():
+                            pass
+
+                if fila is None:
+                    fila = self._filas[chave] = deque()
+                # o contexto de quem notificou (ex.: a cadeia de regras) vai junto com a entrega
+                item = [subject, obs, args, kwargs, evento, True, contextvars.copy_context()]
+                fila.append(item)
+                self._pendentes += 1
+                self.enfileirados += 1
+                if self.politica != "bloquear":
+                    self._registrar_ordem(chave, item)
+
+                if chave not in self._agendadas:
+                    self._agendadas.add(chave)
+                    self._prontas.append(chave)
+                    self._condicao.notify()
+
+        for obs in imediatos:
+            self._entregar(subject, obs, args, kwargs)
+
+    def _registrar_ordem(self, chave, item):
+        self._ordem.append((chave, item))
+        if len(self._ordem) > 4 * self.capacidade:
+            self._ordem = deque(par for par in self._ordem if par[1][5])
+
+    def _descartar_mais_antigo(self):
+        while self._ordem:
+            chave, item = self._ordem.popleft()
+            if item[5]:
+                # o mais antigo ainda vivo é sempre o primeiro da sua fila
+                self._filas[chave].remove(item)
+                item[5] = False
+                self._pendentes -= 1
+                self.descartados += 1
+                return True
+        return False
+
+    # -------------------------------
+    # Consumo
+    # -------------------------------
+    def _trabalhar(self):
+        while True:
+            with self._condicao:
+                while not self._prontas and self._ativo:
+                    self._condicao.wait()
+
+                if not self._prontas:
+                    return
+
+                chave = self._prontas.popleft()
+                fila = self._filas[chave]
+                if not fila:
+                    # esvaziada por descarte enquanto esperava a vez
+                    self._encerrar_fila(chave)
+                    continue
+
+                item = fila.popleft()
+                item[5] = False
+                self._pendentes -= 1
+                self._em_execucao += 1
+                self._condicao.notify_all()
+
+            subject, obs, args, kwargs = item[:4]
+            item[6].run(self._entregar, subject, obs, args, kwargs)
+
+            with self._condicao:
+                self._em_execucao -= 1
+                self.entregues += 1
+                if fila:
+                    # volta para o fim: as outras filas têm a vez antes do próximo item desta
+                    self._prontas.append(chave)
+                    self._condicao.notify()
+                else:
+                    self._encerrar_fila(chave)
+                self._condicao.notify_all()
+
+    def _encerrar_fila(self, chave):
+        self._agendadas.discard(chave)
+        del self._filas[chave]
+
+    def _entregar(self, subject, obs, args, kwargs):
+        registro = metricas.registro
+        nome = type(obs).__name__
+        inicio = time.perf_counter() if registro is not None else 0.0
+        try:
+            obs.update(subject, *args, **kwargs)
+        except Exception as e:
+            with self._condicao:
+                self.erros[nome] = self.erros.get(nome, 0) + 1
+                self.ultimos_erros[nome] = repr(e)
+            logger.error("Observer %s falhou ao processar notificação: %s", nome, e)
+            if registro is not None:
+                registro.contador("smart_home_notify_erros_total", observer=nome).incrementar()
+        if registro is not None:
+            registro.histograma("smart_home_notify_segundos", observer=nome).registrar(time.perf_counter() - inicio)
+
+    def aguardar(self, timeout=None):
+        """Espera até não haver entregas pendentes nem em execução."""
+
+        with self._condicao:
+            return self._condicao.wait_for(lambda: not self._pendentes and not self._em_execucao, timeout)
+
+    def parar(self, esperar=True):
+        if esperar:
+            self.aguardar()
+
+        with self._condicao:
+            self._ativo = False
+            self._condicao.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def estatisticas(self):
+        with self._condicao:
+            return {
+                "enfileirados": self.enfileirados,
+                "entregues": self.entregues,
+                "descartados": self.descartados,
+                "coalescidos": self.coalescidos,
+                "excedentes": self.excedentes,
+                "pendentes": self._pendentes,
+                "erros": dict(self.erros),
+                "ultimos_erros": dict(self.ultimos_erros),
+            }
+
+
+def ativar_despacho_assincrono(capacidade=1024, politica="bloquear", trabalhadores=1):
+
+    desativar_despacho_assincrono()
+    Subject.despachante = DespachanteAssincrono(capacidade, politica, trabalhadores)
+    return Subject.despachante
+
+
+def desativar_despacho_assincrono():
+
+    despachante, Subject.despachante = Subject.despachante, None
+
+    if despachante is not None:
+        despachante.parar()
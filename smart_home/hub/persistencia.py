@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+
+from smart_home.hub.observer import Observer
+from smart_home.utils import metricas
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
+
+
+class RastreadorAlteracoes(Observer):
+    """
+    Guarda os ids alterados desde o último salvamento. Anexado aos
+    dispositivos, marca a cada transição e a cada atributo alterado
+    (os setters notificam o evento "atributo"); rotinas são marcadas
+    direto pelo hub.
+    """
+
+    # a marcação precisa existir antes do próximo salvamento
+    sincrono = True
+
+    def __init__(self):
+
+        self._alterados = {}
+        self._lock = threading.Lock()
+
+    def update(self, subject, *args, **kwargs):
+        self.marcar(subject.id)
+
+    def marcar(self, id_registro):
+        with self._lock:
+            self._alterados[id_registro] = True
+
+    def marcar_removido(self, id_registro):
+        with self._lock:
+            self._alterados[id_registro] = False
+
+    def coletar(self):
+        """Devolve {id: True (gravar) / False (removido)} e zera as marcações."""
+
+        with self._lock:
+            alterados, self._alterados = self._alterados, {}
+        return alterados
+
+    def __len__(self):
+        return len(self._alterados)
+
+
+class ArquivoIncremental:
+    """
+    Arquivo base JSON mais um log de deltas em JSON-Lines ao lado dele
+    ('<base>.delta'). Cada salvamento anexa só os registros alterados;
+    quando o log passa de 'limite_compactacao' linhas, a base é reescrita
+    por inteiro e o log é zerado.
+
+    Reaplicar o log sobre a base é idempotente: se o processo cair entre
+    a troca da base e a limpeza do log, a próxima carga chega ao mesmo estado.
+    """
+
+    def __init__(self, caminho_base, limite_compactacao=1000):
+
+        self.caminho_base = caminho_base
+        self.caminho_delta = f"{caminho_base}.delta"
+        self.limite_compactacao = limite_compactacao
+        self.linhas_delta = self._recuperar()
+
+    def _recuperar(self):
+        """
+        Descarta uma última linha incompleta (queda no meio da escrita), para
+        que o próximo registrar() não grude no fragmento. Devolve as linhas do log.
+        """
+        try:
+            with open(self.caminho_delta, "rb+") as f:
+                dados = f.read()
+                if dados and not dados.endswith(b"\n"):
+                    corte = dados.rfind(b"\n") + 1
+                    f.truncate(corte)
+                    dados = dados[:corte]
+                    logger.warning("Linha incompleta descartada em '%s'.", self.caminho_delta)
+        except FileNotFoundError:
+            return 0
+        return dados.count(b"\n")
+
+    def deltas(self):
+        """Percorre o log em ordem: (id, registro) ou (id, None) para removidos."""
+
+        try:
+            with open(self.caminho_delta, "r", encoding="utf-8") as f:
+                for linha in f:
+                    try:
+                        delta = json.loads(linha)
+                    except json.JSONDecodeError:
+                        # última linha incompleta (queda no meio da escrita)
+                        logger.warning("Linha incompleta ignorada em '%s'.", self.caminho_delta)
+                        continue
+                    yield delta["id"], None if delta.get("removido") else delta["registro"]
+        except FileNotFoundError:
+            return
+
+    @metricas.cronometrado("smart_home_persistencia_segundos", operacao="incremental_registrar")
+    def registrar(self, alteracoes):
+        """alteracoes: lista de (id, registro ou None). Grava e faz fsync de uma vez."""
+
+        if not alteracoes:
+            return 0
+
+        linhas = []
+        for id_registro, registro in alteracoes:
+            delta = {"id": id_registro, "removido": True} if registro is None else {"id": id_registro, "registro": registro}
+            linhas.append(json.dumps(delta, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+        with open(self.caminho_delta, "a", encoding="utf-8") as f:
+            f.write("".join(linhas))
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.linhas_delta += len(linhas)
+        return len(linhas)
+
+    def precisa_compactar(self):
+        return self.linhas_delta >= self.limite_compactacao
+
+    @metricas.cronometrado("smart_home_persistencia_segundos", operacao="incremental_compactar")
+    def compactar(self, dados):
+        """Reescreve a base com 'dados' (estado completo) e zera o log."""
+
+        temporario = f"{self.caminho_base}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(dados, f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.caminho_base)
+
+        if os.path.exists(self.caminho_delta):
+            os.remove(self.caminho_delta)
+        self.linhas_delta = 0
+        logger.info("Arquivo '%s' compactado.", self.caminho_base)
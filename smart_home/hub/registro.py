@@ -0,0 +1,148 @@
+import threading
+
+from smart_home.hub.observer import Observer
+
+
+class RegistroDispositivos(Observer):
+    """
+    Registro de dispositivos com índice principal por id e índices
+    secundários por tipo e por (tipo, estado).
+
+    A iteração segue a ordem de inserção, como a antiga lista. O registro
+    se anexa como observer de cada dispositivo para manter o índice de
+    estado atualizado a cada transição.
+    """
+
+    # o índice de estado precisa refletir a transição no mesmo instante
+    sincrono = True
+
+    def __init__(self, dispositivos=()):
+
+        self._por_id = {}
+        self._por_tipo = {}
+        self._por_estado = {}
+        self._estado_indexado = {}
+        self._lock = threading.RLock()
+
+        for dispositivo in dispositivos:
+            self.adicionar(dispositivo)
+
+    # -------------------------------
+    # Manutenção
+    # -------------------------------
+    def adicionar(self, dispositivo):
+        with self._lock:
+            if dispositivo.id in self._por_id:
+                return False
+
+            self._por_id[dispositivo.id] = dispositivo
+            self._por_tipo.setdefault(dispositivo.tipo, {})[dispositivo.id] = dispositivo
+            self._indexar_estado(dispositivo)
+            dispositivo.attach(self)
+            return True
+
+    def adicionar_lote(self, dispositivos):
+        """Inserção em massa (carga da configuração); devolve os ids duplicados ignorados."""
+
+        duplicados = []
+        with self._lock:
+            por_id, por_tipo, por_estado, estado_indexado = (
+                self._por_id, self._por_tipo, self._por_estado, self._estado_indexado)
+
+            for dispositivo in dispositivos:
+                id_dispositivo = dispositivo.id
+                if id_dispositivo in por_id:
+                    duplicados.append(id_dispositivo)
+                    continue
+
+                chave = (dispositivo.tipo, dispositivo.state)
+                por_id[id_dispositivo] = dispositivo
+                por_tipo.setdefault(dispositivo.tipo, {})[id_dispositivo] = dispositivo
+                por_estado.setdefault(chave, {})[id_dispositivo] = dispositivo
+                estado_indexado[id_dispositivo] = chave
+                dispositivo.attach(self)
+
+        return duplicados
+
+    def remover(self, id_dispositivo):
+        with self._lock:
+            dispositivo = self._por_id.pop(id_dispositivo, None)
+            if dispositivo is None:
+                return None
+
+            dispositivo.detach(self)
+
+            bucket_tipo = self._por_tipo.get(dispositivo.tipo, {})
+            bucket_tipo.pop(id_dispositivo, None)
+            if not bucket_tipo:
+                self._por_tipo.pop(dispositivo.tipo, None)
+
+            chave = self._estado_indexado.pop(id_dispositivo, None)
+            self._descartar_do_estado(chave, id_dispositivo)
+            return dispositivo
+
+    def _indexar_estado(self, dispositivo):
+        chave = (dispositivo.tipo, getattr(dispositivo, "state", None))
+        anterior = self._estado_indexado.get(dispositivo.id)
+
+        if anterior == chave:
+            return
+
+        self._descartar_do_estado(anterior, dispositivo.id)
+        self._por_estado.setdefault(chave, {})[dispositivo.id] = dispositivo
+        self._estado_indexado[dispositivo.id] = chave
+
+    def _descartar_do_estado(self, chave, id_dispositivo):
+        if chave is None:
+            return
+
+        bucket = self._por_estado.get(chave)
+        if bucket is not None:
+            bucket.pop(id_dispositivo, None)
+            if not bucket:
+                del self._por_estado[chave]
+
+    def update(self, subject, *args, **kwargs):
+        with self._lock:
+            if self._por_id.get(subject.id) is subject:
+                self._indexar_estado(subject)
+
+    # -------------------------------
+    # Consultas
+    # -------------------------------
+    def get(self, id_dispositivo, default=None):
+        return self._por_id.get(id_dispositivo, default)
+
+    def por_tipo(self, tipo):
+        return list(self._por_tipo.get(tipo, {}).values())
+
+    def por_estado(self, estado, tipo=None):
+        if tipo is not None:
+            return list(self._por_estado.get((tipo, estado), {}).values())
+
+        encontrados = []
+        for (tipo_bucket, estado_bucket), bucket in list(self._por_estado.items()):
+            if estado_bucket == estado:
+                encontrados.extend(bucket.values())
+        return encontrados
+
+    def tipos(self):
+        return list(self._por_tipo)
+
+    def contagem_por_estado(self):
+        return {chave: len(bucket) for chave, bucket in self._por_estado.items()}
+
+    def __getitem__(self, id_dispositivo):
+        return self._por_id[id_dispositivo]
+
+    def __contains__(self, id_dispositivo):
+        return id_dispositivo in self._por_id
+
+    def __iter__(self):
+        return iter(list(self._por_id.values()))
+
+    def __len__(self):
+        return len(self._por_id)
+
+    def __bool__(self):
+        return bool(self._por_id)
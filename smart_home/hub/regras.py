@@ -0,0 +1,166 @@
+import contextvars
+import threading
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
+
+CURINGA = "*"
+
+# regras em execução na cadeia atual (regra -> comando -> evento -> regra ...);
+# segue o evento para o despachante assíncrono junto com o contexto
+_cadeia = contextvars.ContextVar("cadeia_regras", default=())
+
+# cadeias mais longas que isto são interrompidas mesmo sem repetir regra
+PROFUNDIDADE_MAXIMA = 32
+
+
+def _novo_contador():
+    return {"correspondencias": 0, "execucoes": 0, "falhas": 0, "ciclos": 0}
+
+
+class DespachanteRegras:
+    """
+    Índice de regras (RotinaObserver) por (quando, origem).
+
+    Uma regra sem origem, ou com "*", cai no bucket curinga. Cada evento
+    consulta no máximo quatro buckets:
+    (tipo, origem), (tipo, *), (*, origem) e (*, *).
+    """
+
+    def __init__(self, regras=()):
+
+        self._indice = {}
+        self._chaves = {}
+        # contadores por observer (duas regras podem ter o mesmo id) e observers por id de regra
+        self._contadores = {}
+        self._por_id = {}
+        self._lock = threading.RLock()
+
+        for regra in regras:
+            self.adicionar(regra)
+
+    @staticmethod
+    def chave(regra):
+        quando = regra.get("quando") or CURINGA
+        origem = regra.get("origem") or CURINGA
+        return quando, origem
+
+    @staticmethod
+    def id_regra(observer):
+        return observer.regra.get("id") or f"regra_{id(observer)}"
+
+    # -------------------------------
+    # Manutenção incremental
+    # -------------------------------
+    def adicionar(self, observer):
+        with self._lock:
+            if id(observer) in self._chaves:
+                return False
+
+            chave = self.chave(observer.regra)
+            self._indice.setdefault(chave, []).append(observer)
+            self._chaves[id(observer)] = chave
+            self._contadores[id(observer)] = _novo_contador()
+            self._por_id.setdefault(self.id_regra(observer), []).append(observer)
+            return True
+
+    def remover(self, observer):
+        with self._lock:
+            chave = self._chaves.pop(id(observer), None)
+            if chave is None:
+                return False
+
+            bucket = self._indice[chave]
+            bucket.remove(observer)
+            if not bucket:
+                del self._indice[chave]
+
+            self._contadores.pop(id(observer), None)
+            id_regra = self.id_regra(observer)
+            mesmas = self._por_id[id_regra]
+            mesmas.remove(observer)
+            if not mesmas:
+                del self._por_id[id_regra]
+            return True
+
+    def remover_por_id(self, id_regra):
+        with self._lock:
+            for observer in list(self._por_id.get(id_regra, ())):
+                self.remover(observer)
+
+    # -------------------------------
+    # Despacho
+    # -------------------------------
+    def candidatas(self, evento):
+        indice = self._indice
+        encontradas = []
+        for chave in ((evento.tipo, evento.origem), (evento.tipo, CURINGA),
+                      (CURINGA, evento.origem), (CURINGA, CURINGA)):
+            bucket = indice.get(chave)
+            if bucket:
+                encontradas.extend(bucket)
+        return encontradas
+
+    def despachar(self, evento):
+        """
+        Executa as regras que casam com o evento. Uma regra que já está na
+        cadeia que produziu o evento (A liga X, X dispara B, B desliga X,
+        X dispara A ...) não roda de novo: o ciclo é cortado e registrado.
+        """
+        executadas = 0
+        cadeia = _cadeia.get()
+        lock = self._lock
+
+        for observer in self.candidatas(evento):
+            contador = self._contadores.get(id(observer))
+            if contador is None:
+                # removida depois de selecionada
+                continue
+
+            if id(observer) in cadeia or len(cadeia) >= PROFUNDIDADE_MAXIMA:
+                with lock:
+                    contador["ciclos"] += 1
+                logger.warning("Ciclo de regras interrompido em '%s' (evento '%s' de '%s').",
+                               self.id_regra(observer), evento.tipo, evento.origem)
+                continue
+
+            with lock:
+                contador["correspondencias"] += 1
+            token = _cadeia.set(cadeia + (id(observer),))
+            try:
+                if observer.executar(evento):
+                    with lock:
+                        contador["execucoes"] += 1
+                    executadas += 1
+            except Exception as e:
+                with lock:
+                    contador["falhas"] += 1
+                logger.error("Falha na regra '%s': %s", self.id_regra(observer), e)
+            finally:
+                _cadeia.reset(token)
+
+        return executadas
+
+    def estatisticas(self):
+        """Contadores somados por id de regra."""
+
+        with self._lock:
+            totais = {}
+            for rid, observers in self._por_id.items():
+                total = totais[rid] = _novo_contador()
+                for observer in observers:
+                    for campo, valor in self._contadores[id(observer)].items():
+                        total[campo] += valor
+            return totais
+
+    def restaurar_estatisticas(self, estatisticas):
+        """Reaplica contadores salvos (snapshot) às regras já indexadas; o total fica na primeira de cada id."""
+
+        with self._lock:
+            for rid, contador in estatisticas.items():
+                observers = self._por_id.get(rid)
+                if observers:
+                    self._contadores[id(observers[0])].update(contador)
+
+    def __len__(self):
+        return len(self._chaves)
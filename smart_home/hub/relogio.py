@@ -0,0 +1,109 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# instantes sem fuso são UTC, como os timestamps gravados pelo hub
+_EPOCA = datetime(1970, 1, 1)
+
+
+def para_timestamp(momento):
+    """datetime UTC sem fuso -> segundos desde a época."""
+
+    return (momento - _EPOCA).total_seconds()
+
+
+def de_timestamp(segundos):
+    """Segundos desde a época -> datetime UTC sem fuso."""
+
+    return _EPOCA + timedelta(seconds=segundos)
+
+
+class RelogioSistema:
+    """
+    Relógio real. Os métodos são as próprias funções do sistema, atribuídas
+    na instância: ler o relógio não passa por nenhuma camada Python a mais.
+
+        agora()       datetime UTC sem fuso
+        agora_local() datetime local (exibição, cron)
+        timestamp()   segundos desde a época, para contas de duração
+        monotonico()  segundos que nunca voltam (prazos e intervalos)
+    """
+
+    def __init__(self):
+        self.agora = datetime.utcnow
+        self.agora_local = datetime.now
+        self.timestamp = time.time
+        self.monotonico = time.monotonic
+
+    def segundos_reais(self, segundos):
+        return segundos
+
+
+class RelogioSimulado:
+    """
+    Tempo simulado a partir de 'inicio' (UTC). Com velocidade=0 o tempo só
+    anda com avancar(): um mês de uso vira um laço de milissegundos, e os
+    testes ficam determinísticos. Com velocidade=k o relógio também corre
+    sozinho, k vezes mais rápido que o real. agora_local() é igual a agora().
+    """
+
+    def __init__(self, inicio=None, velocidade=0.0):
+        self.inicio = inicio or datetime(2025, 1, 1)
+        self.velocidade = velocidade
+        self._inicio_s = para_timestamp(self.inicio)
+        self._base_real = time.monotonic()
+        self._avancado = 0.0
+        self._lock = threading.Lock()
+
+    def monotonico(self):
+        if self.velocidade:
+            return self._avancado + (time.monotonic() - self._base_real) * self.velocidade
+        return self._avancado
+
+    def timestamp(self):
+        return self._inicio_s + self.monotonico()
+
+    def agora(self):
+        return self.inicio + timedelta(seconds=self.monotonico())
+
+    agora_local = agora
+
+    def avancar(self, segundos):
+        if segundos < 0:
+            raise ValueError("O relógio simulado não volta no tempo.")
+        with self._lock:
+            self._avancado += segundos
+
+    def avancar_ate(self, momento):
+        self.avancar(max(0.0, para_timestamp(momento) - self.timestamp()))
+
+    def segundos_reais(self, segundos):
+        # quanto esperar de verdade por 'segundos' simulados; parado, só
+        # avancar() muda o tempo, então quem espera volta a olhar em 10 ms
+        return segundos / self.velocidade if self.velocidade else min(segundos, 0.01)
+
+
+# -------------------------------
+# Relógio do hub
+# -------------------------------
+# dispositivos, eventos e agregados leem 'relogio.atual' a cada uso
+atual = RelogioSistema()
+
+
+def definir_relogio(novo=None):
+    """Troca o relógio do hub (None = relógio real) e devolve o anterior."""
+
+    global atual
+    anterior = atual
+    atual = novo or RelogioSistema()
+    return anterior
+
+
+@contextmanager
+def usando_relogio(novo):
+    anterior = definir_relogio(novo)
+    try:
+        yield novo
+    finally:
+        definir_relogio(anterior)
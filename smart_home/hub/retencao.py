@@ -0,0 +1,472 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from smart_home.hub import relogio
+from smart_home.hub.agregados import GRANULARIDADES
+from smart_home.utils import metricas
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
+
+
+# séries resumidas ficam no mesmo banco dos eventos brutos
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id_dispositivo TEXT,
+    granularidade TEXT,
+    periodo TEXT,
+    contagens TEXT,
+    ocupacao TEXT,
+    wh REAL,
+    PRIMARY KEY (id_dispositivo, granularidade, periodo)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_series_periodo ON series (granularidade, periodo);
+CREATE TABLE IF NOT EXISTS estado_corte (
+    id_dispositivo TEXT PRIMARY KEY,
+    estado TEXT,
+    desde TEXT
+);
+CREATE TABLE IF NOT EXISTS retencao (
+    chave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+# as chaves de GRANULARIDADES são prefixos do ISO 8601 ("2025-01-31T09" -> "2025-01-31" -> "2025-01"):
+# trocar de granularidade é cortar a string
+_TAMANHO_CHAVE = {g: len(datetime(2000, 1, 1).strftime(f)) for g, f in GRANULARIDADES.items()}
+
+
+def _inicio_hora(momento):
+    return momento.replace(minute=0, second=0, microsecond=0)
+
+
+def _reagrupar(periodo, granularidade):
+    # uma camada mais grossa que o pedido mantém a própria chave
+    return periodo[:_TAMANHO_CHAVE[granularidade]]
+
+
+def _somar(destino, origem):
+    for chave in ("contagens", "ocupacao"):
+        for nome, valor in origem[chave].items():
+            destino[chave][nome] = destino[chave].get(nome, 0) + valor
+    destino["wh"] += origem["wh"]
+
+
+def _nova_linha():
+    return {"contagens": {}, "ocupacao": {}, "wh": 0.0}
+
+
+def _lotes(itens, tamanho):
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
+
+
+class AcumuladorSeries:
+    """
+    Monta séries por hora a partir de eventos em ordem de tempo (por
+    dispositivo): quantidade de cada evento, segundos em cada estado e Wh
+    das tomadas ligadas. O estado inicial da classe (repouso) não é
+    gravado: é o restante da hora, o que mantém sem linhas as horas em
+    que o dispositivo ficou parado.
+    """
+
+    def __init__(self, dispositivos, estados=None):
+
+        # dispositivos: qualquer coisa com .get(id) (ex.: RegistroDispositivos)
+        self.dispositivos = dispositivos
+        # {id: (estado, desde)}, herdado da compactação anterior
+        self.estados = dict(estados or {})
+        self.series = {}
+        self._destinos_unicos = {}
+
+    def _linha(self, id_dispositivo, hora):
+        chave = (id_dispositivo, hora.isoformat()[:13])
+        linha = self.series.get(chave)
+        if linha is None:
+            linha = self.series[chave] = _nova_linha()
+        return linha
+
+    def _destino(self, maquina, estado, gatilho):
+        destino = maquina.destino(estado, gatilho)
+        if destino is not None:
+            return destino
+
+        # estado suposto errado (histórico começou no meio): vale o destino
+        # do gatilho quando ele é o mesmo a partir de qualquer origem
+        chave = (id(maquina), gatilho)
+        if chave not in self._destinos_unicos:
+            destinos = {maquina.destino(e, gatilho) for e in maquina.estados} - {None}
+            self._destinos_unicos[chave] = destinos.pop() if len(destinos) == 1 else None
+        return self._destinos_unicos[chave]
+
+    def _ocupar(self, dispositivo, estado, inicio, fim):
+        if estado == dispositivo.machine.estado_inicial:
+            return
+
+        potencia = dispositivo.potencia_W if dispositivo.tipo == "TOMADA" and estado == "ligada" else 0
+        cursor = inicio
+        while cursor < fim:
+            hora = _inicio_hora(cursor)
+            fatia_fim = min(hora + timedelta(hours=1), fim)
+            segundos = (fatia_fim - cursor).total_seconds()
+
+            linha = self._linha(dispositivo.id, hora)
+            linha["ocupacao"][estado] = linha["ocupacao"].get(estado, 0.0) + segundos
+            linha["wh"] += potencia * segundos / 3600
+            cursor = fatia_fim
+
+    def aplicar(self, id_dispositivo, evento, timestamp):
+        try:
+            momento = datetime.fromisoformat(timestamp)
+        except (TypeError, ValueError):
+            return
+
+        contagens = self._linha(id_dispositivo, _inicio_hora(momento))["contagens"]
+        contagens[evento] = contagens.get(evento, 0) + 1
+
+        dispositivo = self.dispositivos.get(id_dispositivo)
+        if dispositivo is None:
+            # dispositivo removido: só as contagens
+            return
+
+        estado, desde = self.estados.get(id_dispositivo, (dispositivo.machine.estado_inicial, momento))
+        if momento < desde:
+            # evento atrasado, anterior ao estado conhecido: entra só na contagem
+            return
+        destino = self._destino(dispositivo.machine, estado, evento)
+        if destino is None:
+            self.estados.setdefault(id_dispositivo, (estado, desde))
+            return
+
+        self._ocupar(dispositivo, estado, desde, momento)
+        self.estados[id_dispositivo] = (destino, momento)
+
+    def fechar(self, ate, ids=None):
+        """Conta o tempo dos estados em aberto até 'ate' (só de 'ids', se dado) e recomeça a partir dele."""
+
+        for id_dispositivo in list(self.estados if ids is None else ids):
+            if id_dispositivo not in self.estados:
+                continue
+            estado, desde = self.estados[id_dispositivo]
+            dispositivo = self.dispositivos.get(id_dispositivo)
+            if dispositivo is None:
+                del self.estados[id_dispositivo]
+                continue
+            if desde < ate:
+                self._ocupar(dispositivo, estado, desde, ate)
+                self.estados[id_dispositivo] = (estado, ate)
+
+
+class RetencaoEventos:
+    """
+    Retenção em camadas sobre o ArmazenamentoEventos:
+
+        bruto -> eventos dos últimos 'janela_bruta'
+        hora  -> séries por hora até 'janela_horaria'
+        dia   -> séries por dia, para sempre (uma linha por dispositivo/dia)
+
+    compactar() resume o que saiu de cada janela na camada seguinte e apaga
+    o original; serie() e consumo_wh() juntam as três camadas numa resposta só.
+    A compactação anda em lotes de 'tamanho_lote' eventos (e de
+    'dispositivos_por_lote' dispositivos ao fechar o corte), cada um na sua
+    transação curta: as gravações de eventos esperam no máximo um lote,
+    nunca a rodada inteira.
+
+    'agregados' (função que devolve o AgregadosEnergia do hub) liga as duas
+    contas de energia: consumo_wh() passa a ler os agregados, e um evento só
+    é apagado depois de entrar num checkpoint deles (posicao_salva), para
+    que a reconstrução a partir do checkpoint nunca precise de um evento
+    que já foi resumido.
+    """
+
+    def __init__(self, armazenamento, dispositivos, janela_bruta=timedelta(days=7),
+                 janela_horaria=timedelta(days=90), agregados=None, tamanho_lote=2000, dispositivos_por_lote=64):
+
+        if janela_horaria < janela_bruta:
+            raise ValueError("A janela horária não pode ser menor que a janela de eventos brutos")
+
+        self.armazenamento = armazenamento
+        self.dispositivos = dispositivos
+        self.janela_bruta = janela_bruta
+        self.janela_horaria = janela_horaria
+        self.agregados = agregados
+        self.tamanho_lote = max(1, tamanho_lote)
+        self.dispositivos_por_lote = max(1, dispositivos_por_lote)
+
+        # conexão própria: leituras da compactação não travam as gravações de eventos (WAL)
+        self._conexao = sqlite3.connect(armazenamento.caminho, check_same_thread=False,
+                                        isolation_level=None, timeout=30)
+        # como no armazenamento: com WAL, NORMAL não faz fsync a cada lote e nunca corrompe
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        # o checkpoint do WAL fica para o fim da rodada (PASSIVE, sem travar gravações), não dentro de cada lote
+        self._conexao.execute("PRAGMA wal_autocheckpoint=0")
+        self._conexao.executescript(_ESQUEMA)
+        self._lock = threading.RLock()
+        self._parar = threading.Event()
+        self._thread = None
+
+    # -------------------------------
+    # Estado persistido
+    # -------------------------------
+    def _valor(self, chave):
+        linha = self._conexao.execute("SELECT valor FROM retencao WHERE chave = ?", (chave,)).fetchone()
+        return linha[0] if linha else None
+
+    def _estados_corte(self, id_dispositivo=None):
+        sql, parametros = "SELECT id_dispositivo, estado, desde FROM estado_corte", ()
+        if id_dispositivo is not None:
+            sql, parametros = f"{sql} WHERE id_dispositivo = ?", (id_dispositivo,)
+        return {id_d: (estado, datetime.fromisoformat(desde))
+                for id_d, estado, desde in self._conexao.execute(sql, parametros)}
+
+    def _mesclar_series(self, granularidade, linhas):
+        """
+        Registros de 'linhas' ({(id, periodo): linha}) já somados ao que existe
+        na camada. Só lê: a gravação fica para a transação do lote. Só a
+        compactação (sob self._lock) escreve em 'series', então o que foi lido
+        aqui ainda vale dentro da transação.
+        """
+        if not linhas:
+            return []
+
+        # cada rodada cobre períodos posteriores à anterior: só o trecho a partir
+        # do período mais antigo da rodada pode já existir (busca pela chave primária)
+        inicios = {}
+        for id_dispositivo, periodo in linhas:
+            if periodo < inicios.get(id_dispositivo, "\uffff"):
+                inicios[id_dispositivo] = periodo
+
+        for id_dispositivo, inicio in inicios.items():
+            for periodo, contagens, ocupacao, wh in self._conexao.execute(
+                "SELECT periodo, contagens, ocupacao, wh FROM series "
+                "WHERE id_dispositivo = ? AND granularidade = ? AND periodo >= ?",
+                (id_dispositivo, granularidade, inicio),
+            ):
+                linha = linhas.get((id_dispositivo, periodo))
+                if linha is not None:
+                    _somar(linha, {"contagens": json.loads(contagens), "ocupacao": json.loads(ocupacao), "wh": wh})
+
+        return [
+            (id_dispositivo, granularidade, periodo, json.dumps(linha["contagens"], separators=(",", ":")),
+             json.dumps(linha["ocupacao"], separators=(",", ":")), linha["wh"])
+            for (id_dispositivo, periodo), linha in linhas.items()
+        ]
+
+    # -------------------------------
+    # Compactação
+    # -------------------------------
+    @metricas.cronometrado("smart_home_persistencia_segundos", operacao="retencao_compactar")
+    def compactar(self, agora=None):
+        """
+        Resume os eventos mais velhos que 'janela_bruta' em séries por hora e
+        as horas mais velhas que 'janela_horaria' em séries por dia. Os cortes
+        são alinhados à hora/dia, então cada período é resumido uma única vez.
+
+        Cada lote grava as séries, apaga os eventos que resumiu e guarda o
+        estado de cada dispositivo na mesma transação: uma queda no meio da
+        rodada deixa os lotes já feitos consistentes, e a próxima rodada
+        continua de onde esta parou.
+        """
+        agora = agora or relogio.atual.agora()
+        inicio = time.perf_counter()
+        corte_bruto = _inicio_hora(agora - self.janela_bruta)
+        corte_horario = (agora - self.janela_horaria).replace(hour=0, minute=0, second=0, microsecond=0)
+        corte = corte_bruto.isoformat()
+
+        with self._lock:
+            self.armazenamento.commit()
+            limite_seq = self._limite_seq()
+            filtro_seq = "" if limite_seq is None else " AND seq <= ?"
+            extra = () if limite_seq is None else (limite_seq,)
+
+            acumulador = AcumuladorSeries(self.dispositivos, self._estados_corte())
+            resumidos = horas = 0
+
+            # paginação pela chave do índice (id, timestamp, seq): cada dispositivo
+            # chega em ordem de tempo, e o estado segue de um lote para o outro
+            chave = ("", "", 0)
+            while True:
+                linhas = self._conexao.execute(
+                    "SELECT seq, id_dispositivo, evento, timestamp FROM eventos "
+                    f"WHERE timestamp < ?{filtro_seq} AND (id_dispositivo, timestamp, seq) > (?, ?, ?) "
+                    "ORDER BY id_dispositivo, timestamp, seq LIMIT ?",
+                    (corte, *extra, *chave, self.tamanho_lote),
+                ).fetchall()
+                if not linhas:
+                    break
+
+                tocados = set()
+                for seq, id_dispositivo, evento, timestamp in linhas:
+                    acumulador.aplicar(id_dispositivo, evento, timestamp)
+                    tocados.add(id_dispositivo)
+                horas += self._gravar_lote(acumulador, tocados, [(linha[0],) for linha in linhas])
+                resumidos += len(linhas)
+                seq, id_dispositivo, _, timestamp = linhas[-1]
+                chave = (id_dispositivo, timestamp, seq)
+
+            anterior = self._valor("corte_bruto")
+            if anterior is None or corte > anterior:
+                # estados em aberto contam até o corte, alguns dispositivos por vez
+                for lote in _lotes(sorted(acumulador.estados, key=str), self.dispositivos_por_lote):
+                    acumulador.fechar(corte_bruto, lote)
+                    horas += self._gravar_lote(acumulador, lote)
+
+                with self._conexao:
+                    self._conexao.execute("INSERT OR REPLACE INTO retencao VALUES ('corte_bruto', ?)", (corte,))
+
+            dias = self._rebaixar_horas(corte_horario)
+            self._conexao.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+        resumo = {"eventos_resumidos": resumidos, "horas_gravadas": horas, "horas_para_dias": dias,
+                  "duracao_s": time.perf_counter() - inicio}
+        # sem nada a compactar (caso comum), a rodada não aparece no log do usuário
+        nivel = logging.INFO if resumidos or dias else logging.DEBUG
+        logger.log(nivel, "Retenção: %d evento(s) resumido(s) em %d hora(s); %d hora(s) agrupada(s) em dias (%.1f ms).",
+                    resumidos, horas, dias, resumo["duracao_s"] * 1000)
+        return resumo
+
+    def _limite_seq(self):
+        # sem agregados ligados, qualquer evento resumido pode sair do banco
+        if self.agregados is None:
+            return None
+        return self.agregados().posicao_salva
+
+    def _gravar_lote(self, acumulador, ids, resumidos=()):
+        """Uma transação curta: séries acumuladas, eventos resumidos e o estado de 'ids' no corte."""
+
+        registros = self._mesclar_series("hora", acumulador.series)
+        estados = acumulador.estados
+        removidos = [(i,) for i in ids if i not in estados]
+        cortes = [(i, estados[i][0], estados[i][1].isoformat()) for i in ids if i in estados]
+
+        with self._conexao:
+            self._conexao.execute("BEGIN IMMEDIATE")
+            self._conexao.executemany("INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?, ?, ?)", registros)
+            self._conexao.executemany("DELETE FROM eventos WHERE seq = ?", resumidos)
+            self._conexao.executemany("DELETE FROM estado_corte WHERE id_dispositivo = ?", removidos)
+            self._conexao.executemany("INSERT OR REPLACE INTO estado_corte VALUES (?, ?, ?)", cortes)
+
+        acumulador.series = {}
+        return len(registros)
+
+    def _rebaixar_horas(self, corte):
+        limite = corte.isoformat()[:13]
+        ids = [linha[0] for linha in self._conexao.execute(
+            "SELECT DISTINCT id_dispositivo FROM series WHERE granularidade = 'hora' AND periodo < ?", (limite,))]
+
+        total = 0
+        for lote in _lotes(ids, self.dispositivos_por_lote):
+            marcadores = ",".join("?" * len(lote))
+            linhas = self._conexao.execute(
+                f"SELECT id_dispositivo, periodo, contagens, ocupacao, wh FROM series "
+                f"WHERE id_dispositivo IN ({marcadores}) AND granularidade = 'hora' AND periodo < ?",
+                (*lote, limite),
+            ).fetchall()
+
+            dias = {}
+            for id_dispositivo, periodo, contagens, ocupacao, wh in linhas:
+                dia = dias.setdefault((id_dispositivo, _reagrupar(periodo, "dia")), _nova_linha())
+                _somar(dia, {"contagens": json.loads(contagens), "ocupacao": json.loads(ocupacao), "wh": wh})
+            registros = self._mesclar_series("dia", dias)
+
+            with self._conexao:
+                self._conexao.execute("BEGIN IMMEDIATE")
+                self._conexao.executemany("INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?, ?, ?)", registros)
+                self._conexao.execute(
+                    f"DELETE FROM series WHERE id_dispositivo IN ({marcadores}) AND granularidade = 'hora' "
+                    f"AND periodo < ?", (*lote, limite))
+            total += len(linhas)
+        return total
+
+    # -------------------------------
+    # Consultas
+    # -------------------------------
+    def serie(self, id_dispositivo, inicio=None, fim=None, granularidade="hora", agora=None):
+        """
+        Série do dispositivo na janela [inicio, fim), juntando as camadas
+        dia, hora e bruto. Períodos que só existem na camada diária voltam
+        com a chave do dia, mesmo pedindo 'hora'. Cada item traz 'periodo',
+        'contagens' {evento: n}, 'ocupacao' {estado: segundos} e 'wh'.
+        """
+        agora = agora or relogio.atual.agora()
+        inicio = datetime.fromisoformat(inicio) if isinstance(inicio, str) else inicio
+        fim = datetime.fromisoformat(fim) if isinstance(fim, str) else fim
+
+        # limites da janela no formato de chave de cada camada
+        limites = {
+            camada: (inicio.isoformat()[:tamanho] if inicio else None, fim.isoformat()[:tamanho] if fim else None)
+            for camada, tamanho in _TAMANHO_CHAVE.items()
+        }
+        resultado = {}
+
+        def acumular(periodo, camada, linha):
+            de, ate = limites[camada]
+            if (de is None or periodo >= de) and (ate is None or periodo < ate):
+                chave = _reagrupar(periodo, granularidade)
+                _somar(resultado.setdefault(chave, _nova_linha()), linha)
+
+        with self._lock:
+            for camada, periodo, contagens, ocupacao, wh in self._conexao.execute(
+                "SELECT granularidade, periodo, contagens, ocupacao, wh FROM series WHERE id_dispositivo = ?",
+                (id_dispositivo,),
+            ):
+                acumular(periodo, camada, {"contagens": json.loads(contagens), "ocupacao": json.loads(ocupacao), "wh": wh})
+
+            # camada bruta resumida na hora, partindo do estado salvo no último corte
+            acumulador = AcumuladorSeries(self.dispositivos, self._estados_corte(id_dispositivo))
+
+        for evento in self.armazenamento.consultar(id_dispositivo, fim=fim):
+            acumulador.aplicar(evento["id_dispositivo"], evento["evento"], evento["timestamp"])
+        acumulador.fechar(min(fim, agora) if fim else agora)
+
+        for (_, periodo), linha in acumulador.series.items():
+            acumular(periodo, "hora", linha)
+
+        return [
+            {"periodo": periodo, "contagens": linha["contagens"],
+             "ocupacao": {e: round(s, 1) for e, s in linha["ocupacao"].items()}, "wh": round(linha["wh"], 2)}
+            for periodo, linha in sorted(resultado.items())
+        ]
+
+    def consumo_wh(self, id_dispositivo, inicio=None, fim=None):
+        if self.agregados is not None:
+            # mesma conta do relatório de consumo; os buckets dos agregados não são apagados
+            return self.agregados().consumo(id_dispositivo, inicio, fim)
+        return round(sum(linha["wh"] for linha in self.serie(id_dispositivo, inicio, fim, "dia")), 2)
+
+    # -------------------------------
+    # Execução em segundo plano
+    # -------------------------------
+    def iniciar(self, intervalo_s=3600.0):
+        """Compacta agora e depois a cada 'intervalo_s' segundos, numa thread própria."""
+
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._trabalhar, args=(intervalo_s,), name="retencao", daemon=True)
+        self._thread.start()
+
+    def _trabalhar(self, intervalo_s):
+        while True:
+            try:
+                self.compactar()
+            except sqlite3.Error as e:
+                logger.error("Falha na compactação de eventos: %s", e)
+            if self._parar.wait(intervalo_s):
+                return
+
+    def parar(self):
+        self._parar.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def fechar(self):
+        self.parar()
+        with self._lock:
+            self._conexao.close()
@@ -0,0 +1,322 @@
+import importlib
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+from array import array
+from datetime import datetime, timedelta
+from enum import Enum
+
+
+MAGICO = b"SHSNAP\x00\x00"
+# 2: colunas float com ints marcados por linha (tamanho_inteiros)
+VERSAO = 2
+
+# magico, versão, reservado, tamanho do bloco de metadados (JSON)
+_CABECALHO = struct.Struct("<8sIIQ")
+
+_NULO_INT = -2 ** 63
+_EPOCA = datetime(1970, 1, 1)
+_MICRO = timedelta(microseconds=1)
+
+# slots que não são estado do dispositivo, com o valor que recebem na restauração:
+# observers são religados pelo hub e o cache de detalhes é remontado na primeira leitura
+_TRANSITORIOS = {"_observers": (), "_cache_detalhes": None}
+# transitórios que não podem ser compartilhados: um objeto novo por dispositivo
+_FABRICAS = {"_trava": threading.RLock}
+_IGNORADOS = {"__weakref__", "__dict__", *_TRANSITORIOS, *_FABRICAS}
+
+# campos criados depois de snapshots já gravados: valor quando a coluna não existe
+_PADROES = {"_versao": 0}
+
+# campos que deixaram de ser datetime e viraram segundos desde a época
+_EM_SEGUNDOS = {"_momento_ligado"}
+
+# slots renomeados depois de snapshots já gravados: nome antigo -> atual
+_RENOMEADOS = {"nome": "_nome"}
+
+
+class SnapshotInvalido(ValueError):
+    pass
+
+
+# -------------------------------
+# Colunas
+# -------------------------------
+def _nome_classe(classe):
+    return f"{classe.__module__}:{classe.__qualname__}"
+
+
+def _importar_classe(nome):
+    modulo, qualname = nome.split(":")
+    objeto = importlib.import_module(modulo)
+    for parte in qualname.split("."):
+        objeto = getattr(objeto, parte)
+    return objeto
+
+
+def campos_da_classe(classe):
+    """Todos os slots de instância da classe (base primeiro), exceto os de infraestrutura."""
+
+    campos = []
+    for base in reversed(classe.__mro__):
+        slots = base.__dict__.get("__slots__", ())
+        for campo in ([slots] if isinstance(slots, str) else slots):
+            if campo not in _IGNORADOS and campo not in campos:
+                campos.append(campo)
+    return campos
+
+
+def _codificar_coluna(valores):
+    """Escolhe o formato da coluna pelo conteúdo; devolve (descritor, bytes)."""
+
+    presentes = [v for v in valores if v is not None]
+
+    # ints fora de int64 (ou iguais ao marcador de nulo) caem no JSON
+    if all(type(v) is int and _NULO_INT < v < 2 ** 63 for v in presentes):
+        dados = array("q", (_NULO_INT if v is None else v for v in valores))
+        return {"tipo": "int"}, dados.tobytes()
+
+    # int e float misturados: os ints voltam como int pela marca por linha
+    # (só os exatos em double; acima de 2**53 a coluna vai para o JSON)
+    if all(type(v) is float or (type(v) is int and abs(v) <= 2 ** 53) for v in presentes):
+        dados = array("d", (math.nan if v is None else float(v) for v in valores)).tobytes()
+        descritor = {"tipo": "float", "nulos": len(presentes) < len(valores)}
+        if any(type(v) is int for v in presentes):
+            descritor["tamanho_inteiros"] = len(dados)
+            dados += bytes(type(v) is int for v in valores)
+        return descritor, dados
+
+    if all(isinstance(v, datetime) for v in presentes):
+        dados = array("q", (_NULO_INT if v is None else (v - _EPOCA) // _MICRO for v in valores))
+        return {"tipo": "data"}, dados.tobytes()
+
+    if presentes and all(isinstance(v, Enum) for v in presentes) and len({type(v) for v in presentes}) == 1:
+        descritor, dados = _codificar_categorias([None if v is None else v.name for v in valores])
+        descritor["enum"] = _nome_classe(type(presentes[0]))
+        return descritor, dados
+
+    if all(type(v) is str for v in valores) and len(set(valores)) <= 256:
+        return _codificar_categorias(valores)
+
+    if all(type(v) is str for v in valores):
+        return _codificar_textos(valores, "texto")
+
+    # qualquer outra coisa serializável vira JSON por valor
+    return _codificar_textos([json.dumps(v, ensure_ascii=False) for v in valores], "json")
+
+
+def _codificar_categorias(valores):
+    categorias = list(dict.fromkeys(valores))
+    indices = {c: i for i, c in enumerate(categorias)}
+    return {"tipo": "categoria", "categorias": categorias}, array("B", (indices[v] for v in valores)).tobytes()
+
+
+def _codificar_textos(valores, tipo):
+    offsets = array("q", [0])
+    total = 0
+    for v in valores:
+        total += len(v)
+        offsets.append(total)
+    texto = "".join(valores).encode("utf-8")
+    return {"tipo": tipo, "tamanho_offsets": len(offsets) * 8}, offsets.tobytes() + texto
+
+
+def _decodificar_coluna(descritor, bloco):
+    tipo = descritor["tipo"]
+
+    if tipo == "int":
+        return [None if v == _NULO_INT else v for v in bloco.cast("q").tolist()]
+
+    if tipo == "float":
+        corte = descritor.get("tamanho_inteiros")
+        valores = (bloco[:corte] if corte else bloco).cast("d").tolist()
+        if corte:
+            valores = [int(v) if inteiro else v for v, inteiro in zip(valores, bloco[corte:].tolist())]
+        return [None if v != v else v for v in valores] if descritor.get("nulos") else valores
+
+    if tipo == "data":
+        return [None if v == _NULO_INT else _EPOCA + timedelta(microseconds=v) for v in bloco.cast("q").tolist()]
+
+    if tipo == "categoria":
+        categorias = descritor["categorias"]
+        return [categorias[i] for i in bloco.tolist()]
+
+    if tipo in ("texto", "json"):
+        corte = descritor["tamanho_offsets"]
+        offsets = bloco[:corte].cast("q").tolist()
+        texto = str(bloco[corte:], "utf-8")
+        valores = [texto[a:b] for a, b in zip(offsets, offsets[1:])]
+        return [json.loads(v) for v in valores] if tipo == "json" else valores
+
+    raise SnapshotInvalido(f"Tipo de coluna desconhecido: {tipo}")
+
+
+# -------------------------------
+# Escrita
+# -------------------------------
+def salvar_snapshot(caminho, dispositivos, extras=None):
+    """
+    Grava os dispositivos em colunas binárias (uma por slot, agrupadas por
+    classe) mais um bloco JSON com metadados e 'extras' (rotinas,
+    contadores...). A escrita é atômica: arquivo temporário + fsync + rename.
+    """
+    grupos, ordem = {}, {}
+    for indice, dispositivo in enumerate(dispositivos):
+        grupos.setdefault(type(dispositivo), []).append(dispositivo)
+        ordem.setdefault(type(dispositivo), array("q")).append(indice)
+
+    blocos, descricao_grupos, posicao = [], [], 0
+
+    for classe, membros in grupos.items():
+        # posição de cada membro na lista original, para restaurar a ordem
+        dados = ordem[classe].tobytes()
+        ordem_grupo = {"inicio": posicao, "tamanho": len(dados)}
+        blocos.append(dados)
+        posicao += len(dados)
+
+        colunas = []
+        for campo in campos_da_classe(classe):
+            descritor, dados = _codificar_coluna([getattr(d, campo, None) for d in membros])
+            descritor.update(campo=campo, inicio=posicao, tamanho=len(dados))
+            colunas.append(descritor)
+
+            preenchimento = -len(dados) % 8
+            blocos.append(dados + b"\0" * preenchimento)
+            posicao += len(dados) + preenchimento
+
+        descricao_grupos.append({"classe": _nome_classe(classe), "quantidade": len(membros),
+                                 "ordem": ordem_grupo, "colunas": colunas})
+
+    meta = json.dumps({
+        "versao": VERSAO,
+        "criado_em": datetime.utcnow().isoformat(),
+        "grupos": descricao_grupos,
+        "extras": extras or {},
+    }, ensure_ascii=False).encode("utf-8")
+    meta += b" " * (-(_CABECALHO.size + len(meta)) % 8)
+
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "wb") as f:
+        f.write(_CABECALHO.pack(MAGICO, VERSAO, 0, len(meta)))
+        f.write(meta)
+        for bloco in blocos:
+            f.write(bloco)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+
+# -------------------------------
+# Leitura
+# -------------------------------
+def ler_snapshot(caminho):
+    """
+    Lê o snapshot via mmap e devolve (meta, grupos), onde cada grupo traz
+    'classe', 'quantidade', 'ordem' (posição original de cada membro) e
+    'valores' ({campo: lista}). Enums ficam pelo nome.
+    """
+    with open(caminho, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+        if len(mapa) < _CABECALHO.size:
+            raise SnapshotInvalido(f"'{caminho}' não é um snapshot")
+
+        magico, versao, _, tamanho_meta = _CABECALHO.unpack_from(mapa, 0)
+        if magico != MAGICO:
+            raise SnapshotInvalido(f"'{caminho}' não é um snapshot")
+        if versao > VERSAO:
+            raise SnapshotInvalido(f"Snapshot versão {versao} não suportado (máximo {VERSAO})")
+
+        meta = json.loads(mapa[_CABECALHO.size:_CABECALHO.size + tamanho_meta])
+        inicio_dados = _CABECALHO.size + tamanho_meta
+
+        grupos = []
+        with memoryview(mapa) as visao:
+            for grupo in meta["grupos"]:
+                inicio = inicio_dados + grupo["ordem"]["inicio"]
+                with visao[inicio:inicio + grupo["ordem"]["tamanho"]] as bloco:
+                    ordem = bloco.cast("q").tolist()
+
+                valores = {}
+                for coluna in grupo["colunas"]:
+                    coluna["campo"] = _RENOMEADOS.get(coluna["campo"], coluna["campo"])
+                    inicio = inicio_dados + coluna["inicio"]
+                    with visao[inicio:inicio + coluna["tamanho"]] as bloco:
+                        valores[coluna["campo"]] = _decodificar_coluna(coluna, bloco)
+                grupos.append({"classe": grupo["classe"], "quantidade": grupo["quantidade"],
+                               "ordem": ordem, "colunas": grupo["colunas"], "valores": valores})
+
+    return meta, grupos
+
+
+def carregar_snapshot(caminho):
+    """
+    Recria os dispositivos sem passar por __init__, transições ou
+    notificações: cada slot recebe o valor salvo. Devolve (dispositivos, extras).
+    """
+    meta, grupos = ler_snapshot(caminho)
+    dispositivos = [None] * sum(g["quantidade"] for g in grupos)
+
+    for grupo in grupos:
+        classe = _importar_classe(grupo["classe"])
+        objetos = [classe.__new__(classe) for _ in range(grupo["quantidade"])]
+
+        # sem __init__: slots transitórios recebem o valor inicial
+        for campo, valor in _TRANSITORIOS.items():
+            descritor = getattr(classe, campo, None)
+            if descritor is not None:
+                setar = descritor.__set__
+                for objeto in objetos:
+                    setar(objeto, valor)
+
+        for campo, fabrica in _FABRICAS.items():
+            descritor = getattr(classe, campo, None)
+            if descritor is not None:
+                setar = descritor.__set__
+                for objeto in objetos:
+                    setar(objeto, fabrica())
+
+        for campo in set(campos_da_classe(classe)) - set(grupo["valores"]):
+            setar = getattr(classe, campo).__set__
+            for objeto in objetos:
+                setar(objeto, _PADROES.get(campo))
+
+        for coluna in grupo["colunas"]:
+            valores = grupo["valores"][coluna["campo"]]
+            if "enum" in coluna:
+                enum = _importar_classe(coluna["enum"])
+                valores = [None if v is None else enum[v] for v in valores]
+            elif coluna["tipo"] == "data" and coluna["campo"] in _EM_SEGUNDOS:
+                valores = [None if v is None else (v - _EPOCA).total_seconds() for v in valores]
+
+            setar = getattr(classe, coluna["campo"]).__set__
+            for objeto, valor in zip(objetos, valores):
+                setar(objeto, valor)
+
+        for posicao, objeto in zip(grupo["ordem"], objetos):
+            dispositivos[posicao] = objeto
+
+    return dispositivos, meta.get("extras", {})
+
+
+def exportar_json(caminho_snapshot, caminho_json):
+    """Versão legível do snapshot: uma entrada por dispositivo com todos os campos."""
+
+    meta, grupos = ler_snapshot(caminho_snapshot)
+    dispositivos = [None] * sum(g["quantidade"] for g in grupos)
+
+    for grupo in grupos:
+        campos = list(grupo["valores"])
+        colunas = [grupo["valores"][c] for c in campos]
+        for posicao, linha in zip(grupo["ordem"], zip(*colunas)):
+            registro = {"classe": grupo["classe"]}
+            registro.update(zip(campos, linha))
+            dispositivos[posicao] = registro
+
+    dados = {"versao": meta["versao"], "criado_em": meta["criado_em"], "dispositivos": dispositivos,
+             "extras": meta.get("extras", {})}
+
+    with open(caminho_json, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, indent=4,
+                  default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v))
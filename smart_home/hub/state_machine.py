@@ -1,3 +1,6 @@
+import threading
+from enum import IntEnum
+
 from transitions import Machine
 
 class StateMachine:
@@ -9,3 +12,179 @@ class StateMachine:
 
     def add_transition(self, trigger, source, dest, **kwargs):
         self.machine.add_transition(trigger, source, dest, **kwargs)
+
+
+class TransicaoInvalida(Exception):
+    pass
+
+
+class CodigoComando(IntEnum):
+    """Resultado tipado de um comando, usado no lugar de exceções."""
+
+    OK = 0
+    ESTADO_INVALIDO = 1
+    COMANDO_INEXISTENTE = 2
+    CONDICAO_FALHOU = 3
+    ERRO = 4
+    NAO_ENCONTRADO = 5
+
+
+# acesso a membro de Enum pela classe tem custo; o caminho quente usa estes nomes
+OK = CodigoComando.OK
+ESTADO_INVALIDO = CodigoComando.ESTADO_INVALIDO
+COMANDO_INEXISTENTE = CodigoComando.COMANDO_INEXISTENTE
+CONDICAO_FALHOU = CodigoComando.CONDICAO_FALHOU
+
+
+# -------------------------------
+# Trava de transição
+# -------------------------------
+# notificações feitas durante transições desta thread; None fora delas
+_local = threading.local()
+
+
+def notificacoes_adiadas():
+    """Lista onde o notify de um modelo deve guardar a entrega, ou None se não há transição em curso."""
+
+    return getattr(_local, "adiadas", None)
+
+
+def _abrir_transicao():
+    # só a transição mais externa da thread abre (e depois entrega) a lista
+    if getattr(_local, "adiadas", None) is None:
+        _local.adiadas = []
+        return _local.adiadas
+    return None
+
+
+def _fechar_transicao(adiadas):
+    if adiadas is None:
+        return
+    _local.adiadas = None
+    for entregar, args, kwargs in adiadas:
+        entregar(*args, **kwargs)
+
+
+class TabelaTransicoes:
+    """
+    Tabela de transições compilada uma única vez por classe de dispositivo
+    e compartilhada por todas as instâncias. O modelo guarda apenas o
+    atributo 'state'; os callbacks 'conditions' e 'after' são resolvidos
+    pelo nome no próprio modelo, como no transitions.
+
+    Com o atributo '_trava' (um RLock) no modelo, a leitura do estado, as
+    condições, a troca de estado e os callbacks são atômicos para aquele
+    modelo. As notificações guardadas em notificacoes_adiadas() durante a
+    transição são entregues depois que a trava é solta: observers (regras
+    que comandam outros dispositivos) nunca rodam com uma trava presa, e
+    dois dispositivos que se comandam não esperam um pelo outro.
+    """
+
+    def __init__(self, estados, estado_inicial, transicoes=()):
+
+        self.estados = tuple(estados)
+        self.estado_inicial = estado_inicial
+        self._tabela = {}
+        # (estado, gatilho) -> destino e estado -> gatilhos aceitos, para
+        # checar um comando com um único acesso a dict antes de executá-lo
+        self._destinos = {}
+        self._por_estado = {}
+
+        for transicao in transicoes:
+            self.add_transition(**transicao)
+
+    def add_transition(self, trigger, source, dest, conditions=None, after=None):
+        origens = self.estados if source == "*" else ([source] if isinstance(source, str) else source)
+        condicoes = tuple([conditions] if isinstance(conditions, str) else (conditions or ()))
+        callbacks = tuple([after] if isinstance(after, str) else (after or ()))
+
+        for estado in (dest, *origens):
+            if estado not in self.estados:
+                raise ValueError(f"Estado desconhecido '{estado}' na transição '{trigger}'")
+
+        regras = self._tabela.setdefault(trigger, {})
+        for origem in origens:
+            regras[origem] = (dest, condicoes, callbacks)
+            self._destinos[(origem, trigger)] = dest
+
+        self._por_estado = {
+            estado: tuple(g for g, r in self._tabela.items() if estado in r) for estado in self.estados
+        }
+
+    @property
+    def gatilhos(self):
+        return tuple(self._tabela)
+
+    def destino(self, estado, gatilho):
+        return self._destinos.get((estado, gatilho))
+
+    def pode(self, estado, gatilho):
+        return (estado, gatilho) in self._destinos
+
+    def gatilhos_em(self, estado):
+        return self._por_estado.get(estado, ())
+
+    def verificar(self, estado, gatilho):
+        """Checagem sem efeito colateral (as condições não são avaliadas)."""
+
+        if (estado, gatilho) in self._destinos:
+            return OK
+        if gatilho in self._tabela:
+            return ESTADO_INVALIDO
+        return COMANDO_INEXISTENTE
+
+    def tentar(self, modelo, gatilho):
+        """Como disparar, mas devolve um CodigoComando em vez de levantar exceção."""
+
+        regras = self._tabela.get(gatilho)
+        if regras is None:
+            return COMANDO_INEXISTENTE
+
+        adiadas = _abrir_transicao()
+        try:
+            with modelo._trava:
+                entrada = regras.get(modelo.state)
+                if entrada is None:
+                    return ESTADO_INVALIDO
+
+                return OK if self._executar(modelo, entrada) else CONDICAO_FALHOU
+        finally:
+            _fechar_transicao(adiadas)
+
+    def disparar(self, modelo, gatilho):
+        regras = self._tabela.get(gatilho)
+        if regras is None:
+            raise AttributeError(f"'{gatilho}' não é um gatilho de {type(modelo).__name__}")
+
+        adiadas = _abrir_transicao()
+        try:
+            with modelo._trava:
+                entrada = regras.get(modelo.state)
+                if entrada is None:
+                    raise TransicaoInvalida(f"Can't trigger event {gatilho} from state {modelo.state}!")
+
+                return self._executar(modelo, entrada)
+        finally:
+            _fechar_transicao(adiadas)
+
+    @staticmethod
+    def _executar(modelo, entrada):
+        destino, condicoes, callbacks = entrada
+        for condicao in condicoes:
+            if not getattr(modelo, condicao)():
+                return False
+
+        modelo.state = destino
+        for callback in callbacks:
+            getattr(modelo, callback)()
+        return True
+
+
+def criar_gatilho(nome):
+
+    def gatilho(self):
+        return self.machine.disparar(self, nome)
+
+    gatilho.__name__ = nome
+    gatilho.__qualname__ = nome
+    return gatilho
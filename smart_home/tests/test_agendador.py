@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from smart_home.hub.agendador import Agendador, ExpressaoCron
+from smart_home.hub.relogio import RelogioSimulado
+
+
+class RelogioComAjuste(RelogioSimulado):
+    """Relógio simulado cuja hora local pode ser ajustada sem mexer no monotônico."""
+
+    def __init__(self, inicio):
+        super().__init__(inicio)
+        self.ajuste = timedelta()
+
+    def agora_local(self):
+        return self.agora() + self.ajuste
+
+
+def test_cron_nao_dispara_antes_da_hora_local():
+    relogio = RelogioComAjuste(datetime(2025, 3, 1, 22, 0))
+    agendador = Agendador(relogio)
+    execucoes = []
+    agendador.cron("0 23 * * *", lambda: execucoes.append(relogio.agora_local()))
+
+    # a hora local volta uma hora (fim do horário de verão) antes do disparo
+    relogio.avancar(30 * 60)
+    agendador.executar_pendentes()
+    relogio.ajuste = timedelta(hours=-1)
+    for _ in range(89):
+        relogio.avancar(60)
+        agendador.executar_pendentes()
+    assert execucoes == []
+
+    for _ in range(31):
+        relogio.avancar(60)
+        agendador.executar_pendentes()
+    assert execucoes == [datetime(2025, 3, 1, 23, 0)]
+
+
+def test_cron_com_relogio_local_atrasado_nao_dispara_duas_vezes():
+    relogio = RelogioComAjuste(datetime(2025, 3, 1, 22, 59))
+    agendador = Agendador(relogio)
+    execucoes = []
+    agendador.cron("0 23 * * *", lambda: execucoes.append(relogio.agora_local()))
+
+    # o relógio local é corrigido alguns segundos para trás depois do agendamento
+    relogio.ajuste = timedelta(seconds=-5)
+    relogio.avancar(60)
+    assert agendador.executar_pendentes() == 0
+    for _ in range(10):
+        relogio.avancar(5)
+        agendador.executar_pendentes()
+
+    assert execucoes == [datetime(2025, 3, 1, 23, 0)]
+    relogio.avancar(24 * 3600)
+    agendador.executar_pendentes()
+    assert len(execucoes) == 2
+
+
+def test_cron_com_relogio_local_adiantado_dispara_na_reconferencia():
+    relogio = RelogioComAjuste(datetime(2025, 3, 1, 20, 0))
+    agendador = Agendador(relogio)
+    execucoes = []
+    agendador.cron("0 23 * * *", lambda: execucoes.append(relogio.agora_local()))
+
+    # início do horário de verão: a hora local pula uma hora para a frente
+    relogio.ajuste = timedelta(hours=1)
+    for _ in range(120):
+        relogio.avancar(60)
+        agendador.executar_pendentes()
+
+    # acordando a cada minuto para reconferir, dispara no minuto certo da hora local
+    assert execucoes == [datetime(2025, 3, 1, 23, 0)]
+
+
+def test_expressao_cron_proxima():
+    sabado = datetime(2025, 3, 1, 12, 0)
+
+    assert ExpressaoCron("0 23 * * *").proxima(sabado) == datetime(2025, 3, 1, 23, 0)
+    assert ExpressaoCron("0 23 * * *").proxima(datetime(2025, 3, 1, 23, 0)) == datetime(2025, 3, 2, 23, 0)
+    assert ExpressaoCron("*/15 8-9 * * 1-5").proxima(sabado) == datetime(2025, 3, 3, 8, 0)
+    assert ExpressaoCron("*/15 8-9 * * 1-5").proxima(datetime(2025, 3, 3, 9, 45)) == datetime(2025, 3, 4, 8, 0)
+    assert ExpressaoCron("10,40 * * * *").proxima(sabado) == datetime(2025, 3, 1, 12, 10)
+    # dia do mês e dia da semana restritos: basta um conferir (domingo, dia 2)
+    assert ExpressaoCron("0 0 15 * 7").proxima(sabado) == datetime(2025, 3, 2, 0, 0)
+    assert ExpressaoCron("0 12 29 2 *").proxima(sabado) == datetime(2028, 2, 29, 12, 0)
+
+
+def test_expressao_cron_invalida():
+    for expressao in ("* * * *", "60 * * * *", "* 24 * * *", "* * 0 * *", "* * * 13 *", "* * * * 8",
+                      "*/0 * * * *", "5-1 * * * *", "a * * * *"):
+        with pytest.raises(ValueError):
+            ExpressaoCron(expressao)
+
+    with pytest.raises(ValueError):
+        ExpressaoCron("0 0 31 2 *").proxima(datetime(2025, 1, 1))
+
+
+def test_cron_dispara_com_relogio_simulado():
+    relogio = RelogioSimulado(datetime(2025, 3, 3))  # segunda-feira
+    agendador = Agendador(relogio)
+    execucoes = []
+    id_tarefa = agendador.cron("30 7 * * 1-5", lambda: execucoes.append(relogio.agora()))
+
+    for _ in range(7 * 24 * 60):
+        relogio.avancar(60)
+        agendador.executar_pendentes()
+
+    assert execucoes == [datetime(2025, 3, dia, 7, 30) for dia in range(3, 8)]
+    assert agendador.tarefa(id_tarefa).execucoes == 5
+    assert agendador.metricas.resumo()["max_ms"] == 0.0
+
+    assert agendador.cancelar(id_tarefa)
+    relogio.avancar(7 * 24 * 3600)
+    assert agendador.executar_pendentes() == 0
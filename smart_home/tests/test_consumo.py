@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from smart_home.core.tomada import TomadaInteligente
+from smart_home.hub.consumo_tomada import LIMIAR_VETORIZADO, calcular_consumo_tomada, iterar_consumo_tomada
+
+
+def _eventos():
+    return [
+        {"id_dispositivo": "t1", "evento": "ligar", "timestamp": "2024-12-31T22:00:00"},
+        {"id_dispositivo": "t1", "evento": "desligar", "timestamp": "2024-12-31T23:00:00"},
+        {"id_dispositivo": "t1", "evento": "ligar", "timestamp": "2025-01-01T10:00:00"},
+        {"id_dispositivo": "t1", "evento": "desligar", "timestamp": "2025-01-01T12:00:00"},
+        {"id_dispositivo": "t1", "evento": "ligar", "timestamp": "2025-01-02T10:00:00"},
+        {"id_dispositivo": "t1", "evento": "desligar", "timestamp": "2025-01-02T11:00:00"},
+    ]
+
+
+def test_consumo_sem_janela():
+    linhas = calcular_consumo_tomada(_eventos(), [TomadaInteligente("t1", "T1", potencia_W=100)])
+
+    assert [linha["total_wh"] for linha in linhas] == [100.0, 200.0, 100.0]
+
+
+def test_consumo_com_janela_texto():
+    linhas = calcular_consumo_tomada(_eventos(), [TomadaInteligente("t1", "T1", potencia_W=100)],
+                                     inicio="2025-01-01T00:00:00", fim="2025-01-02T00:00:00")
+
+    assert linhas == [{"id_dispositivo": "t1", "total_wh": 200.0,
+                       "periodo_inicio": "2025-01-01T10:00:00", "periodo_fim": "2025-01-01T12:00:00"}]
+
+
+def test_consumo_com_janela_datetime_aberta():
+    linhas = calcular_consumo_tomada(_eventos(), [TomadaInteligente("t1", "T1", potencia_W=100)],
+                                     inicio=datetime(2025, 1, 1))
+
+    assert [linha["total_wh"] for linha in linhas] == [200.0, 100.0]
+
+
+def test_consumo_lista_grande_igual_ao_laco_python():
+    eventos = _eventos() * (LIMIAR_VETORIZADO // len(_eventos()) + 1)
+    tomadas = [TomadaInteligente("t1", "T1", potencia_W=100)]
+
+    assert calcular_consumo_tomada(eventos, tomadas) == list(iterar_consumo_tomada(eventos, tomadas))
+    assert (calcular_consumo_tomada(eventos, tomadas, inicio=datetime(2025, 1, 1))
+            == list(iterar_consumo_tomada(eventos, tomadas, inicio=datetime(2025, 1, 1))))
@@ -0,0 +1,168 @@
+import random
+import threading
+import time
+
+import pytest
+
+from smart_home.hub.observer import Observer, Subject, ativar_despacho_assincrono, desativar_despacho_assincrono
+
+
+class Origem(Subject):
+
+    def __init__(self, id_origem):
+        super().__init__()
+        self.id = id_origem
+
+
+class Registrador(Observer):
+    """Guarda (origem, evento, n) na ordem de entrega; com 'portao', a primeira entrega espera ser liberada."""
+
+    def __init__(self, portao=None, atraso_s=0.0):
+        self.recebidos = []
+        self.portao = portao
+        self.atraso_s = atraso_s
+        self.entrou = threading.Event()
+
+    def update(self, subject, event=None, n=None, **kwargs):
+        self.entrou.set()
+        if self.portao is not None:
+            self.portao.wait(5)
+        if self.atraso_s:
+            time.sleep(random.random() * self.atraso_s)
+        self.recebidos.append((subject.id, event, n))
+
+
+@pytest.fixture
+def despacho():
+    ativos = []
+
+    def ativar(**opcoes):
+        ativos.append(ativar_despacho_assincrono(**opcoes))
+        return ativos[-1]
+
+    yield ativar
+    desativar_despacho_assincrono()
+
+
+def _ocupar_trabalhador(origem, observer):
+    # a primeira entrega fica presa no portão: o que vier depois acumula na fila
+    origem.notify(event="inicio", n=0)
+    assert observer.entrou.wait(5)
+
+
+def test_ordem_fifo_por_observer_e_dispositivo(despacho):
+    despachante = despacho(capacidade=1000, trabalhadores=4)
+    origens = [Origem(f"d{i}") for i in range(3)]
+    observers = [Registrador(atraso_s=0.0005) for _ in range(2)]
+    for origem in origens:
+        for observer in observers:
+            origem.attach(observer)
+
+    for n in range(50):
+        for origem in origens:
+            origem.notify(event="ligar", n=n)
+    assert despachante.aguardar(10)
+
+    for observer in observers:
+        for origem in origens:
+            assert [n for o, _, n in observer.recebidos if o == origem.id] == list(range(50))
+
+
+def test_bloquear_espera_espaco(despacho):
+    despachante = despacho(capacidade=2, politica="bloquear")
+    portao = threading.Event()
+    origem, observer = Origem("d"), Registrador(portao)
+    origem.attach(observer)
+    _ocupar_trabalhador(origem, observer)
+
+    origem.notify(event="ligar", n=1)
+    origem.notify(event="ligar", n=2)
+    terceiro = threading.Thread(target=origem.notify, kwargs={"event": "ligar", "n": 3})
+    terceiro.start()
+    terceiro.join(0.2)
+    assert terceiro.is_alive()
+
+    portao.set()
+    terceiro.join(5)
+    assert despachante.aguardar(5)
+    assert [n for _, _, n in observer.recebidos] == [0, 1, 2, 3]
+    assert despachante.descartados == despachante.coalescidos == 0
+
+
+def test_descartar_antigo_com_fila_cheia(despacho):
+    despachante = despacho(capacidade=2, politica="descartar_antigo")
+    portao = threading.Event()
+    origem, observer = Origem("d"), Registrador(portao)
+    origem.attach(observer)
+    _ocupar_trabalhador(origem, observer)
+
+    for n in (1, 2, 3):
+        origem.notify(event="ligar", n=n)
+    portao.set()
+
+    assert despachante.aguardar(5)
+    assert [n for _, _, n in observer.recebidos] == [0, 2, 3]
+    assert despachante.descartados == 1
+
+
+def test_coalescer_so_com_fila_cheia(despacho):
+    despachante = despacho(capacidade=3, politica="coalescer")
+    portao = threading.Event()
+    origem, observer = Origem("d"), Registrador(portao)
+    origem.attach(observer)
+    _ocupar_trabalhador(origem, observer)
+
+    # com folga, eventos do mesmo tipo seguem separados
+    origem.notify(event="consumo", n=1)
+    origem.notify(event="consumo", n=2)
+    origem.notify(event="ligar", n=3)
+    # cheia: o mesmo tipo do último substitui; outro tipo descarta o mais antigo
+    origem.notify(event="ligar", n=4)
+    origem.notify(event="desligar", n=5)
+    portao.set()
+
+    assert despachante.aguardar(5)
+    assert observer.recebidos == [("d", "inicio", 0), ("d", "consumo", 2), ("d", "ligar", 4), ("d", "desligar", 5)]
+    assert (despachante.coalescidos, despachante.descartados) == (1, 1)
+
+
+def test_erros_contados_por_observer(despacho):
+    class Falho(Observer):
+        def update(self, subject, event=None, n=None, **kwargs):
+            raise ValueError(f"falha {n}")
+
+    despachante = despacho()
+    origem, observer = Origem("d"), Registrador()
+    origem.attach(Falho())
+    origem.attach(observer)
+
+    for n in range(3):
+        origem.notify(event="ligar", n=n)
+    assert despachante.aguardar(5)
+
+    estatisticas = despachante.estatisticas()
+    assert estatisticas["erros"] == {"Falho": 3}
+    assert estatisticas["ultimos_erros"] == {"Falho": "ValueError('falha 2')"}
+    assert len(observer.recebidos) == 3
+    assert estatisticas["entregues"] == 6
+
+
+def test_trabalhador_que_notifica_com_fila_cheia_nao_trava(despacho):
+    despachante = despacho(capacidade=1, politica="bloquear")
+    alvo, observer = Origem("alvo"), Registrador()
+    alvo.attach(observer)
+
+    class Regra(Observer):
+        # como uma regra: cada evento da origem vira comandos em outro dispositivo
+        def update(self, subject, event=None, n=None, **kwargs):
+            for i in range(3):
+                alvo.notify(event="ligar", n=(n, i))
+
+    origem = Origem("origem")
+    origem.attach(Regra())
+    for n in range(5):
+        origem.notify(event="ativar", n=n)
+
+    assert despachante.aguardar(5)
+    assert sorted(n for _, _, n in observer.recebidos) == [(n, i) for n in range(5) for i in range(3)]
+    assert [n for _, _, n in observer.recebidos if n[0] == 4] == [(4, 0), (4, 1), (4, 2)]
@@ -0,0 +1,18 @@
+import io
+
+from smart_home.utils.logs import configurar_logs, encerrar_logs, obter_logger
+
+
+def test_argumentos_mutaveis_sao_congelados_na_chamada():
+    destino = io.StringIO()
+    configurar_logs("INFO", assincrono=True, destino=destino)
+    try:
+        logger = obter_logger("teste_logs")
+        detalhes = {"brilho": 10}
+        logger.info("Detalhes %s de %s", detalhes, "luz")
+        detalhes["brilho"] = 90
+        encerrar_logs()
+    finally:
+        configurar_logs("INFO", assincrono=False)
+
+    assert destino.getvalue() == "[INFO] Detalhes {'brilho': 10} de luz\n"
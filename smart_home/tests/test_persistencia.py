@@ -0,0 +1,104 @@
+import json
+import os
+
+import pytest
+
+from smart_home.core.luz import Luz
+from smart_home.hub.automacao import AutomacaoResidencial
+from smart_home.hub.persistencia import ArquivoIncremental
+
+
+@pytest.fixture
+def hub(tmp_path):
+    AutomacaoResidencial._instance = None
+    hub = AutomacaoResidencial(str(tmp_path / "config.json"), str(tmp_path / "rotinas.json"))
+    hub.adicionar_dispostivo(Luz("luz", "Luz"))
+    hub.adicionar_dispostivo(Luz("luz_2", "Luz 2"))
+    hub.salvar_dispositivos(hub._caminho_config)
+    yield hub
+    hub.executor.encerrar()
+    hub.agendador.fechar()
+    AutomacaoResidencial._instance = None
+
+
+def _recarregar(hub):
+    return hub.carregar_dispositivos(hub._caminho_config)
+
+
+def test_deltas_reaplicados_sobre_a_base(hub):
+    hub.buscar_por_id("luz").brilho = 50
+
+    assert hub.salvar_alteracoes() == (1, 0)
+    assert _recarregar(hub)["luz"].brilho == 50
+
+
+def test_registro_removido(hub):
+    hub.remover_dispositivo("luz_2")
+    hub.salvar_alteracoes()
+
+    carregados = _recarregar(hub)
+    assert "luz_2" not in carregados
+    assert "luz" in carregados
+
+
+def test_compactacao_zera_o_log(hub):
+    caminho = hub._caminho_config
+    hub._incrementais[caminho] = ArquivoIncremental(caminho, limite_compactacao=2)
+    luz = hub.buscar_por_id("luz")
+
+    luz.brilho = 10
+    hub.salvar_alteracoes()
+    assert os.path.exists(f"{caminho}.delta")
+
+    luz.brilho = 20
+    hub.buscar_por_id("luz_2").brilho = 30
+    hub.salvar_alteracoes()
+
+    assert not os.path.exists(f"{caminho}.delta")
+    assert hub._incrementais[caminho].linhas_delta == 0
+    with open(caminho, encoding="utf-8") as f:
+        brilhos = {d["id"]: d["brilho"] for d in json.load(f)["dispositivos"]}
+    assert brilhos == {"luz": 20, "luz_2": 30}
+
+
+def test_salvamento_completo_invalida_o_log(hub):
+    luz = hub.buscar_por_id("luz")
+    luz.brilho = 50
+    hub.salvar_alteracoes()
+    luz.brilho = 80
+
+    hub.salvar_dispositivos(hub._caminho_config)
+
+    assert not os.path.exists(f"{hub._caminho_config}.delta")
+    assert len(hub.rastreador) == 0
+    assert _recarregar(hub)["luz"].brilho == 80
+
+
+def test_linha_incompleta_e_descartada_na_abertura(tmp_path):
+    caminho = str(tmp_path / "config.json")
+    ArquivoIncremental(caminho).registrar([("luz", {"id": "luz", "brilho": 10})])
+    with open(f"{caminho}.delta", "a", encoding="utf-8") as f:
+        f.write('{"id":"luz","registro":{"id":"lu')
+
+    incremental = ArquivoIncremental(caminho)
+    assert incremental.linhas_delta == 1
+    incremental.registrar([("luz", {"id": "luz", "brilho": 33})])
+
+    assert list(ArquivoIncremental(caminho).deltas()) == [("luz", {"id": "luz", "brilho": 10}),
+                                                          ("luz", {"id": "luz", "brilho": 33})]
+
+
+def test_caminho_vazio_ignora_delta_do_diretorio_atual(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open(".delta", "w", encoding="utf-8") as f:
+        f.write(json.dumps({"id": "perdida", "registro": {"nome": "Perdida", "acoes": []}}) + "\n")
+
+    AutomacaoResidencial._instance = None
+    hub = AutomacaoResidencial("", "")
+    try:
+        assert len(hub.dispositivos) == 0
+        assert hub.rotinas == {}
+    finally:
+        hub.executor.encerrar()
+        hub.agendador.fechar()
+        AutomacaoResidencial._instance = None
@@ -0,0 +1,92 @@
+from smart_home.core.luz import Luz
+from smart_home.hub.automacao import AutomacaoResidencial, RotinaObserver
+from smart_home.hub.eventos import Evento
+from smart_home.hub.regras import DespachanteRegras
+
+
+def _regra(id_regra, alvo, quando="sensor_movimento", origem="sensor_sala"):
+    return {"id": id_regra, "quando": quando, "origem": origem, "acao": "ligar", "alvo": alvo}
+
+
+def test_adicionar_e_despachar():
+    dispositivos = {"luz_sala": Luz("luz_sala", "Luz da Sala")}
+    regras = DespachanteRegras([RotinaObserver(_regra("r1", "luz_sala"), dispositivos)])
+
+    assert regras.despachar(Evento("sensor_movimento", "sensor_cozinha")) == 0
+    assert regras.despachar(Evento("sensor_movimento", "sensor_sala")) == 1
+    assert dispositivos["luz_sala"].state == "ligada"
+    assert regras.estatisticas()["r1"] == {"correspondencias": 1, "execucoes": 1, "falhas": 0, "ciclos": 0}
+
+
+def test_remover_uma_regra_nao_desativa_outra_com_mesmo_id():
+    dispositivos = {"luz_a": Luz("luz_a", "A"), "luz_b": Luz("luz_b", "B")}
+    primeira = RotinaObserver(_regra("r1", "luz_a"), dispositivos)
+    segunda = RotinaObserver(_regra("r1", "luz_b"), dispositivos)
+    regras = DespachanteRegras([primeira, segunda])
+
+    assert regras.remover(primeira)
+    assert not regras.remover(primeira)
+    assert len(regras) == 1
+
+    assert regras.despachar(Evento("sensor_movimento", "sensor_sala")) == 1
+    assert dispositivos["luz_a"].state == "desligada"
+    assert dispositivos["luz_b"].state == "ligada"
+    assert regras.estatisticas() == {"r1": {"correspondencias": 1, "execucoes": 1, "falhas": 0, "ciclos": 0}}
+
+
+def test_remover_por_id():
+    dispositivos = {"luz": Luz("luz", "Luz")}
+    regras = DespachanteRegras([RotinaObserver(_regra("r1", "luz"), dispositivos),
+                                RotinaObserver(_regra("r1", "luz", origem="*"), dispositivos),
+                                RotinaObserver(_regra("r2", "luz", quando="*"), dispositivos)])
+
+    regras.remover_por_id("r1")
+
+    assert len(regras) == 1
+    assert list(regras.estatisticas()) == ["r2"]
+    assert regras.candidatas(Evento("sensor_movimento", "sensor_sala"))[0].regra["id"] == "r2"
+
+
+def test_ciclo_entre_regras_e_interrompido():
+    # r1: luz_a ligou -> desliga luz_b; r2: luz_b desligou -> desliga luz_a;
+    # r3: luz_a desligou -> liga luz_b; r4: luz_b ligou -> liga luz_a ... sem fim
+    dispositivos = {"luz_a": Luz("luz_a", "A"), "luz_b": Luz("luz_b", "B")}
+    dispositivos["luz_b"].ligar()
+    ciclo = [("r1", "ligar", "luz_a", "desligar", "luz_b"), ("r2", "desligar", "luz_b", "desligar", "luz_a"),
+             ("r3", "desligar", "luz_a", "ligar", "luz_b"), ("r4", "ligar", "luz_b", "ligar", "luz_a")]
+    regras = DespachanteRegras([
+        RotinaObserver({"id": rid, "quando": quando, "origem": origem, "acao": acao, "alvo": alvo}, dispositivos)
+        for rid, quando, origem, acao, alvo in ciclo])
+
+    class Ponte:
+        def update(self, subject, event=None, **kwargs):
+            regras.despachar(Evento(event, subject.id))
+
+    for luz in dispositivos.values():
+        luz.attach(Ponte())
+
+    assert dispositivos["luz_a"].executar_comando("ligar")
+
+    estatisticas = regras.estatisticas()
+    assert [estatisticas[r]["execucoes"] for r in ("r1", "r2", "r3", "r4")] == [1, 1, 1, 1]
+    assert estatisticas["r1"]["ciclos"] == 1
+
+
+def test_edicao_de_atributo_nao_dispara_regra_curinga():
+    AutomacaoResidencial._instance = None
+    hub = AutomacaoResidencial("", "")
+    try:
+        luz = Luz("luz", "Luz")
+        hub.adicionar_dispostivo(luz)
+        hub.rastreador.coletar()
+        hub.adicionar_rotina("r1", {"quando": "*", "acoes": [{"id_dispositivo": "luz", "comando": "ligar"}]})
+
+        luz.brilho = 40
+
+        assert luz.state == "desligada"
+        assert hub.regras.estatisticas()["r1"]["correspondencias"] == 0
+        assert hub.rastreador.coletar() == {"luz": True}
+    finally:
+        hub.executor.encerrar()
+        hub.agendador.fechar()
+        AutomacaoResidencial._instance = None
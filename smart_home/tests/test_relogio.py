@@ -0,0 +1,51 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from smart_home.core.tomada import TomadaInteligente
+from smart_home.hub import relogio
+from smart_home.hub.eventos import Evento
+from smart_home.hub.relogio import RelogioSimulado, usando_relogio
+
+
+def test_mes_de_uso_simulado_em_milissegundos():
+    simulado = RelogioSimulado(datetime(2025, 1, 1))
+    inicio = time.perf_counter()
+
+    with usando_relogio(simulado):
+        frota = [TomadaInteligente(f"tomada_{i}", f"Tomada {i}", potencia_W=50 * (i + 1)) for i in range(10)]
+        for _ in range(30):
+            for tomada in frota:
+                tomada.executar_comando("ligar")
+            simulado.avancar(5 * 3600)
+            for tomada in frota:
+                tomada.executar_comando("desligar")
+            simulado.avancar(19 * 3600)
+
+        assert simulado.agora() == datetime(2025, 1, 31)
+
+    decorrido = time.perf_counter() - inicio
+    assert [t.consumo_total() for t in frota] == [pytest.approx(50 * (i + 1) * 5 * 30) for i in range(10)]
+    assert decorrido < 1.0, f"30 dias simulados levaram {decorrido * 1000:.0f} ms"
+
+
+def test_eventos_usam_o_relogio_do_hub():
+    real = relogio.atual
+    simulado = RelogioSimulado(datetime(2025, 6, 1, 12, 0))
+
+    with usando_relogio(simulado):
+        simulado.avancar(90)
+        assert Evento("ligar", "luz").timestamp == datetime(2025, 6, 1, 12, 1, 30)
+
+    assert relogio.atual is real
+
+
+def test_relogio_simulado_nao_volta_no_tempo():
+    simulado = RelogioSimulado(datetime(2025, 1, 1))
+    simulado.avancar_ate(datetime(2025, 1, 2))
+
+    with pytest.raises(ValueError):
+        simulado.avancar(-1)
+    simulado.avancar_ate(datetime(2025, 1, 1))
+    assert simulado.agora() == datetime(2025, 1, 2)
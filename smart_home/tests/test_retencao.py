@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+from smart_home.core.tomada import TomadaInteligente
+from smart_home.hub.agregados import AgregadosEnergia, RegistradorEventos
+from smart_home.hub.armazenamento import ArmazenamentoEventos
+from smart_home.hub.registro import RegistroDispositivos
+from smart_home.hub.relogio import RelogioSimulado, usando_relogio
+from smart_home.hub.retencao import RetencaoEventos
+
+
+def _usar(relogio, tomada, dias):
+    for _ in range(dias):
+        tomada.executar_comando("ligar")
+        relogio.avancar(2 * 3600)
+        tomada.executar_comando("desligar")
+        relogio.avancar(22 * 3600)
+
+
+def test_compactacao_nao_passa_do_checkpoint_dos_agregados(tmp_path):
+    relogio = RelogioSimulado(datetime(2025, 1, 1))
+    with usando_relogio(relogio):
+        armazenamento = ArmazenamentoEventos(str(tmp_path / "eventos.db"))
+        registrador = RegistradorEventos(AgregadosEnergia(), armazenamento)
+        tomada = TomadaInteligente("t1", "T1", potencia_W=100)
+        tomada.attach(registrador)
+        dispositivos = RegistroDispositivos()
+        dispositivos.adicionar_lote([tomada])
+        retencao = RetencaoEventos(armazenamento, dispositivos, janela_bruta=timedelta(days=1),
+                                   janela_horaria=timedelta(days=30), agregados=lambda: registrador.agregados,
+                                   tamanho_lote=3)
+
+        caminho = str(tmp_path / "agregados.json")
+        _usar(relogio, tomada, 3)
+        registrador.salvar_checkpoint(caminho)
+        _usar(relogio, tomada, 5)
+
+        resumo = retencao.compactar()
+
+        # só os 6 eventos do checkpoint saem do banco; os seguintes ficam para a reconstrução
+        assert resumo["eventos_resumidos"] == 6
+        reconstruido = AgregadosEnergia.reconstruir(armazenamento, {"t1": 100}, caminho)
+        assert reconstruido.consumo("t1") == registrador.agregados.consumo("t1") == 1600.0
+        assert retencao.consumo_wh("t1") == 1600.0
+
+        registrador.salvar_checkpoint(caminho)
+        assert retencao.compactar()["eventos_resumidos"] == 8
+        assert AgregadosEnergia.reconstruir(armazenamento, {"t1": 100}, caminho).consumo("t1") == 1600.0
+        assert retencao.serie("t1", granularidade="dia")[0]["wh"] == 200.0
+
+        retencao.fechar()
+        armazenamento.fechar()
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+from smart_home.core.cafeteira import Cafeteira
+from smart_home.core.luz import CorRGB, Luz
+from smart_home.core.persiana import Persiana
+from smart_home.core.porta import Port
+from smart_home.core.sensor import Sensor
+from smart_home.core.tomada import TomadaInteligente
+from smart_home.hub.relogio import RelogioSimulado, usando_relogio
+from smart_home.hub.snapshot import carregar_snapshot, salvar_snapshot
+
+
+def _frota():
+    luz = Luz("luz", "Luz da Sala", brilho=40, cor=CorRGB.BLUE)
+    luz.ligar()
+    tomada = TomadaInteligente("tomada", "Tomada", potencia_W=150)
+    tomada.ligar()
+    porta = Port("porta", "Porta")
+    porta.trancar()
+    sensor = Sensor("sensor", "Sensor")
+    sensor.ativar()
+    persiana = Persiana("persiana", "Persiana")
+    cafeteira = Cafeteira("cafeteira", "Cafeteira")
+    # classes intercaladas: a ordem original tem de voltar
+    return [luz, porta, TomadaInteligente("tomada_2", "Tomada 2"), tomada, sensor, persiana, cafeteira,
+            Luz("luz_2", "Luz 2")]
+
+
+def test_snapshot_ida_e_volta(tmp_path):
+    caminho = str(tmp_path / "dispositivos.snap")
+    relogio = RelogioSimulado(datetime(2025, 1, 1, 8, 0))
+    extras = {"rotinas": {"r1": {"id": "r1", "acoes": []}}, "agregados": {"tomada": 1.5}}
+
+    with usando_relogio(relogio):
+        frota = _frota()
+        relogio.avancar(3600)
+        salvar_snapshot(caminho, frota, extras)
+        carregados, extras_carregados = carregar_snapshot(caminho)
+
+        assert extras_carregados == extras
+        assert [type(d) for d in carregados] == [type(d) for d in frota]
+        assert [d.detalhes().como_dict() for d in carregados] == [d.detalhes().como_dict() for d in frota]
+        assert carregados[0].cor is CorRGB.BLUE
+        assert carregados[4]._ultimo_ativado == datetime(2025, 1, 1, 8, 0)
+
+        # os restaurados seguem funcionando: a tomada fecha a hora que ficou ligada
+        tomada = carregados[3]
+        assert tomada.executar_comando("desligar")
+        assert tomada.consumo_total() == 150.0
+        assert tomada._trava is not frota[3]._trava
+        assert carregados[1].executar_comando("destrancar")
+
+
+def test_snapshot_preserva_int_e_float_na_mesma_coluna(tmp_path):
+    caminho = str(tmp_path / "dispositivos.snap")
+    tomadas = [TomadaInteligente("t1", "T1", potencia_W=100), TomadaInteligente("t2", "T2", potencia_W=7.5)]
+
+    salvar_snapshot(caminho, tomadas)
+    carregadas, _ = carregar_snapshot(caminho)
+
+    assert [(type(t.potencia_W), t.potencia_W) for t in carregadas] == [(int, 100), (float, 7.5)]
+
+
+def test_snapshot_ints_fora_de_int64(tmp_path):
+    caminho = str(tmp_path / "dispositivos.snap")
+    potencias = [2 ** 63, -2 ** 63, 2 ** 53 + 1, 1]
+    tomadas = [TomadaInteligente(f"t{i}", f"T{i}", potencia_W=p) for i, p in enumerate(potencias)]
+    mistas = [TomadaInteligente("m1", "M1", potencia_W=2 ** 70), TomadaInteligente("m2", "M2", potencia_W=0.5)]
+
+    salvar_snapshot(caminho, tomadas + mistas)
+    carregadas, _ = carregar_snapshot(caminho)
+
+    assert [t.potencia_W for t in carregadas] == potencias + [2 ** 70, 0.5]
@@ -0,0 +1,53 @@
+import threading
+
+from smart_home.core.luz import Luz
+from smart_home.hub.observer import Observer
+from smart_home.hub.state_machine import CodigoComando
+
+
+def test_transicao_concorrente_acontece_uma_vez():
+    luz = Luz("luz", "Luz")
+    barreira = threading.Barrier(8)
+    codigos = []
+
+    def ligar():
+        barreira.wait()
+        codigos.append(luz.tentar_comando("ligar"))
+
+    threads = [threading.Thread(target=ligar) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert codigos.count(CodigoComando.OK) == 1
+    assert codigos.count(CodigoComando.ESTADO_INVALIDO) == 7
+
+
+def test_observer_roda_sem_a_trava_do_dispositivo():
+    # o observer comanda outro dispositivo numa thread que espera a trava do primeiro
+    luz_a, luz_b = Luz("luz_a", "A"), Luz("luz_b", "B")
+    travas_livres = []
+
+    class Verificador(Observer):
+        sincrono = True
+
+        def update(self, subject, event=None, **kwargs):
+            if event == "ligar":
+                outra = threading.Thread(target=self.tentar_travar, args=(subject,))
+                outra.start()
+                outra.join()
+                luz_b.executar_comando("ligar")
+
+        @staticmethod
+        def tentar_travar(dispositivo):
+            livre = dispositivo._trava.acquire(timeout=1)
+            travas_livres.append(livre)
+            if livre:
+                dispositivo._trava.release()
+
+    luz_a.attach(Verificador())
+
+    assert luz_a.executar_comando("ligar")
+    assert travas_livres == [True]
+    assert luz_b.state == "ligada"
@@ -0,0 +1,128 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from enum import Enum
+
+LOGGER_RAIZ = "smart_home"
+
+# mantém os rótulos que o projeto sempre usou nas mensagens de console
+ROTULOS = {
+    "DEBUG": "DEBUG",
+    "INFO": "INFO",
+    "WARNING": "WARN",
+    "ERROR": "ERRO",
+    "CRITICAL": "ERRO",
+}
+
+_CAMPOS_PADRAO = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener = None
+
+# argumentos que podem esperar a thread de escrita sem risco de mudar antes
+_IMUTAVEIS = (str, int, float, bytes, type(None), Enum, date, datetime, time, timedelta)
+
+
+def obter_logger(nome):
+    """Logger filho de 'smart_home'. Use formatação preguiçosa: logger.info("Luz %s ligada", nome)."""
+
+    if nome == LOGGER_RAIZ or nome.startswith(f"{LOGGER_RAIZ}."):
+        return logging.getLogger(nome)
+    return logging.getLogger(f"{LOGGER_RAIZ}.{nome}")
+
+
+class FormatadorTexto(logging.Formatter):
+
+    def format(self, record):
+        return f"[{ROTULOS.get(record.levelname, record.levelname)}] {record.getMessage()}"
+
+
+class FormatadorEstruturado(logging.Formatter):
+    """Uma linha JSON por registro, incluindo os campos passados em 'extra'."""
+
+    def format(self, record):
+        dados = {
+            "ts": record.created,
+            "nivel": ROTULOS.get(record.levelname, record.levelname),
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        dados.update({k: v for k, v in vars(record).items() if k not in _CAMPOS_PADRAO})
+        if record.exc_info:
+            dados["erro"] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class _QueueHandlerPreguicoso(logging.handlers.QueueHandler):
+
+    # a interpolação da mensagem fica para a thread de escrita, congelando os
+    # argumentos na hora da chamada: só valores imutáveis seguem como estão;
+    # com qualquer outro (dict, lista, dispositivo) a mensagem é formatada já
+    def prepare(self, record):
+        if record.exc_info or not self._congelado(record.args):
+            return super().prepare(record)
+        return record
+
+    @staticmethod
+    def _congelado(args):
+        if not args:
+            return True
+        valores = args.values() if isinstance(args, dict) else args
+        return all(isinstance(v, _IMUTAVEIS) for v in valores)
+
+
+def configurar_logs(nivel="INFO", assincrono=True, destino=None, estruturado=False):
+    """
+    Configura o logger 'smart_home'.
+
+    Com assincrono=True as mensagens só entram numa fila no caminho quente;
+    uma thread (QueueListener) formata e escreve no destino. Abaixo do nível
+    configurado, a chamada ao logger retorna sem formatar nada.
+    """
+    encerrar_logs()
+
+    raiz = logging.getLogger(LOGGER_RAIZ)
+    raiz.handlers.clear()
+    raiz.setLevel(nivel)
+    raiz.propagate = False
+
+    handler = logging.StreamHandler(destino or sys.stdout)
+    handler.setFormatter(FormatadorEstruturado() if estruturado else FormatadorTexto())
+
+    if assincrono:
+        global _listener
+        fila = queue.SimpleQueue()
+        raiz.addHandler(_QueueHandlerPreguicoso(fila))
+        _listener = logging.handlers.QueueListener(fila, handler, respect_handler_level=True)
+        _listener.start()
+    else:
+        raiz.addHandler(handler)
+
+    return raiz
+
+
+@contextmanager
+def logs_no_nivel(nivel):
+    """
+    Logs síncronos em 'nivel' durante o bloco (ou a função decorada); na
+    saída, mesmo com erro, voltam ao INFO síncrono do CLI.
+    """
+    configurar_logs(nivel, assincrono=False)
+    try:
+        yield
+    finally:
+        configurar_logs("INFO", assincrono=False)
+
+
+def encerrar_logs():
+    """Esvazia a fila e para a thread de escrita, se houver."""
+
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
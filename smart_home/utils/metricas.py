@@ -0,0 +1,296 @@
+import functools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from smart_home.utils.logs import obter_logger
+
+logger = obter_logger(__name__)
+
+# registro ativo; None = métricas desligadas. O caminho quente só faz
+# 'metricas.registro is not None' antes de medir qualquer coisa.
+registro = None
+
+# limites (segundos) dos buckets exportados para o Prometheus
+LIMITES_PROMETHEUS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+# 16 sub-buckets por potência de 2: erro relativo de até ~6% por valor
+_BITS_SUB = 4
+_SUB = 1 << _BITS_SUB
+
+
+def _indice(ns):
+    if ns < 2 * _SUB:
+        return ns
+    deslocamento = ns.bit_length() - _BITS_SUB - 1
+    return deslocamento * _SUB + (ns >> deslocamento)
+
+
+def _limites_indice(indice):
+    """Faixa [início, fim) em ns coberta por um bucket."""
+
+    if indice < 2 * _SUB:
+        return indice, indice + 1
+    deslocamento = indice // _SUB - 1
+    inicio = (indice - deslocamento * _SUB) << deslocamento
+    return inicio, inicio + (1 << deslocamento)
+
+
+# -------------------------------
+# Tipos de métrica
+# -------------------------------
+class Contador:
+
+    tipo = "counter"
+
+    def __init__(self):
+        self.valor = 0
+        self._lock = threading.Lock()
+
+    def incrementar(self, quantidade=1):
+        with self._lock:
+            self.valor += quantidade
+
+
+class Histograma:
+    """
+    Histograma de latências no estilo HDR: buckets log-lineares em
+    nanossegundos (exatos até 32 ns, depois 16 por potência de 2), numa
+    lista fixa de 1024 contadores: cobre de ns a anos e dá percentis com
+    ~6% de erro.
+    """
+
+    tipo = "histogram"
+
+    def __init__(self):
+        self.contagens = [0] * (_SUB * 64)
+        self.total = 0
+        self.soma_s = 0.0
+        self.maximo_s = 0.0
+        self._lock = threading.Lock()
+
+    def registrar(self, segundos):
+        ns = int(segundos * 1e9)
+        if ns < 2 * _SUB:
+            indice = ns if ns > 0 else 0
+        else:
+            deslocamento = ns.bit_length() - _BITS_SUB - 1
+            indice = deslocamento * _SUB + (ns >> deslocamento)
+        with self._lock:
+            self.contagens[indice] += 1
+            self.total += 1
+            self.soma_s += segundos
+            if segundos > self.maximo_s:
+                self.maximo_s = segundos
+
+    def _nao_vazios(self):
+        with self._lock:
+            return [(indice, contagem) for indice, contagem in enumerate(self.contagens) if contagem], self.total
+
+    def percentil(self, p):
+        """Valor (s) abaixo do qual ficam p (0-1) das observações; meio do bucket."""
+
+        contagens, total = self._nao_vazios()
+        alvo = p * total
+        acumulado = 0
+        for indice, contagem in contagens:
+            acumulado += contagem
+            if acumulado >= alvo:
+                inicio, fim = _limites_indice(indice)
+                return min((inicio + fim - 1) / 2 / 1e9, self.maximo_s)
+        return 0.0
+
+    def acumulado_ate(self, limites_s):
+        """Contagens cumulativas para cada limite (buckets inteiros abaixo do limite)."""
+
+        contagens, _ = self._nao_vazios()
+        resultado = []
+        acumulado = 0
+        posicao = 0
+        for limite in limites_s:
+            limite_ns = limite * 1e9
+            while posicao < len(contagens) and _limites_indice(contagens[posicao][0])[1] - 1 <= limite_ns:
+                acumulado += contagens[posicao][1]
+                posicao += 1
+            resultado.append(acumulado)
+        return resultado
+
+    def resumo(self):
+        return {
+            "total": self.total,
+            "media_ms": self.soma_s / self.total * 1000 if self.total else 0.0,
+            "p50_ms": self.percentil(0.50) * 1000,
+            "p99_ms": self.percentil(0.99) * 1000,
+            "max_ms": self.maximo_s * 1000,
+        }
+
+
+# -------------------------------
+# Registro
+# -------------------------------
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _rotulos_texto(rotulos, extra=()):
+    pares = [*rotulos, *extra]
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + "}"
+
+
+class RegistroMetricas:
+    """
+    Contadores e histogramas nomeados, com rótulos:
+
+        registro.histograma("smart_home_comando_segundos", tipo="LUZ", comando="ligar").registrar(0.0012)
+        registro.contador("smart_home_comandos_total", tipo="LUZ", comando="ligar", codigo="OK").incrementar()
+
+    Cada combinação (nome, rótulos) é criada na primeira vez e reaproveitada.
+    """
+
+    def __init__(self):
+        self._metricas = {}
+        self._atalhos = {}
+        self._lock = threading.Lock()
+        self._servidor = None
+
+    def _obter(self, classe, nome, rotulos):
+        # atalho pela ordem dos kwargs no ponto de chamada; a chave canônica é ordenada
+        atalho = (nome, *rotulos.values(), *rotulos)
+        metrica = self._atalhos.get(atalho)
+        if metrica is None:
+            chave = (nome, tuple(sorted(rotulos.items())))
+            with self._lock:
+                metrica = self._metricas.get(chave)
+                if metrica is None:
+                    metrica = self._metricas[chave] = classe()
+                self._atalhos[atalho] = metrica
+        return metrica
+
+    def contador(self, nome, **rotulos):
+        return self._obter(Contador, nome, rotulos)
+
+    def histograma(self, nome, **rotulos):
+        return self._obter(Histograma, nome, rotulos)
+
+    def metricas(self):
+        with self._lock:
+            return sorted(self._metricas.items(), key=lambda item: item[0])
+
+    def resumo(self):
+        """{'nome{rotulos}': valor do contador ou resumo do histograma}"""
+
+        return {
+            nome + _rotulos_texto(rotulos): metrica.resumo() if isinstance(metrica, Histograma) else metrica.valor
+            for (nome, rotulos), metrica in self.metricas()
+        }
+
+    # -------------------------------
+    # Exportação Prometheus
+    # -------------------------------
+    def exportar_prometheus(self):
+        """Texto no formato de exposição do Prometheus (0.0.4)."""
+
+        linhas = []
+        anterior = None
+        for (nome, rotulos), metrica in self.metricas():
+            if nome != anterior:
+                linhas.append(f"# TYPE {nome} {metrica.tipo}")
+                anterior = nome
+
+            if isinstance(metrica, Contador):
+                linhas.append(f"{nome}{_rotulos_texto(rotulos)} {metrica.valor}")
+                continue
+
+            for limite, acumulado in zip(LIMITES_PROMETHEUS, metrica.acumulado_ate(LIMITES_PROMETHEUS)):
+                linhas.append(f"{nome}_bucket{_rotulos_texto(rotulos, [('le', repr(limite))])} {acumulado}")
+            linhas.append(f"{nome}_bucket{_rotulos_texto(rotulos, [('le', '+Inf')])} {metrica.total}")
+            linhas.append(f"{nome}_sum{_rotulos_texto(rotulos)} {metrica.soma_s!r}")
+            linhas.append(f"{nome}_count{_rotulos_texto(rotulos)} {metrica.total}")
+        return "\n".join(linhas) + "\n"
+
+    def salvar_prometheus(self, caminho):
+        """Grava de forma atômica (ex.: para o textfile collector do node_exporter)."""
+
+        temporario = f"{caminho}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write(self.exportar_prometheus())
+        os.replace(temporario, caminho)
+        logger.info("Métricas salvas em '%s'.", caminho)
+
+    def servir_http(self, porta=9108, endereco="127.0.0.1"):
+        """Expõe GET /metrics numa thread própria; devolve o servidor."""
+
+        if self._servidor:
+            return self._servidor
+
+        registro_metricas = self
+
+        class _Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                corpo = registro_metricas.exportar_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, formato, *args):
+                logger.debug("HTTP métricas: " + formato, *args)
+
+        self._servidor = ThreadingHTTPServer((endereco, porta), _Handler)
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, name="metricas-http", daemon=True).start()
+        logger.info("Métricas em http://%s:%d/metrics", endereco, self._servidor.server_address[1])
+        return self._servidor
+
+    def parar_http(self):
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+
+# -------------------------------
+# Ativação e instrumentação
+# -------------------------------
+def ativar_metricas(novo_registro=None):
+    """Liga a coleta (com um registro novo ou o informado) e devolve o registro."""
+
+    global registro
+    registro = novo_registro or RegistroMetricas()
+    return registro
+
+
+def desativar_metricas():
+    global registro
+    if registro is not None:
+        registro.parar_http()
+    registro = None
+
+
+def cronometrado(nome, **rotulos):
+    """Decorador: registra a duração de cada chamada no histograma 'nome' quando as métricas estão ligadas."""
+
+    def decorador(funcao):
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            ativo = registro
+            if ativo is None:
+                return funcao(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                ativo.histograma(nome, **rotulos).registrar(time.perf_counter() - inicio)
+
+        return envolvida
+
+    return decorador